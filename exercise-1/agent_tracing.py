@@ -0,0 +1,222 @@
+"""
+Latency tracing for the Solar Prediction Agent.
+
+A LangChain callback handler that records per-turn spans for every LLM call and tool
+execution, plus helpers to export the collected turns as JSONL or Prometheus text format.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+class LatencyTracer(BaseCallbackHandler):
+    """
+    Records LLM and tool spans for a single agent turn.
+
+    Pass an instance in the invoke config, e.g.
+    agent.invoke({"messages": messages}, config={"callbacks": [tracer]}),
+    then call finish() to get the turn record.
+    """
+
+    def __init__(self, query=None):
+        self.query = query
+        self.spans = []
+        self._open = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._timestamp = datetime.now(timezone.utc).isoformat()
+
+    def _start(self, run_id, kind, name):
+        with self._lock:
+            self._open[run_id] = {
+                "kind": kind,
+                "name": name,
+                "start": time.perf_counter(),
+            }
+
+    def _end(self, run_id, **extra):
+        end = time.perf_counter()
+        with self._lock:
+            span = self._open.pop(run_id, None)
+            if span is None:
+                return
+            span["latency_s"] = end - span.pop("start")
+            span.update(extra)
+            self.spans.append(span)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or "chat_model"
+        self._start(run_id, "llm", name)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or "llm"
+        self._start(run_id, "llm", name)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt_tokens = 0
+        completion_tokens = 0
+        tool_calls = 0
+        load_duration_s = 0.0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+                tool_calls += len(getattr(message, "tool_calls", None) or [])
+                # Ollama reports model load time (ns) separately from generation
+                metadata = getattr(message, "response_metadata", None) or {}
+                load_duration_s += (metadata.get("load_duration") or 0) / 1e9
+        self._end(
+            run_id,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            tool_calls=tool_calls,
+            load_duration_s=load_duration_s,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=str(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self._start(run_id, "tool", name)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=str(error))
+
+    def finish(self):
+        """
+        Closes the turn and returns its trace record.
+
+        Returns:
+            dict with total latency, LLM/tool/framework time split, token counts,
+            agent iterations and the individual spans.
+        """
+        total_s = time.perf_counter() - self._started
+        llm_spans = [s for s in self.spans if s["kind"] == "llm"]
+        tool_spans = [s for s in self.spans if s["kind"] == "tool"]
+        llm_s = sum(s["latency_s"] for s in llm_spans)
+        tool_s = sum(s["latency_s"] for s in tool_spans)
+
+        tool_time_by_name = {}
+        for span in tool_spans:
+            tool_time_by_name[span["name"]] = (
+                tool_time_by_name.get(span["name"], 0.0) + span["latency_s"]
+            )
+
+        return {
+            "timestamp": self._timestamp,
+            "query": self.query,
+            "total_s": total_s,
+            "llm_s": llm_s,
+            "tool_s": tool_s,
+            "framework_s": max(total_s - llm_s - tool_s, 0.0),
+            "iterations": len(llm_spans),
+            "tool_rounds": sum(1 for s in llm_spans if s.get("tool_calls")),
+            "tool_calls": len(tool_spans),
+            "prompt_tokens": sum(s.get("prompt_tokens", 0) for s in llm_spans),
+            "completion_tokens": sum(s.get("completion_tokens", 0) for s in llm_spans),
+            "tool_time_by_name": tool_time_by_name,
+            "spans": list(self.spans),
+        }
+
+
+def export_jsonl(turns, path):
+    """Appends turn records to a JSONL file, one turn per line."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for turn in turns:
+            f.write(json.dumps(turn) + "\n")
+
+
+def export_prometheus(turns, path, startup_metrics=None):
+    """
+    Writes aggregate metrics for the given turns in Prometheus text exposition format.
+
+    Args:
+        turns: Turn records from LatencyTracer.finish().
+        path: Output file path.
+        startup_metrics: Optional SolarPredictionAgent.startup_metrics (cold/warm first response).
+    """
+    lines = []
+
+    def metric(name, metric_type, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_str}}} {value}" if label_str else f"{name} {value}")
+
+    metric("solar_agent_turns_total", "counter", "Agent turns traced.", [({}, len(turns))])
+    metric(
+        "solar_agent_seconds_total",
+        "counter",
+        "Cumulative agent time by component.",
+        [
+            ({"component": component}, sum(t[f"{component}_s"] for t in turns))
+            for component in ["total", "llm", "tool", "framework"]
+        ],
+    )
+    metric(
+        "solar_agent_iterations_total",
+        "counter",
+        "Cumulative agent iterations (LLM calls).",
+        [({}, sum(t["iterations"] for t in turns))],
+    )
+    metric(
+        "solar_agent_tokens_total",
+        "counter",
+        "Cumulative LLM tokens.",
+        [
+            ({"type": "prompt"}, sum(t["prompt_tokens"] for t in turns)),
+            ({"type": "completion"}, sum(t["completion_tokens"] for t in turns)),
+        ],
+    )
+
+    tool_totals = {}
+    for turn in turns:
+        for name, seconds in turn["tool_time_by_name"].items():
+            tool_totals[name] = tool_totals.get(name, 0.0) + seconds
+    metric(
+        "solar_agent_tool_seconds_total",
+        "counter",
+        "Cumulative tool execution time.",
+        [({"tool": name}, seconds) for name, seconds in sorted(tool_totals.items())],
+    )
+
+    if startup_metrics:
+        metric(
+            "solar_agent_startup_first_response_seconds",
+            "gauge",
+            "First-response latency measured during model warm-up.",
+            [
+                ({"state": "cold"}, startup_metrics["cold_first_response_s"]),
+                ({"state": "warm"}, startup_metrics["warm_first_response_s"]),
+            ],
+        )
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def format_breakdown(turns):
+    """Formats a per-turn latency breakdown table."""
+    header = f"{'#':>3} {'total(s)':>9} {'llm(s)':>8} {'tool(s)':>8} {'other(s)':>9} {'iters':>5} {'tools':>5} {'prompt':>7} {'compl':>6}  query"
+    rows = [header, "-" * len(header)]
+    for i, t in enumerate(turns, 1):
+        query = (t["query"] or "")[:40]
+        rows.append(
+            f"{i:>3} {t['total_s']:>9.2f} {t['llm_s']:>8.2f} {t['tool_s']:>8.3f} {t['framework_s']:>9.3f} "
+            f"{t['iterations']:>5} {t['tool_calls']:>5} {t['prompt_tokens']:>7} {t['completion_tokens']:>6}  {query}"
+        )
+    return "\n".join(rows)
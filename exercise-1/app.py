@@ -5,25 +5,50 @@ Gradio UI for Solar Prediction Agent
 import os
 
 import gradio as gr
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_ollama import OllamaEmbeddings
 from model_utils import resources
-from solar_prediction_agent import SolarPredictionAgent
+from response_cache import ResponseCache
+from solar_prediction_agent import SAMPLE_QUERIES, SolarPredictionAgent
 
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
 resources.load(base_path=os.path.dirname(os.path.abspath(__file__)))
 
-agent_instance = SolarPredictionAgent()
+agent_instance = SolarPredictionAgent(warm_up=True)
 agent = agent_instance.build()
 
+# Answers for repeated/paraphrased questions, keyed by resolved city, month and overrides.
+# Set SOLAR_CACHE_EMBED_MODEL (e.g. nomic-embed-text) to also match by embedding similarity.
+embed_model = os.getenv("SOLAR_CACHE_EMBED_MODEL")
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("SOLAR_CACHE_SIZE", "256")),
+    ttl_s=float(os.getenv("SOLAR_CACHE_TTL", "3600")),
+    embed_fn=(
+        OllamaEmbeddings(
+            model=embed_model, base_url=os.getenv("OLLAMA_BASE_URL")
+        ).embed_query
+        if embed_model
+        else None
+    ),
+)
+
 # Global message history
 message_history = []
 
 
 def predict_solar(message, history):
     """Process user query and return agent response with full conversation history"""
+    # Serve paraphrases of earlier questions without invoking the LLM
+    cached_answer = response_cache.get(message)
+    if cached_answer is not None:
+        message_history.append(HumanMessage(content=message))
+        message_history.append(AIMessage(content=cached_answer))
+        return f"**AI** (cached): {cached_answer}"
+
     # Add new user message to history
     message_history.append(HumanMessage(content=message))
+    turn_start = len(message_history)
 
     try:
         result = agent.invoke({"messages": message_history})
@@ -35,6 +60,7 @@ def predict_solar(message, history):
             # Update message history with agent's response
             message_history.clear()
             message_history.extend(result["messages"])
+            response_cache.put(message, result["messages"][turn_start:])
 
             for msg in result["messages"][1:]:  # Skip the initial user message
                 msg_type = type(msg).__name__
@@ -73,13 +99,7 @@ def predict_solar(message, history):
 
 
 # Sample queries
-examples = [
-    "What is the solar output if the temperature is 30 degrees and it's sunny in Albury?",
-    "What's the solar output for Sydney today?",
-    "How much solar power can I generate in Canberra during summer?",
-    "Which has better solar potential today: Darwin or Hobart?",
-    "I'm installing solar panels in Newcastle - what can I expect on a typical February day?",
-]
+examples = SAMPLE_QUERIES
 
 
 with gr.Blocks(title="Solar Prediction Agent", theme=gr.themes.Soft()) as demo:
@@ -104,10 +124,12 @@ with gr.Blocks(title="Solar Prediction Agent", theme=gr.themes.Soft()) as demo:
 
     gr.Examples(examples=examples, inputs=msg, label="Sample Queries")
 
+    cache_metrics = gr.JSON(value=response_cache.metrics(), label="Response Cache")
+
     def process_query(user_message, chat_history):
         """Process query and maintain conversation history"""
         if not user_message:
-            return chat_history, ""
+            return chat_history, "", response_cache.metrics()
 
         # Get bot response with full conversation
         bot_message = predict_solar(user_message, chat_history)
@@ -118,11 +140,15 @@ with gr.Blocks(title="Solar Prediction Agent", theme=gr.themes.Soft()) as demo:
             gr.ChatMessage(role="assistant", content=bot_message),
         ]
 
-        return updated_history, ""
+        return updated_history, "", response_cache.metrics()
 
     # Event handlers
-    msg.submit(process_query, [msg, chatbot], [chatbot, msg], queue=False)
-    submit.click(process_query, [msg, chatbot], [chatbot, msg], queue=False)
+    msg.submit(
+        process_query, [msg, chatbot], [chatbot, msg, cache_metrics], queue=False
+    )
+    submit.click(
+        process_query, [msg, chatbot], [chatbot, msg, cache_metrics], queue=False
+    )
 
     def clear_conversation():
         """Clear both UI and message history"""
@@ -0,0 +1,176 @@
+"""
+Offline benchmark for the Solar Prediction Agent.
+
+Replays the sample queries plus a generated query set against SolarPredictionAgent using
+the deterministic ScriptedChatModel, so no Ollama server is needed. Reports end-to-end
+latency excluding the LLM (tool time, framework overhead), throughput and memory at each
+concurrency level, and optionally compares against a saved baseline.
+
+Usage:
+    python benchmark_agent.py --generated 200 --concurrency 1,4,8 --output traces/benchmark.json
+    python benchmark_agent.py --baseline traces/benchmark.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import psutil
+from agent_tracing import LatencyTracer
+from langchain_core.messages import HumanMessage
+from mock_llm import ScriptedChatModel
+from model_utils import resources
+from solar_prediction_agent import SAMPLE_QUERIES, SolarPredictionAgent
+from solar_tools import MONTH_NAMES, city_coords
+
+QUERY_TEMPLATES = [
+    "What's the solar output for {city} in {month}?",
+    "How much solar power can I generate in {city} during {season}?",
+    "What's the solar output for {city} today?",
+    "I'm installing solar panels in {city} - what can I expect on a typical {month} day?",
+    "Which has better solar potential in {month}: {city} or {other}?",
+]
+
+
+def generate_queries(n, seed=0):
+    """Generates n reproducible queries from templates, cities, months and seasons."""
+    rng = random.Random(seed)
+    cities = sorted(city_coords)
+    queries = []
+    for _ in range(n):
+        city, other = rng.sample(cities, 2)
+        queries.append(
+            rng.choice(QUERY_TEMPLATES).format(
+                city=city,
+                other=other,
+                month=rng.choice(MONTH_NAMES),
+                season=rng.choice(["summer", "autumn", "winter", "spring"]),
+            )
+        )
+    return queries
+
+
+def run_query(agent, query):
+    tracer = LatencyTracer(query=query)
+    error = None
+    try:
+        agent.invoke(
+            {"messages": [HumanMessage(content=query)]},
+            config={"callbacks": [tracer]},
+        )
+    except Exception as e:
+        error = str(e)
+    trace = tracer.finish()
+    trace["error"] = error
+    return trace
+
+
+def benchmark(queries, concurrency, llm_latency_s=0.0):
+    """
+    Runs all queries at the given concurrency level.
+
+    Returns:
+        dict with throughput, latency percentiles, per-component time and memory.
+    """
+    agent = SolarPredictionAgent(
+        llm=ScriptedChatModel(latency_s=llm_latency_s)
+    ).get_agent()
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        traces = list(executor.map(lambda q: run_query(agent, q), queries))
+    wall_s = time.perf_counter() - start
+    rss_after = process.memory_info().rss
+
+    # Everything except (mock) LLM time is the non-LLM path under test
+    non_llm = np.array([t["total_s"] - t["llm_s"] for t in traces])
+    tool = np.array([t["tool_s"] for t in traces])
+    framework = np.array([t["framework_s"] for t in traces])
+
+    return {
+        "concurrency": concurrency,
+        "queries": len(queries),
+        "errors": sum(1 for t in traces if t["error"]),
+        "wall_s": wall_s,
+        "queries_per_s": len(queries) / wall_s if wall_s else 0.0,
+        "non_llm_p50_ms": float(np.percentile(non_llm, 50) * 1000),
+        "non_llm_p95_ms": float(np.percentile(non_llm, 95) * 1000),
+        "tool_mean_ms": float(tool.mean() * 1000),
+        "framework_mean_ms": float(framework.mean() * 1000),
+        "mean_iterations": float(np.mean([t["iterations"] for t in traces])),
+        "rss_mb_before": rss_before / 2**20,
+        "rss_mb_after": rss_after / 2**20,
+    }
+
+
+def check_regressions(results, baseline, tolerance):
+    """Returns messages for metrics that regressed more than `tolerance` against the baseline."""
+    baseline_by_c = {r["concurrency"]: r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = baseline_by_c.get(result["concurrency"])
+        if base is None:
+            continue
+        for key in ["non_llm_p50_ms", "non_llm_p95_ms", "framework_mean_ms"]:
+            if base[key] and result[key] > base[key] * (1 + tolerance):
+                regressions.append(
+                    f"concurrency={result['concurrency']} {key}: {result[key]:.2f} vs baseline {base[key]:.2f}"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--generated", type=int, default=100, help="Number of generated queries added to the sample queries.")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call.")
+    parser.add_argument("--output", default="traces/benchmark.json")
+    parser.add_argument("--baseline", help="Previous benchmark JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown vs baseline.")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    resources.load(base_path=os.path.dirname(os.path.abspath(__file__)))
+
+    queries = SAMPLE_QUERIES + generate_queries(args.generated, seed=args.seed)
+
+    # Warm-up: first invocation pays for graph compilation and lazy imports
+    benchmark(SAMPLE_QUERIES[:1], 1)
+
+    results = []
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        result = benchmark(queries, concurrency, args.llm_latency)
+        results.append(result)
+        print(
+            f"concurrency={concurrency:<3} {result['queries_per_s']:>8.1f} q/s  "
+            f"non-LLM p50={result['non_llm_p50_ms']:.2f}ms p95={result['non_llm_p95_ms']:.2f}ms  "
+            f"tools={result['tool_mean_ms']:.2f}ms framework={result['framework_mean_ms']:.2f}ms  "
+            f"rss={result['rss_mb_after']:.0f}MB errors={result['errors']}"
+        )
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = check_regressions(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION: {message}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"seed": args.seed, "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Scripted chat model for running the Solar Prediction Agent without an Ollama server.
+
+The model parses the user query for cities and a month, then emits the same tool-calling
+sequence the real agent follows (lookup_location -> get_seasonal_weather_defaults ->
+predict_solar_output -> final answer). Output is fully deterministic, so benchmarks
+measure only the non-LLM path: tools, LangChain/LangGraph overhead and memory.
+"""
+
+import re
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from solar_tools import (
+    MONTH_NAMES,
+    city_coords,
+    parse_cities,
+    parse_month,
+    parse_seasonal_defaults,
+)
+
+_PREDICTION = re.compile(r"'prediction_kWh_kWp':\s*(?:np\.float\d*\()?(-?[\d.]+)")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for ChatOllama that drives the solar agent's tools.
+
+    Args:
+        latency_s: Artificial delay per model call, to emulate generation time.
+        default_month: Month used when the query does not mention one. Defaults to the current month.
+    """
+
+    latency_s: float = 0.0
+    default_month: Optional[int] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-solar"
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool schemas are not needed: the tool-calling script is fixed
+        return self
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        message = self._next_message(messages)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        # Only the current turn matters: everything after the last user message
+        last_human = max(
+            (i for i, m in enumerate(messages) if isinstance(m, HumanMessage)),
+            default=-1,
+        )
+        query = messages[last_human].content if last_human >= 0 else ""
+        turn = messages[last_human + 1 :]
+        step = sum(1 for m in turn if isinstance(m, AIMessage) and m.tool_calls)
+        tool_outputs = {m.tool_call_id: m.content for m in turn if isinstance(m, ToolMessage)}
+
+        cities = parse_cities(query)
+        if not cities:
+            return AIMessage(
+                content="Which city or location in Australia would you like a solar prediction for?"
+            )
+        month = parse_month(query, self.default_month)
+
+        if step == 0:
+            calls = [("lookup_location", {"city": city}) for city in cities]
+        elif step == 1:
+            calls = [
+                (
+                    "get_seasonal_weather_defaults",
+                    {
+                        "month": month,
+                        "Latitude": float(city_coords[city][0]),
+                        "Longitude": float(city_coords[city][1]),
+                    },
+                )
+                for city in cities
+            ]
+        elif step == 2:
+            calls = []
+            for i, city in enumerate(cities):
+                params = parse_seasonal_defaults(tool_outputs.get(f"call_1_{i}", ""))
+                params["Latitude"] = float(city_coords[city][0])
+                params["Longitude"] = float(city_coords[city][1])
+                calls.append(("predict_solar_output", params))
+        else:
+            lines = []
+            for i, city in enumerate(cities):
+                match = _PREDICTION.search(tool_outputs.get(f"call_2_{i}", ""))
+                value = match.group(1) if match else "unavailable"
+                lines.append(
+                    f"Predicted solar output for {city} in {MONTH_NAMES[month - 1]}: {value} kWh/kWp per day."
+                )
+            return AIMessage(content="\n".join(lines))
+
+        return AIMessage(
+            content="",
+            tool_calls=[
+                {"name": name, "args": args, "id": f"call_{step}_{i}", "type": "tool_call"}
+                for i, (name, args) in enumerate(calls)
+            ],
+        )
@@ -1,7 +1,131 @@
+import numpy as np
 import pandas as pd
 import pickle
 import os
 
+# Weather features covered by the seasonal defaults table.
+# Location (Latitude/Longitude) and the month encoding are supplied by the caller.
+SEASONAL_FEATURES = [
+    "MinTemp",
+    "MaxTemp",
+    "Rainfall",
+    "Evaporation",
+    "Sunshine",
+    "WindGustSpeed",
+    "WindSpeed9am",
+    "WindSpeed3pm",
+    "Humidity9am",
+    "Humidity3pm",
+    "Pressure9am",
+    "Pressure3pm",
+    "Cloud9am",
+    "Cloud3pm",
+    "Temp9am",
+    "Temp3pm",
+    "RainToday",
+]
+
+SEASONAL_DEFAULTS_FILE = "seasonal_defaults.npz"
+
+
+class SeasonalDefaultsTable:
+    """
+    Precomputed (location x month x feature) table of typical weather conditions.
+
+    Values are per-station monthly quantiles (medians by default) of the weather dataset,
+    so a lookup is a single array index instead of a dataset scan.
+    """
+
+    def __init__(self, locations, coords, features, values):
+        self.locations = np.asarray(locations)
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.features = [str(f) for f in features]
+        self.values = np.asarray(values, dtype=np.float32)
+        self._index = {str(name).lower(): i for i, name in enumerate(self.locations)}
+
+    @classmethod
+    def from_dataframe(cls, df, quantile=0.5):
+        """
+        Builds the table from the modeling dataset (one row per location and day).
+
+        Args:
+            df: DataFrame with Location, Month, Latitude, Longitude and weather feature columns.
+            quantile: Quantile used to summarise each (location, month) group. 0.5 is the median.
+
+        Returns:
+            SeasonalDefaultsTable
+        """
+        features = [f for f in SEASONAL_FEATURES if f in df.columns]
+        grouped = df.groupby(["Location", "Month"])[features].quantile(quantile)
+
+        locations = sorted(df["Location"].unique())
+        coords = (
+            df.groupby("Location")[["Latitude", "Longitude"]].first().loc[locations]
+        ).to_numpy()
+
+        full_index = pd.MultiIndex.from_product(
+            [locations, range(1, 13)], names=["Location", "Month"]
+        )
+        values = grouped.reindex(full_index).to_numpy(dtype=np.float32)
+        values = values.reshape(len(locations), 12, len(features))
+
+        # Stations with no observations for a month take the national value for that month
+        national = np.nanmedian(values, axis=0, keepdims=True)
+        values = np.where(np.isnan(values), national, values)
+
+        if "RainToday" in features:
+            rain_idx = features.index("RainToday")
+            values[:, :, rain_idx] = np.round(values[:, :, rain_idx])
+
+        return cls(locations, coords, features, values)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["locations"], data["coords"], data["features"], data["values"]
+            )
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            locations=self.locations.astype(str),
+            coords=self.coords,
+            features=np.asarray(self.features, dtype=str),
+            values=self.values,
+        )
+
+    def nearest_station(self, latitude, longitude):
+        """Returns the index of the station closest (great-circle distance) to the coordinates."""
+        lat1, lon1 = np.radians(latitude), np.radians(longitude)
+        lat2, lon2 = np.radians(self.coords[:, 0]), np.radians(self.coords[:, 1])
+        a = (
+            np.sin((lat2 - lat1) / 2) ** 2
+            + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        )
+        return int(np.argmin(a))
+
+    def lookup(self, month, latitude=None, longitude=None, location=None):
+        """
+        Returns (station_name, defaults_dict) for a month and a location.
+
+        The location is resolved by station name first, then by nearest station to the
+        given coordinates. Returns None if neither is provided.
+        """
+        idx = None
+        if location is not None:
+            idx = self._index.get(str(location).lower())
+        if idx is None and latitude is not None and longitude is not None:
+            idx = self.nearest_station(latitude, longitude)
+        if idx is None:
+            return None
+
+        row = self.values[idx, month - 1]
+        defaults = {name: float(value) for name, value in zip(self.features, row)}
+        if "RainToday" in defaults:
+            defaults["RainToday"] = int(defaults["RainToday"])
+        return str(self.locations[idx]), defaults
+
 
 class SolarModels:
     def __init__(self):
@@ -9,12 +133,14 @@ class SolarModels:
         self.xgb_model = None
         self.feature_columns = []
         self.medians = {}
+        self.seasonal_defaults = None
         self.loaded = False
 
     def load(self, base_path="."):
         print("Loading data and models...")
 
         # Load dataset medians
+        df = None
         try:
             df = pd.read_csv(os.path.join(base_path, "solar_weather_dataset.csv"))
             self.medians = df.median(numeric_only=True)
@@ -23,6 +149,22 @@ class SolarModels:
             print(f"Warning: Could not load dataset for medians: {e}")
             self.medians = {}
 
+        # Load (or build and cache) the per-location seasonal defaults table
+        defaults_path = os.path.join(base_path, SEASONAL_DEFAULTS_FILE)
+        try:
+            if os.path.exists(defaults_path):
+                self.seasonal_defaults = SeasonalDefaultsTable.load(defaults_path)
+            elif df is not None:
+                self.seasonal_defaults = SeasonalDefaultsTable.from_dataframe(df)
+                self.seasonal_defaults.save(defaults_path)
+            if self.seasonal_defaults is not None:
+                print(
+                    f"Seasonal defaults loaded for {len(self.seasonal_defaults.locations)} locations."
+                )
+        except Exception as e:
+            print(f"Warning: Could not load seasonal defaults table: {e}")
+            self.seasonal_defaults = None
+
         # Load feature names
         try:
             with open(os.path.join(base_path, "model_features.pkl"), "rb") as f:
@@ -0,0 +1,255 @@
+"""
+Response cache for the Solar Prediction Agent.
+
+Answers are stored under a normalized intent tuple (resolved cities, month, weather overrides)
+extracted from the tool calls the agent actually made. Incoming queries are mapped to that
+intent without calling the LLM: a cheap parse of the query (cities + month/season/"today")
+is aliased to the intent the agent resolved for an earlier query with the same parse, so
+paraphrases such as "solar output for Sydney today" and "how much solar in Sydney now" share
+one entry. An optional embedding function adds similarity matching for queries the parser
+cannot resolve.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+from langchain_core.messages import AIMessage, ToolMessage
+from solar_tools import (
+    SEASON_MONTH,
+    city_coords,
+    find_month,
+    parse_cities,
+    parse_seasonal_defaults,
+)
+
+# Words that imply user-specified weather conditions: such queries are never served from cache
+_OVERRIDE_HINTS = re.compile(
+    r"\d|°|\b(degrees?|temperature|sunny|sunshine|cloudy|clouds?|rain|rainy|raining|wind|windy"
+    r"|humid|humidity|hot|cold|warm|cool|storm|stormy|pressure)\b"
+)
+_CITY_NAMES = {name.lower(): name for name in city_coords}
+
+
+def query_signature(query, now=None):
+    """
+    Cheap, LLM-free parse of a query into (cities, temporal) or None if not cacheable.
+
+    temporal is ("month", n) for an explicit month or "today"/unspecified (current month),
+    or ("season", name) for a season the agent resolves to a month itself.
+    """
+    cities = parse_cities(query)
+    if not cities:
+        return None
+    # Strip city names before looking for month names and override hints
+    stripped = query.lower()
+    for city in cities:
+        stripped = stripped.replace(city.lower(), " ")
+
+    temporal = None
+    month = find_month(stripped)
+    if month is not None:
+        temporal = ("month", month)
+    else:
+        for season in SEASON_MONTH:
+            if season in stripped:
+                temporal = ("season", season)
+                break
+    if temporal is None:
+        temporal = ("month", (now or datetime.now()).month)
+
+    if _OVERRIDE_HINTS.search(stripped):
+        return None
+    return (tuple(sorted(cities)), temporal)
+
+
+def intent_from_messages(messages):
+    """
+    Extracts the normalized intent (cities, month, overrides) from the tool calls of one turn.
+
+    Overrides are predict_solar_output arguments that differ from the seasonal defaults the
+    agent fetched. Returns None if the turn did not end in a prediction.
+    """
+    tool_outputs = {m.tool_call_id: m.content for m in messages if isinstance(m, ToolMessage)}
+    cities, months, defaults, predictions = set(), set(), {}, []
+
+    for message in messages:
+        if not isinstance(message, AIMessage):
+            continue
+        for call in message.tool_calls or []:
+            args = call.get("args", {})
+            if call["name"] == "lookup_location":
+                city = _CITY_NAMES.get(str(args.get("city", "")).lower().strip())
+                if city:
+                    cities.add(city)
+            elif call["name"] == "get_seasonal_weather_defaults":
+                if args.get("month") is not None:
+                    months.add(int(args["month"]))
+                defaults.update(parse_seasonal_defaults(tool_outputs.get(call.get("id"), "")))
+            elif call["name"] == "predict_solar_output":
+                predictions.append(args)
+
+    if not cities or len(months) != 1 or not predictions:
+        return None
+
+    overrides = set()
+    for args in predictions:
+        for name, value in args.items():
+            if name in ("Latitude", "Longitude", "month_sin", "month_cos") or value is None:
+                continue
+            if name not in defaults or abs(float(value) - defaults[name]) > 1e-6:
+                overrides.add((name, round(float(value), 3)))
+    return (tuple(sorted(cities)), months.pop(), tuple(sorted(overrides)))
+
+
+def final_answer(messages):
+    """Returns the content of the last AI message without tool calls, or None."""
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and not message.tool_calls and message.content:
+            return message.content
+    return None
+
+
+class ResponseCache:
+    """
+    TTL + size-bounded LRU cache of agent answers keyed by normalized intent.
+
+    Args:
+        max_entries: Maximum number of cached answers; least recently used are evicted first.
+        ttl_s: Seconds an answer stays valid.
+        embed_fn: Optional callable mapping text to a vector (e.g. OllamaEmbeddings().embed_query)
+            for similarity matching of queries the parser cannot resolve.
+        similarity_threshold: Minimum cosine similarity for an embedding match.
+    """
+
+    def __init__(self, max_entries=256, ttl_s=3600, embed_fn=None, similarity_threshold=0.92):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()  # intent -> (answer, stored_at)
+        self._aliases = {}  # query signature -> intent
+        self._vectors = []  # (unit vector, intent) for similarity matching
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def _embed(self, text):
+        vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _live_entry(self, intent, now):
+        entry = self._entries.get(intent)
+        if entry is None:
+            return None
+        if now - entry[1] > self.ttl_s:
+            self._remove(intent)
+            self.stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(intent)
+        return entry[0]
+
+    def _remove(self, intent):
+        self._entries.pop(intent, None)
+        self._aliases = {k: v for k, v in self._aliases.items() if v != intent}
+        self._vectors = [(vec, i) for vec, i in self._vectors if i != intent]
+
+    def get(self, query):
+        """Returns the cached answer for the query, or None on a miss."""
+        signature = query_signature(query)
+        vector = None
+        if signature is None and self.embed_fn is not None and not _OVERRIDE_HINTS.search(query.lower()):
+            vector = self._embed(query)
+
+        with self._lock:
+            now = time.monotonic()
+            if signature is not None and signature in self._aliases:
+                answer = self._live_entry(self._aliases[signature], now)
+                if answer is not None:
+                    self.stats["hits"] += 1
+                    return answer
+            elif vector is not None and self._vectors:
+                matrix = np.stack([vec for vec, _ in self._vectors])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    answer = self._live_entry(self._vectors[best][1], now)
+                    if answer is not None:
+                        self.stats["hits"] += 1
+                        self.stats["semantic_hits"] += 1
+                        return answer
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query, turn_messages):
+        """
+        Stores the answer of an agent turn if its intent can be resolved, agrees with the query
+        and uses no weather overrides.
+
+        Args:
+            query: The user query of the turn.
+            turn_messages: Messages produced by the agent for this turn (after the user message).
+
+        Returns:
+            True if the answer was cached.
+        """
+        intent = intent_from_messages(turn_messages)
+        answer = final_answer(turn_messages)
+        if intent is None or answer is None:
+            return False
+        # Overrides may come from earlier turns of the conversation rather than this query, so
+        # a plain query (signature or embedding) must not be aliased to them
+        if intent[2]:
+            return False
+
+        signature = query_signature(query)
+        if signature is not None:
+            cities, temporal = signature
+            # Only alias the query if the agent resolved the same cities and month
+            if cities != intent[0] or (temporal[0] == "month" and temporal[1] != intent[1]):
+                return False
+        elif self.embed_fn is None or _OVERRIDE_HINTS.search(query.lower()):
+            return False
+        vector = self._embed(query) if self.embed_fn is not None else None
+
+        with self._lock:
+            self._entries[intent] = (answer, time.monotonic())
+            self._entries.move_to_end(intent)
+            if signature is not None:
+                self._aliases[signature] = intent
+            if vector is not None:
+                self._vectors.append((vector, intent))
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats["evictions"] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+            self._vectors.clear()
+
+    def metrics(self):
+        """Returns hit/miss counters, hit rate and current size."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+            }
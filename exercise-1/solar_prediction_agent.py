@@ -3,12 +3,16 @@ Solar Prediction Agent using LangChain's create_agent.
 """
 
 import os
+import threading
+import time
 from datetime import datetime
 
+import httpx
 from dotenv import load_dotenv
 from langchain.agents import create_agent
 from langchain_ollama import ChatOllama
 from solar_tools import (
+    get_season,
     get_seasonal_weather_defaults,
     lookup_location,
     predict_solar_output,
@@ -17,6 +21,53 @@ from solar_tools import (
 # Load environment variables
 load_dotenv()
 
+SEASON_MONTHS = {
+    "Summer": "Dec-Feb",
+    "Autumn": "Mar-May",
+    "Winter": "Jun-Aug",
+    "Spring": "Sep-Nov",
+}
+
+# Fixed sample queries shared by test_agent.py, the Gradio examples and benchmark_agent.py
+SAMPLE_QUERIES = [
+    "What is the solar output if the temperature is 30 degrees and it's sunny in Albury?",
+    "What's the solar output for Sydney today?",
+    "How much solar power can I generate in Canberra during summer?",
+    "Which has better solar potential today: Darwin or Hobart?",
+    "I'm installing solar panels in Newcastle - what can I expect on a typical February day?",
+]
+
+_http_transport = None
+_http_transport_lock = threading.Lock()
+
+
+def get_http_transport():
+    """
+    Returns the process-wide pooled HTTP transport for Ollama requests.
+
+    Every ChatOllama client created by this module is built on this transport, so they
+    share one keep-alive connection pool instead of each opening their own.
+    """
+    global _http_transport
+    with _http_transport_lock:
+        if _http_transport is None:
+            _http_transport = httpx.HTTPTransport(
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8)
+            )
+        return _http_transport
+
+
+def parse_keep_alive(value):
+    """
+    Converts a keep_alive setting to the form Ollama accepts.
+
+    Ollama reads strings as Go durations, which need a unit ("30m", "24h"), so numeric
+    strings such as "-1" (keep loaded) or "300" from the environment are passed as seconds.
+    """
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value)
+    return value
+
 
 class SolarPredictionAgent:
     """
@@ -24,18 +75,31 @@ class SolarPredictionAgent:
     Uses LangChain's create_agent with Ollama LLM.
     """
 
-    def __init__(self, model_name=None, base_url=None):
+    def __init__(
+        self, model_name=None, base_url=None, llm=None, keep_alive=None, warm_up=False
+    ):
         """
         Initialize the Solar Prediction Agent.
 
         Args:
             model_name: Name of the Ollama model to use. Defaults to OLLAMA_LLM from .env or "qwen2.5:7b".
             base_url: Base URL for Ollama API. Defaults to OLLAMA_BASE_URL from .env.
+            llm: Optional pre-built chat model to use instead of ChatOllama
+                (e.g. mock_llm.ScriptedChatModel for offline benchmarks).
+            keep_alive: How long Ollama keeps the model loaded after a request (e.g. "30m", -1 for forever,
+                0 to unload at once). Defaults to OLLAMA_KEEP_ALIVE from .env or "30m".
+            warm_up: If True, build() sends priming requests so the first user query does not pay
+                for model load and connection setup.
         """
         self.model_name = model_name or os.getenv("OLLAMA_LLM", "qwen2.5:7b")
         self.base_url = base_url or os.getenv("OLLAMA_BASE_URL")
-        self.llm = None
+        if keep_alive is None:
+            keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        self.keep_alive = parse_keep_alive(keep_alive)
+        self.warm_up_on_build = warm_up
+        self.llm = llm
         self.agent = None
+        self.startup_metrics = {}
 
     def build(self):
         """
@@ -44,23 +108,29 @@ class SolarPredictionAgent:
         Returns:
             The created agent executor.
         """
-        self.llm = ChatOllama(
-            model=self.model_name, temperature=0, base_url=self.base_url
-        )
+        if self.llm is None:
+            self.llm = ChatOllama(
+                model=self.model_name,
+                temperature=0,
+                base_url=self.base_url,
+                keep_alive=self.keep_alive,
+                sync_client_kwargs={"transport": get_http_transport()},
+            )
         current_date = datetime.now().strftime("%B %d, %Y")
+        season = get_season(datetime.now().month)
 
         # Create system prompt that instructs the agent to ask for location and month
         system_message = f"""You are a Solar Prediction Assistant for locations in Australia.
 
 CURRENT DATE: {current_date}
 CURRENT MONTH: {datetime.now().month}
-CURRENT SEASON IN AUSTRALIA: {'Summer (Dec-Feb)' if datetime.now().month in [12, 1, 2] else 'Autumn (Mar-May)' if datetime.now().month in [3, 4, 5] else 'Winter (Jun-Aug)' if datetime.now().month in [6, 7, 8] else 'Spring (Sep-Nov)'}
+CURRENT SEASON IN AUSTRALIA: {season} ({SEASON_MONTHS[season]})
 
 IMPORTANT WORKFLOW:
 1. If location is not provided, ask the user which city/location in Australia they want predictions for.
 2. Use the lookup_location tool to validate and get coordinates for the location.
 3. If month is not provided, ask the user which month they want the prediction for (or assume current month).
-4. Use the get_seasonal_weather_defaults tool with the month to get typical weather conditions for that season.
+4. Use the get_seasonal_weather_defaults tool with the month and the location's Latitude/Longitude to get typical weather conditions for that location and month.
 5. Present the seasonal defaults to the user and ask if they want to:
    a) Use these default values for the prediction
    b) Provide their own specific weather parameters
@@ -68,7 +138,7 @@ IMPORTANT WORKFLOW:
 6. Finally, use the predict_solar_output tool with either the defaults or user-provided values.
 
 Notes:
-- The get_seasonal_weather_defaults tool provides realistic weather parameters based on Australian seasons
+- The get_seasonal_weather_defaults tool provides realistic weather parameters for the nearest weather station and month
 - If the user provides specific weather parameters, use those instead of defaults
 - If the user provides a location and/or month in their initial query, use them directly
 - Be helpful and guide users through the process
@@ -83,8 +153,53 @@ Notes:
             ],
             system_prompt=system_message,
         )
+
+        if self.warm_up_on_build:
+            self.warm_up()
+
         return self.agent
 
+    def warm_up(self):
+        """
+        Primes the model so it is loaded in Ollama memory and the HTTP connection is open.
+
+        Sends two single-token requests: the first measures the cold first-response latency
+        (model load + connection setup), the second the warm latency.
+
+        Returns:
+            dict with cold_first_response_s and warm_first_response_s.
+        """
+        if self.agent is None:
+            self.build()
+            if self.startup_metrics:
+                return self.startup_metrics
+
+        # Single-token generation; the copy shares the underlying client and keep_alive
+        primer = (
+            self.llm.model_copy(update={"num_predict": 1})
+            if isinstance(self.llm, ChatOllama)
+            else self.llm
+        )
+
+        timings = []
+        for _ in range(2):
+            start = time.perf_counter()
+            try:
+                primer.invoke("Hi")
+            except Exception as e:
+                print(f"Warning: Model warm-up failed: {e}")
+                return self.startup_metrics
+            timings.append(time.perf_counter() - start)
+
+        self.startup_metrics = {
+            "cold_first_response_s": timings[0],
+            "warm_first_response_s": timings[1],
+        }
+        print(
+            f"Model warm-up: cold first response {timings[0]:.2f}s, warm {timings[1]:.2f}s"
+        )
+        return self.startup_metrics
+
     def get_agent(self):
         """
         Get the agent, building it if necessary.
@@ -1,3 +1,7 @@
+import re
+from datetime import datetime
+from typing import List, Optional
+
 import numpy as np
 import pandas as pd
 from langchain_core.tools import tool
@@ -58,17 +62,205 @@ city_coords = {
 }
 
 
+MONTH_NAMES = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
+# National seasonal defaults for Australia, used when no location is given or the
+# per-location seasonal defaults table (see model_utils.SeasonalDefaultsTable) is unavailable.
+# Summer: Dec, Jan, Feb (12, 1, 2)
+# Autumn: Mar, Apr, May (3, 4, 5)
+# Winter: Jun, Jul, Aug (6, 7, 8)
+# Spring: Sep, Oct, Nov (9, 10, 11)
+NATIONAL_SEASONAL_DEFAULTS = {
+    "Summer": {
+        "MinTemp": 20.0,
+        "MaxTemp": 30.0,
+        "Rainfall": 2.0,
+        "Evaporation": 8.0,
+        "Sunshine": 10.0,
+        "WindGustSpeed": 40.0,
+        "WindSpeed9am": 15.0,
+        "WindSpeed3pm": 20.0,
+        "Humidity9am": 65.0,
+        "Humidity3pm": 50.0,
+        "Pressure9am": 1013.0,
+        "Pressure3pm": 1011.0,
+        "Cloud9am": 3.0,
+        "Cloud3pm": 4.0,
+        "Temp9am": 24.0,
+        "Temp3pm": 28.0,
+        "RainToday": 0,
+    },
+    "Autumn": {
+        "MinTemp": 14.0,
+        "MaxTemp": 23.0,
+        "Rainfall": 3.0,
+        "Evaporation": 5.0,
+        "Sunshine": 7.0,
+        "WindGustSpeed": 35.0,
+        "WindSpeed9am": 12.0,
+        "WindSpeed3pm": 18.0,
+        "Humidity9am": 70.0,
+        "Humidity3pm": 55.0,
+        "Pressure9am": 1015.0,
+        "Pressure3pm": 1013.0,
+        "Cloud9am": 4.0,
+        "Cloud3pm": 5.0,
+        "Temp9am": 18.0,
+        "Temp3pm": 22.0,
+        "RainToday": 0,
+    },
+    "Winter": {
+        "MinTemp": 8.0,
+        "MaxTemp": 17.0,
+        "Rainfall": 5.0,
+        "Evaporation": 2.0,
+        "Sunshine": 6.0,
+        "WindGustSpeed": 35.0,
+        "WindSpeed9am": 10.0,
+        "WindSpeed3pm": 15.0,
+        "Humidity9am": 75.0,
+        "Humidity3pm": 60.0,
+        "Pressure9am": 1020.0,
+        "Pressure3pm": 1018.0,
+        "Cloud9am": 5.0,
+        "Cloud3pm": 6.0,
+        "Temp9am": 12.0,
+        "Temp3pm": 16.0,
+        "RainToday": 0,
+    },
+    "Spring": {
+        "MinTemp": 12.0,
+        "MaxTemp": 22.0,
+        "Rainfall": 3.0,
+        "Evaporation": 6.0,
+        "Sunshine": 8.0,
+        "WindGustSpeed": 38.0,
+        "WindSpeed9am": 13.0,
+        "WindSpeed3pm": 19.0,
+        "Humidity9am": 68.0,
+        "Humidity3pm": 52.0,
+        "Pressure9am": 1016.0,
+        "Pressure3pm": 1014.0,
+        "Cloud9am": 4.0,
+        "Cloud3pm": 4.0,
+        "Temp9am": 16.0,
+        "Temp3pm": 21.0,
+        "RainToday": 0,
+    },
+}
+
+
+def get_season(month: int) -> str:
+    """Returns the Australian season name for a month number (1-12)."""
+    if month in [12, 1, 2]:
+        return "Summer"
+    elif month in [3, 4, 5]:
+        return "Autumn"
+    elif month in [6, 7, 8]:
+        return "Winter"
+    return "Spring"
+
+
+# Representative month for each Australian season (mid-season)
+SEASON_MONTH = {"summer": 1, "autumn": 4, "winter": 7, "spring": 10}
+
+_DEFAULT_LINE = re.compile(r"^\s+(\w+):\s+(-?\d+(?:\.\d+)?)\s*$")
+
+
+def _month_pattern(name):
+    """Regex for a month's full name or three-letter abbreviation in lowercase text.
+
+    "may" and "mar" are also ordinary words ("May I ...", "clouds may ..."), so they only
+    count after a month cue ("in may", "of mar"), next to a day number ("may 5", "5th may")
+    or at the end of the query.
+    """
+    full, short = name.lower(), name[:3].lower()
+    if short not in ("may", "mar"):
+        return re.compile(rf"\b({full}|{short})\b")
+    alternatives = [] if full == short else [rf"\b{full}\b"]
+    alternatives += [
+        rf"\b(in|during|of|for|early|mid|late|next|last|until|by)\s+{short}\b",
+        rf"\b{short}\s+\d{{1,2}}(st|nd|rd|th)?\b",
+        rf"\b\d{{1,2}}(st|nd|rd|th)?\s+{short}\b",
+        rf"\b{short}\W*$",
+    ]
+    return re.compile("|".join(alternatives))
+
+
+_MONTH_PATTERNS = [(i, _month_pattern(name)) for i, name in enumerate(MONTH_NAMES, 1)]
+
+
+def find_month(text: str) -> Optional[int]:
+    """Returns the month named in lowercase text (see _month_pattern), else None."""
+    for month, pattern in _MONTH_PATTERNS:
+        if pattern.search(text):
+            return month
+    return None
+
+
+def parse_cities(query: str) -> List[str]:
+    """Returns the known cities mentioned in the query, in order of appearance."""
+    query_lower = query.lower()
+    found = []
+    for city in city_coords:
+        match = re.search(rf"\b{re.escape(city.lower())}\b", query_lower)
+        if match:
+            found.append((match.start(), city))
+    return [city for _, city in sorted(found)]
+
+
+def parse_month(query: str, default_month: Optional[int] = None) -> int:
+    """Returns the month referenced by the query (name or season), else the default/current month."""
+    query_lower = query.lower()
+    month = find_month(query_lower)
+    if month is not None:
+        return month
+    for season, month in SEASON_MONTH.items():
+        if season in query_lower:
+            return month
+    return default_month or datetime.now().month
+
+
+def parse_seasonal_defaults(tool_output: str) -> dict:
+    """Parses the parameter lines of a get_seasonal_weather_defaults tool output."""
+    params = {}
+    for line in tool_output.splitlines():
+        match = _DEFAULT_LINE.match(line)
+        if match:
+            name, value = match.groups()
+            params[name] = int(float(value)) if name == "RainToday" else float(value)
+    return params
+
+
 @tool
-def get_seasonal_weather_defaults(month: int = None) -> str:
+def get_seasonal_weather_defaults(
+    month: int = None, Latitude: float = None, Longitude: float = None
+) -> str:
     """
-    Returns typical weather conditions for Australia based on the month/season.
+    Returns typical weather conditions for a location in Australia based on the month/season.
     Use this tool to get default weather parameters when specific conditions are not provided.
 
     Args:
         month: Month number (1-12). If not provided, will ask user to specify.
+        Latitude: Location latitude (use lookup_location tool to get this from city name).
+        Longitude: Location longitude (use lookup_location tool to get this from city name).
 
     Returns:
-        A string with seasonal information and typical weather parameter defaults for Australia.
+        A string with seasonal information and typical weather parameter defaults for the
+        nearest weather station, or national defaults for Australia if no location is given.
     """
     if month is None:
         return "Please provide a month number (1-12, where 1=January, 12=December) to get seasonal weather defaults."
@@ -78,128 +270,39 @@ def get_seasonal_weather_defaults(month: int = None) -> str:
             f"Invalid month: {month}. Please provide a month number between 1 and 12."
         )
 
-    # Define seasonal defaults for Australia
-    # Summer: Dec, Jan, Feb (12, 1, 2)
-    # Autumn: Mar, Apr, May (3, 4, 5)
-    # Winter: Jun, Jul, Aug (6, 7, 8)
-    # Spring: Sep, Oct, Nov (9, 10, 11)
-
-    month_names = [
-        "January",
-        "February",
-        "March",
-        "April",
-        "May",
-        "June",
-        "July",
-        "August",
-        "September",
-        "October",
-        "November",
-        "December",
-    ]
+    # Lazily load resources if not loaded
+    if not resources.loaded:
+        resources.load()
+
+    season = get_season(month)
+
+    station_defaults = None
+    if (
+        resources.seasonal_defaults is not None
+        and Latitude is not None
+        and Longitude is not None
+    ):
+        station_defaults = resources.seasonal_defaults.lookup(
+            month, latitude=Latitude, longitude=Longitude
+        )
+
+    if station_defaults:
+        station, defaults = station_defaults
+        region = f"near {station} (nearest weather station)"
+    else:
+        defaults = dict(NATIONAL_SEASONAL_DEFAULTS[season])
+        region = "in Australia"
 
     # Calculate cyclical encoding for the month
-    month_sin = np.sin(2 * np.pi * month / 12)
-    month_cos = np.cos(2 * np.pi * month / 12)
-
-    if month in [12, 1, 2]:  # Summer
-        season = "Summer"
-        defaults = {
-            "MinTemp": 20.0,
-            "MaxTemp": 30.0,
-            "Rainfall": 2.0,
-            "Evaporation": 8.0,
-            "Sunshine": 10.0,
-            "WindGustSpeed": 40.0,
-            "WindSpeed9am": 15.0,
-            "WindSpeed3pm": 20.0,
-            "Humidity9am": 65.0,
-            "Humidity3pm": 50.0,
-            "Pressure9am": 1013.0,
-            "Pressure3pm": 1011.0,
-            "Cloud9am": 3.0,
-            "Cloud3pm": 4.0,
-            "Temp9am": 24.0,
-            "Temp3pm": 28.0,
-            "RainToday": 0,
-            "month_sin": month_sin,
-            "month_cos": month_cos,
-        }
-    elif month in [3, 4, 5]:  # Autumn
-        season = "Autumn"
-        defaults = {
-            "MinTemp": 14.0,
-            "MaxTemp": 23.0,
-            "Rainfall": 3.0,
-            "Evaporation": 5.0,
-            "Sunshine": 7.0,
-            "WindGustSpeed": 35.0,
-            "WindSpeed9am": 12.0,
-            "WindSpeed3pm": 18.0,
-            "Humidity9am": 70.0,
-            "Humidity3pm": 55.0,
-            "Pressure9am": 1015.0,
-            "Pressure3pm": 1013.0,
-            "Cloud9am": 4.0,
-            "Cloud3pm": 5.0,
-            "Temp9am": 18.0,
-            "Temp3pm": 22.0,
-            "RainToday": 0,
-            "month_sin": month_sin,
-            "month_cos": month_cos,
-        }
-    elif month in [6, 7, 8]:  # Winter
-        season = "Winter"
-        defaults = {
-            "MinTemp": 8.0,
-            "MaxTemp": 17.0,
-            "Rainfall": 5.0,
-            "Evaporation": 2.0,
-            "Sunshine": 6.0,
-            "WindGustSpeed": 35.0,
-            "WindSpeed9am": 10.0,
-            "WindSpeed3pm": 15.0,
-            "Humidity9am": 75.0,
-            "Humidity3pm": 60.0,
-            "Pressure9am": 1020.0,
-            "Pressure3pm": 1018.0,
-            "Cloud9am": 5.0,
-            "Cloud3pm": 6.0,
-            "Temp9am": 12.0,
-            "Temp3pm": 16.0,
-            "RainToday": 0,
-            "month_sin": month_sin,
-            "month_cos": month_cos,
-        }
-    else:  # Spring (9, 10, 11)
-        season = "Spring"
-        defaults = {
-            "MinTemp": 12.0,
-            "MaxTemp": 22.0,
-            "Rainfall": 3.0,
-            "Evaporation": 6.0,
-            "Sunshine": 8.0,
-            "WindGustSpeed": 38.0,
-            "WindSpeed9am": 13.0,
-            "WindSpeed3pm": 19.0,
-            "Humidity9am": 68.0,
-            "Humidity3pm": 52.0,
-            "Pressure9am": 1016.0,
-            "Pressure3pm": 1014.0,
-            "Cloud9am": 4.0,
-            "Cloud3pm": 4.0,
-            "Temp9am": 16.0,
-            "Temp3pm": 21.0,
-            "RainToday": 0,
-            "month_sin": month_sin,
-            "month_cos": month_cos,
-        }
-
-    result = f"Season: {season} ({month_names[month-1]})\n\nTypical weather conditions for {season} in Australia:\n"
+    defaults["month_sin"] = np.sin(2 * np.pi * month / 12)
+    defaults["month_cos"] = np.cos(2 * np.pi * month / 12)
+
+    result = f"Season: {season} ({MONTH_NAMES[month-1]})\n\nTypical weather conditions for {season} {region}:\n"
     for param, value in defaults.items():
         if param in ["month_sin", "month_cos"]:
             result += f"  {param}: {value:.6f}\n"
+        elif isinstance(value, float):
+            result += f"  {param}: {value:.1f}\n"
         else:
             result += f"  {param}: {value}\n"
 
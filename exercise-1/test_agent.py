@@ -4,9 +4,15 @@ Test script to verify the solar prediction agent functionality
 
 import os
 
+from agent_tracing import (
+    LatencyTracer,
+    export_jsonl,
+    export_prometheus,
+    format_breakdown,
+)
 from langchain_core.messages import HumanMessage
 from model_utils import resources
-from solar_prediction_agent import SolarPredictionAgent
+from solar_prediction_agent import SAMPLE_QUERIES, SolarPredictionAgent
 
 # Set working directory to exercise-1
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
@@ -17,31 +23,28 @@ resources.load(base_path=os.path.dirname(os.path.abspath(__file__)))
 
 # Initialize and build agent
 print("\nBuilding agent...")
-agent_instance = SolarPredictionAgent()
+agent_instance = SolarPredictionAgent(warm_up=True)
 agent = agent_instance.build()
 
 # Test queries
-test_queries = [
-    "What is the solar output if the temperature is 30 degrees and it's sunny in Albury?",
-    "What's the solar output for Sydney today?",
-    "How much solar power can I generate in Canberra during summer?",
-    "Which has better solar potential today: Darwin or Hobart?",
-    "I'm installing solar panels in Newcastle - what can I expect on a typical February day?",
-]
+test_queries = SAMPLE_QUERIES
 
 print("\n" + "=" * 80)
 print("Testing Solar Prediction Agent")
 print("=" * 80)
 
+traces = []
+
 for i, query in enumerate(test_queries, 1):
     print(f"\n{'='*80}")
     print(f"Test Query {i}: {query}")
     print(f"{'='*80}\n")
 
     messages = [HumanMessage(content=query)]
+    tracer = LatencyTracer(query=query)
 
     try:
-        result = agent.invoke({"messages": messages})
+        result = agent.invoke({"messages": messages}, config={"callbacks": [tracer]})
 
         # Display the final response
         if "messages" in result and result["messages"]:
@@ -57,6 +60,20 @@ for i, query in enumerate(test_queries, 1):
 
         traceback.print_exc()
 
+    traces.append(tracer.finish())
+
+# Latency breakdown: LLM generation vs tool execution vs agent framework overhead
+print("\n" + "=" * 80)
+print("Latency Breakdown")
+print("=" * 80)
+print(format_breakdown(traces))
+
+export_jsonl(traces, "traces/agent_traces.jsonl")
+export_prometheus(
+    traces, "traces/agent_metrics.prom", startup_metrics=agent_instance.startup_metrics
+)
+print("\nTraces written to traces/agent_traces.jsonl and traces/agent_metrics.prom")
+
 print("\n" + "=" * 80)
 print("Testing Complete")
 print("=" * 80)
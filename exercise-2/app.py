@@ -5,8 +5,10 @@ import os
 import gradio as gr
 from evaluator import Evaluator
 from pipelines import (
+    DirectVLMEntityPipeline,
     ImprovedMultimodalOCREntityAnalysisPipeline,
     ImprovedMultimodalOCRPipeline,
+    LayoutEntityPipeline,
     RawOCREntityAnalysisPipeline,
     RawOCRPipeline,
 )
@@ -21,6 +23,8 @@ pipelines = {
     "Improved OCR (Multimodal)": ImprovedMultimodalOCRPipeline(),
     "Raw OCR + Entity Analysis": RawOCREntityAnalysisPipeline(),
     "Improved OCR (Multimodal) + Entity Analysis": ImprovedMultimodalOCREntityAnalysisPipeline(),
+    "Direct VLM Entities": DirectVLMEntityPipeline(),
+    "Raw OCR + Layout Rules": LayoutEntityPipeline(),
 }
 evaluator = Evaluator(os.path.join(DATASET_PATH, "train"))
 
@@ -40,7 +44,7 @@ def process_pipeline(image_selection, pipeline_choice, run_evaluation):
     # Run the pipeline
     result = pipeline.process(image_path)
 
-    raw_text = result.get("raw_text", "")
+    raw_text = result.get("raw_text") or ""
     features = result.get("structured_data", {})
 
     # Load ground truth
@@ -1,19 +1,174 @@
 import json
 import os
 import re
+import threading
 from datetime import datetime
+from functools import lru_cache
 
-from jiwer import cer, wer
+import numpy as np
+from ground_truth_index import GroundTruthIndex
+from rapidfuzz.distance import Levenshtein
+from rapidfuzz.process import cpdist
+
+# Per-image metric keys and their labels in aggregated summaries
+SUMMARY_METRICS = {
+    "ocr_cer": "Average CER",
+    "ocr_wer": "Average WER",
+    "entity_accuracy": "Average Entity Accuracy",
+}
+
+# Per-image PipelineOutput["stats"] keys and their labels in aggregated summaries
+SUMMARY_STATS = {
+    "llm_calls": "Average LLM Calls",
+    "prompt_tokens": "Average Prompt Tokens",
+    "completion_tokens": "Average Completion Tokens",
+}
+
+_MULTIPLE_SPACES = re.compile(r"\s\s+")
+_PRICE_UNITS = re.compile(r"[RM$£€¥₹SGD,\s]", flags=re.IGNORECASE)
+_NON_PRICE = re.compile(r"[^\d.]")
+_DATE_SEPARATORS = re.compile(r"[()\s]+")
+_NON_DATE = re.compile(r"[^\d/-]")
+_LETTERS = re.compile(r"[A-Za-z]")
+
+# strptime formats, tried in order. Numeric formats can only match strings without letters
+# and month-name formats only strings with letters, so each string tries one group.
+_NUMERIC_DATE_FORMATS = [
+    '%d-%m-%Y', '%d/%m/%Y', '%Y-%m-%d',  # 14-06-2018, 11/05/2018, 2016-07-31
+    '%m/%d/%Y', '%m-%d-%Y',               # 03/22/2018 (American format)
+    '%d-%m-%y', '%d/%m/%y',               # 24/05/18
+    '%m/%d/%y', '%m-%d-%y',               # 03/22/18 (American format)
+]
+_MONTH_NAME_DATE_FORMATS = [
+    '%d %b %y', '%d %B %y',               # 15 JUN 18
+    '%d %b %Y', '%d %B %Y',               # 15 JUNE 2018
+    '%b %d, %Y', '%B %d, %Y',             # OCT 3, 2016
+    '%b %d %Y', '%B %d %Y',               # OCT 3 2016
+]
+
+
+@lru_cache(maxsize=8192)
+def normalize_price(price_str):
+    """
+    Normalize price strings by removing currency symbols and units.
+    Keeps only digits and decimal points.
+    """
+    # Remove common currency symbols and units
+    price_str = _PRICE_UNITS.sub("", price_str)
+    # Keep only digits and decimal point
+    return _NON_PRICE.sub("", price_str)
+
+
+def to_price(price_str):
+    """Price string as a float (see normalize_price), or None if it holds no valid number."""
+    try:
+        return float(normalize_price(price_str))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=8192)
+def normalize_date(date_str):
+    """
+    Normalize date strings to YYYY-MM-DD format.
+    Handles various formats: 14-06-2018, 11/05/2018, 15 JUN 18, OCT 3, 2016, etc.
+    """
+    if not date_str:
+        return ""
+
+    # Remove parentheses and extra whitespace
+    date_str = _DATE_SEPARATORS.sub(" ", date_str).strip()
+
+    formats = _MONTH_NAME_DATE_FORMATS if _LETTERS.search(date_str) else _NUMERIC_DATE_FORMATS
+    for fmt in formats:
+        try:
+            parsed = datetime.strptime(date_str, fmt)
+            return parsed.strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+
+    # If parsing fails, return cleaned version
+    return _NON_DATE.sub("", date_str).lower()
+
+
+@lru_cache(maxsize=4096)
+def _char_tokens(text):
+    """jiwer's default CER transform: strip, then one token per character."""
+    return text.strip()
+
+
+@lru_cache(maxsize=4096)
+def _word_tokens(text):
+    """jiwer's default WER transform: collapse whitespace runs, strip, split on spaces."""
+    return tuple(word for word in _MULTIPLE_SPACES.sub(" ", text).strip().split(" ") if word)
+
+
+def _rate(distance, reference, hypothesis):
+    # jiwer reports the number of insertions when the reference is empty
+    return distance / len(reference) if reference else len(hypothesis)
+
+
+def error_rates(pairs):
+    """
+    CER and WER of many (reference, hypothesis) text pairs.
+
+    Gives the same values as jiwer's cer() and wer() with their default transforms, using
+    RapidFuzz's Levenshtein distance over all pairs at once (multi-threaded) and cached
+    tokenization.
+
+    Args:
+        pairs (List[Tuple[str, str]]): (ground truth text, predicted text) pairs.
+
+    Returns:
+        List[Tuple[float, float]]: (CER, WER) per pair.
+    """
+    if not pairs:
+        return []
+    references = [reference for reference, _ in pairs]
+    hypotheses = [hypothesis for _, hypothesis in pairs]
+    ref_chars = [_char_tokens(text) for text in references]
+    hyp_chars = [_char_tokens(text) for text in hypotheses]
+    ref_words = [_word_tokens(text) for text in references]
+    hyp_words = [_word_tokens(text) for text in hypotheses]
+    char_distances = cpdist(ref_chars, hyp_chars, scorer=Levenshtein.distance, workers=-1)
+    word_distances = cpdist(ref_words, hyp_words, scorer=Levenshtein.distance, workers=-1)
+    return [
+        (
+            _rate(int(char_distances[i]), ref_chars[i], hyp_chars[i]),
+            _rate(int(word_distances[i]), ref_words[i], hyp_words[i]),
+        )
+        for i in range(len(pairs))
+    ]
 
 
 class Evaluator:
-    def __init__(self, dataset_dir):
+    def __init__(self, dataset_dir, use_index=True, index_dir=None):
         """
         dataset_dir: path to 'train' directory, containing 'box' and 'entities' folders.
+        use_index: read ground truth from a memory-mapped GroundTruthIndex (built on first
+            use, refreshed when files change) instead of parsing the files on every call.
+        index_dir: where the index is stored (default: under GT_INDEX_DIR or .cache/ground_truth).
         """
         self.dataset_dir = dataset_dir
         self.box_dir = os.path.join(dataset_dir, "box")
         self.entities_dir = os.path.join(dataset_dir, "entities")
+        self.use_index = use_index
+        self.index_dir = index_dir
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def index(self):
+        """The GroundTruthIndex of the dataset, or None if indexing is disabled or failed."""
+        if self._index is None and self.use_index:
+            with self._index_lock:
+                if self._index is None and self.use_index:
+                    try:
+                        self._index = GroundTruthIndex(self.dataset_dir, self.index_dir)
+                    except Exception as e:
+                        print(f"Error building ground truth index, parsing files instead: {e}")
+                        self.use_index = False
+        return self._index
 
     def load_ground_truth(self, filename):
         """
@@ -23,6 +178,12 @@ class Evaluator:
         basename = os.path.basename(filename)
         txt_name = os.path.splitext(basename)[0] + ".txt"
 
+        index = self.index
+        if index is not None:
+            entry = index.get(basename)
+            if entry is not None:
+                return {"ocr_text": entry["ocr_text"], "entities": entry["entities"]}
+
         ocr_gt = self._load_ocr_gt(txt_name)
         entities_gt = self._load_entities_gt(txt_name)
 
@@ -52,106 +213,154 @@ class Evaluator:
         Normalize price strings by removing currency symbols and units.
         Keeps only digits and decimal points.
         """
-        # Remove common currency symbols and units
-        price_str = re.sub(r'[RM$£€¥₹SGD,\s]', '', price_str, flags=re.IGNORECASE)
-        # Keep only digits and decimal point
-        price_str = re.sub(r'[^\d.]', '', price_str)
-        return price_str
+        return normalize_price(price_str)
 
     def _normalize_date(self, date_str):
         """
         Normalize date strings to YYYY-MM-DD format.
         Handles various formats: 14-06-2018, 11/05/2018, 15 JUN 18, OCT 3, 2016, etc.
         """
-        if not date_str:
-            return ""
-        
-        # Remove parentheses and extra whitespace
-        date_str = re.sub(r'[()\s]+', ' ', date_str).strip()
-        
-        # Try various date formats
-        formats = [
-            '%d-%m-%Y', '%d/%m/%Y', '%Y-%m-%d',  # 14-06-2018, 11/05/2018, 2016-07-31
-            '%m/%d/%Y', '%m-%d-%Y',               # 03/22/2018 (American format)
-            '%d-%m-%y', '%d/%m/%y',               # 24/05/18
-            '%m/%d/%y', '%m-%d-%y',               # 03/22/18 (American format)
-            '%d %b %y', '%d %B %y',               # 15 JUN 18
-            '%d %b %Y', '%d %B %Y',               # 15 JUNE 2018
-            '%b %d, %Y', '%B %d, %Y',             # OCT 3, 2016
-            '%b %d %Y', '%B %d %Y',               # OCT 3 2016
-        ]
-        
-        for fmt in formats:
-            try:
-                parsed = datetime.strptime(date_str, fmt)
-                return parsed.strftime('%Y-%m-%d')
-            except ValueError:
-                continue
-        
-        # If parsing fails, return cleaned version
-        return re.sub(r'[^\d/-]', '', date_str).lower()
+        return normalize_date(date_str)
+
+    def _entity_accuracy(self, gt_entities, pred_entities):
+        correct_fields = 0
+        total_fields = 0
+
+        for key in ["company", "date", "address", "total"]:
+            if key in gt_entities and key in pred_entities:
+                # Basic normalization
+                gt_val = str(gt_entities[key]).strip().lower()
+                pred_val = str(pred_entities[key]).strip().lower()
+
+                # Special handling for price/total field - remove currency units
+                if key == "total":
+                    gt_val = to_price(gt_val)
+                    pred_val = to_price(pred_val)
+
+                # Special handling for date field - normalize format
+                if key == "date":
+                    gt_val = self._normalize_date(gt_val)
+                    pred_val = self._normalize_date(pred_val)
+
+                # A total that does not parse (None, "", no digits) is a wrong field
+                if gt_val is not None and gt_val == pred_val:
+                    correct_fields += 1
+            total_fields += 1
+
+        return correct_fields / total_fields if total_fields > 0 else 0
 
     def evaluate(self, pipeline_result, ground_truth):
         """
         Compares pipeline output with ground truth.
         """
-        if not ground_truth or (
-            not ground_truth["ocr_text"] and not ground_truth["entities"]
-        ):
-            return {"error": "No ground truth found"}
+        return self.evaluate_batch([pipeline_result], [ground_truth])[0]
 
-        metrics = {}
+    def evaluate_batch(self, pipeline_results, ground_truths):
+        """
+        Compares many pipeline outputs with their ground truth in one pass.
 
-        # 1. Evaluate OCR (if GT exists)
-        if ground_truth["ocr_text"]:
-            gt_text = ground_truth["ocr_text"]
-            pred_text = pipeline_result.get("raw_text", "")
+        CER/WER of all images are computed together by error_rates, so repeated ground
+        truth texts (the same image evaluated for several pipelines) are tokenized once.
 
-            try:
-                metrics["ocr_cer"] = cer(
-                    gt_text,
-                    pred_text,
-                )
-                metrics["ocr_wer"] = wer(
-                    gt_text,
-                    pred_text,
+        Args:
+            pipeline_results (List[PipelineOutput]): Pipeline outputs.
+            ground_truths (List[dict]): Ground truth from load_ground_truth, in the same order.
+
+        Returns:
+            List[dict]: Metrics per image, as evaluate returns them.
+        """
+        all_metrics, pairs, targets = [], [], []
+        for pipeline_result, ground_truth in zip(pipeline_results, ground_truths):
+            if not ground_truth or (
+                not ground_truth["ocr_text"] and not ground_truth["entities"]
+            ):
+                all_metrics.append({"error": "No ground truth found"})
+                continue
+
+            metrics = {}
+            all_metrics.append(metrics)
+
+            # 1. Evaluate OCR (if GT exists and the pipeline transcribes; entity-only outputs
+            # have raw_text None, while an empty transcription counts as an OCR failure)
+            transcribed = pipeline_result.get("raw_text", "") is not None
+            if ground_truth["ocr_text"] and transcribed:
+                pairs.append((ground_truth["ocr_text"], pipeline_result.get("raw_text") or ""))
+                targets.append(metrics)
+
+            # 2. Evaluate Entities (if GT exists and pipeline produced data)
+            if ground_truth["entities"] and pipeline_result.get("structured_data"):
+                metrics["entity_accuracy"] = self._entity_accuracy(
+                    ground_truth["entities"], pipeline_result.get("structured_data", {})
                 )
-            except Exception as e:
-                metrics["ocr_error"] = str(e)
-
-        # 2. Evaluate Entities (if GT exists and pipeline produced data)
-        if ground_truth["entities"] and pipeline_result.get("structured_data"):
-            gt_entities = ground_truth["entities"]
-            pred_entities = pipeline_result.get("structured_data", {})
-
-            correct_fields = 0
-            total_fields = 0
-
-            for key in ["company", "date", "address", "total"]:
-                if key in gt_entities and key in pred_entities:
-                    # Basic normalization
-                    gt_val = str(gt_entities[key]).strip().lower()
-                    pred_val = str(pred_entities[key]).strip().lower()
-
-                    # Special handling for price/total field - remove currency units
-                    if key == "total":
-                        gt_val = float(self._normalize_price(gt_val))
-                        pred_val = float(self._normalize_price(pred_val))
-                    
-                    # Special handling for date field - normalize format
-                    if key == "date":
-                        gt_val = self._normalize_date(gt_val)
-                        pred_val = self._normalize_date(pred_val)
-
-                    if gt_val == pred_val:
-                        correct_fields += 1
-                total_fields += 1
-
-            metrics["entity_accuracy"] = (
-                correct_fields / total_fields if total_fields > 0 else 0
+
+        for metrics, (ocr_cer, ocr_wer) in zip(targets, error_rates(pairs)):
+            # Keep the key order of the per-image metrics: CER, WER, entity accuracy
+            entity_accuracy = metrics.pop("entity_accuracy", None)
+            metrics["ocr_cer"] = ocr_cer
+            metrics["ocr_wer"] = ocr_wer
+            if entity_accuracy is not None:
+                metrics["entity_accuracy"] = entity_accuracy
+        return all_metrics
+
+    def summarize(self, per_image_metrics, latencies=None, stats=None):
+        """
+        Aggregates per-image metrics (as returned by evaluate), latencies and LLM usage.
+
+        Args:
+            per_image_metrics (List[dict]): Metrics dicts; entries with "error" are skipped.
+            latencies (List[float]): Optional per-image processing times in seconds.
+            stats (List[dict]): Optional per-image PipelineOutput["stats"] (LLM calls, tokens).
+
+        Returns:
+            dict with average CER/WER/entity accuracy, latency statistics and LLM usage.
+        """
+        summary = {}
+        valid = [m for m in per_image_metrics if "error" not in m]
+        for key, label in SUMMARY_METRICS.items():
+            values = [m[key] for m in valid if key in m]
+            if values:
+                summary[label] = float(np.mean(values))
+        if latencies:
+            summary["Mean Latency (seconds)"] = round(float(np.mean(latencies)), 3)
+            summary["P50 Latency (seconds)"] = round(float(np.percentile(latencies, 50)), 3)
+            summary["P95 Latency (seconds)"] = round(float(np.percentile(latencies, 95)), 3)
+        if stats:
+            for key, label in SUMMARY_STATS.items():
+                summary[label] = round(float(np.mean([s.get(key, 0) for s in stats])), 1)
+            # Share of images that needed at least one LLM/VLM call
+            summary["LLM Call Rate"] = round(
+                float(np.mean([s.get("llm_calls", 0) > 0 for s in stats])), 3
+            )
+            # Share of images that needed the pipeline's fallback stages
+            summary["Fallback Rate"] = round(
+                float(np.mean([bool(s.get("fallback")) for s in stats])), 3
             )
+        return summary
+
+    def compare(self, baseline, candidate):
+        """
+        Reports the change of every shared summary value from baseline to candidate.
+
+        Args:
+            baseline (dict): Summary from summarize(), e.g. without preprocessing.
+            candidate (dict): Summary from summarize(), e.g. with preprocessing.
 
-        return metrics
+        Returns:
+            dict mapping each summary label to {"before", "after", "change", "relative_change"}
+            (relative_change is None when the baseline value is 0), e.g. the prompt token
+            reduction and entity accuracy change of a pruned prompt.
+        """
+        comparison = {}
+        for label in baseline:
+            if label in candidate:
+                before, after = baseline[label], candidate[label]
+                comparison[label] = {
+                    "before": before,
+                    "after": after,
+                    "change": after - before,
+                    "relative_change": round((after - before) / before, 3) if before else None,
+                }
+        return comparison
 
 
 if __name__ == "__main__":
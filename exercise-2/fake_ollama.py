@@ -0,0 +1,186 @@
+"""
+Local stand-in for the Ollama HTTP API, for running the receipt service and scripts offline.
+
+Serves /api/chat (streamed NDJSON or a single JSON response), /api/tags and /api/version
+with canned answers: a schema-constrained request (`format`) gets a JSON object with every
+schema property filled in, a prompt asking for JSON gets the SROIE entities, and any other
+prompt gets a short receipt transcription. Token counts are estimated from the text length,
+so usage statistics are non-zero.
+
+Run it and point the agents at it:
+    python fake_ollama.py --port 11435 --latency 0.2
+    OLLAMA_BASE_URL=http://127.0.0.1:11435 python service.py
+"""
+
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_ENTITIES = {
+    "company": "FAKE TRADING SDN BHD",
+    "date": "01/01/2018",
+    "address": "NO 1, JALAN FAKE, 43000 KAJANG, SELANGOR",
+    "total": "10.00",
+}
+
+FAKE_RECEIPT = "\n".join(
+    [
+        FAKE_ENTITIES["company"],
+        FAKE_ENTITIES["address"],
+        f"DATE: {FAKE_ENTITIES['date']}",
+        "ITEM 1 10.00",
+        f"TOTAL {FAKE_ENTITIES['total']}",
+    ]
+)
+
+
+def _prompt_text(messages):
+    """Text of the last user message (images travel in a separate "images" list)."""
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return message.get("content") or ""
+    return ""
+
+
+def fake_reply(request):
+    """
+    Canned answer for an /api/chat request body.
+
+    Args:
+        request (dict): The chat request ("model", "messages", optional "format").
+
+    Returns:
+        str: The assistant message content.
+    """
+    schema = request.get("format")
+    if isinstance(schema, dict):
+        properties = schema.get("properties", {})
+        return json.dumps(
+            {
+                name: FAKE_ENTITIES.get(name, FAKE_RECEIPT if name == "corrected_text" else "")
+                for name in properties
+            }
+        )
+    prompt = _prompt_text(request.get("messages", []))
+    if schema == "json" or "JSON" in prompt:
+        return json.dumps(FAKE_ENTITIES)
+    return FAKE_RECEIPT
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Request handler; `server.latency` seconds are added to every chat response."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            models = [{"name": name, "model": name} for name in self.server.models]
+            self._send_json({"models": models})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/api/show":
+            self._send_json({"modelfile": "", "details": {}, "capabilities": ["completion"]})
+            return
+        if self.path != "/api/chat":
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.calls += 1
+        content = fake_reply(request)
+        prompt = json.dumps(request.get("messages", []))
+        created_at = datetime.now(timezone.utc).isoformat()
+        stream = request.get("stream", True)
+        final = {
+            "model": request.get("model", ""),
+            "created_at": created_at,
+            # Streamed responses carry the content in the chunks before the final one
+            "message": {"role": "assistant", "content": "" if stream else content},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": len(prompt) // 4,
+            "eval_count": max(1, len(content) // 4),
+        }
+        if not stream:
+            self._send_json(final)
+            return
+
+        chunk = {
+            "model": final["model"],
+            "created_at": created_at,
+            "message": {"role": "assistant", "content": content},
+            "done": False,
+        }
+        body = (json.dumps(chunk) + "\n" + json.dumps(final) + "\n").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_fake_ollama(host="127.0.0.1", port=0, latency=0.0, models=("llava:7b", "qwen2.5:7b")):
+    """
+    Starts the fake server on a background thread.
+
+    Args:
+        host (str): Interface to bind.
+        port (int): Port to bind (0 picks a free one).
+        latency (float): Seconds added to every chat response, to emulate generation time.
+        models (Tuple[str]): Model names listed by /api/tags.
+
+    Returns:
+        ThreadingHTTPServer: The running server; its base URL is
+        f"http://{host}:{server.server_address[1]}" and `server.calls` counts chat requests.
+    """
+    server = ThreadingHTTPServer((host, port), FakeOllamaHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.models = list(models)
+    server.calls = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve canned Ollama chat responses.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds added to every chat response."
+    )
+    args = parser.parse_args()
+
+    server = start_fake_ollama(args.host, args.port, args.latency)
+    print(f"Fake Ollama listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""
+Columnar, memory-mapped index of the SROIE ground truth (text lines, box coordinates, entities).
+
+Parsing the `box` and `entities` text files of an image takes two file opens and a few
+hundred string splits; the evaluation scripts did that for every image and every pipeline.
+The index parses a split once into NumPy arrays plus a JSON manifest:
+    manifest.json               image IDs, source file signatures, entities, current build
+    text-<build>.npy            UTF-8 bytes of every image's OCR text, concatenated
+    text_offsets-<build>.npy    byte offsets of each image's text (n_images + 1)
+    boxes-<build>.npy           int32 quadrilaterals (n_lines, 8) of every text line
+    box_offsets-<build>.npy     row offsets of each image's lines (n_images + 1)
+
+The arrays are plain .npy files (an .npz archive cannot be memory-mapped) opened with
+mmap, so processes reading the same index share the OS page cache. Lookups by image ID are
+a dict lookup plus two slices. When the index is opened, the sizes and modification times of
+the source files are compared with the manifest and only changed images are parsed again.
+A build writes new array files and then swaps the manifest, so readers never see a mix.
+Builds hold an exclusive lock on `build.lock` in the index directory, so processes opening
+a stale index at the same time build it once. The arrays of the replaced build are kept
+until the next build, for readers that read its manifest just before the swap.
+
+Build or refresh it from the exercise-2 directory:
+    python ground_truth_index.py --dataset-dir data/SROIE2019/train
+"""
+
+import argparse
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: builds are not serialized between processes
+    fcntl = None
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_ROOT = os.getenv("GT_INDEX_DIR", ".cache/ground_truth")
+
+_ARRAYS = ("text", "text_offsets", "boxes", "box_offsets")
+
+
+def default_index_dir(dataset_dir):
+    """Index directory for a dataset split, under GT_INDEX_DIR (default .cache/ground_truth)."""
+    key = hashlib.sha1(os.path.abspath(dataset_dir).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(DEFAULT_INDEX_ROOT, key)
+
+
+def _coordinate(value):
+    try:
+        return int(value)
+    except ValueError:
+        return -1
+
+
+def parse_box_file(path):
+    """
+    Parses a SROIE box file (x1,y1,...,x4,y4,TEXT per line).
+
+    Args:
+        path (str): Path to the box .txt file.
+
+    Returns:
+        Tuple[List[str], List[List[int]]]: Text of every line with coordinates, and the
+        eight coordinates of each (-1 where a coordinate is not an integer).
+    """
+    lines, boxes = [], []
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            parts = line.strip().split(",", 8)
+            if len(parts) > 8:
+                lines.append(parts[8])
+                boxes.append([_coordinate(value) for value in parts[:8]])
+    return lines, boxes
+
+
+def _scan(directory):
+    """{image ID: [mtime_ns, size]} of the .txt files in a directory."""
+    if not os.path.isdir(directory):
+        return {}
+    signatures = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".txt"):
+                stat = entry.stat()
+                signatures[entry.name[:-4]] = [stat.st_mtime_ns, stat.st_size]
+    return signatures
+
+
+def _load_array(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:
+        # Empty arrays cannot be memory-mapped
+        return np.load(path)
+
+
+class GroundTruthIndex:
+    """Memory-mapped ground truth of one SROIE split, refreshed incrementally on open.
+
+    Args:
+        dataset_dir (str): Split directory containing the "box" and "entities" folders.
+        index_dir (str): Where the index files live. Defaults to default_index_dir(dataset_dir).
+    """
+
+    def __init__(self, dataset_dir, index_dir=None):
+        self.dataset_dir = dataset_dir
+        self.box_dir = os.path.join(dataset_dir, "box")
+        self.entities_dir = os.path.join(dataset_dir, "entities")
+        self.index_dir = index_dir or default_index_dir(dataset_dir)
+        self.manifest_path = os.path.join(self.index_dir, "manifest.json")
+        # Images parsed when opening (0 if the index was current)
+        self.parsed = self.refresh()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, image_id):
+        return self._image_id(image_id) in self._rows
+
+    @staticmethod
+    def _image_id(filename):
+        return os.path.splitext(os.path.basename(filename))[0]
+
+    def _array_path(self, name, build):
+        return os.path.join(self.index_dir, f"{name}-{build}.npy")
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != INDEX_VERSION:
+            return None
+        if not all(os.path.exists(self._array_path(n, manifest["build"])) for n in _ARRAYS):
+            return None
+        return manifest
+
+    def _open(self, manifest):
+        self.manifest = manifest
+        self._rows = {image_id: row for row, image_id in enumerate(manifest["images"])}
+        arrays = {name: _load_array(self._array_path(name, manifest["build"])) for name in _ARRAYS}
+        self._text = arrays["text"]
+        self._text_offsets = arrays["text_offsets"]
+        self._boxes = arrays["boxes"]
+        self._box_offsets = arrays["box_offsets"]
+
+    def refresh(self):
+        """
+        Brings the index up to date with the ground truth files and opens it.
+
+        Returns:
+            int: Number of images parsed (0 if the index was current).
+        """
+        manifest = self._read_manifest()
+        box_files, entity_files = _scan(self.box_dir), _scan(self.entities_dir)
+        signatures = {
+            image_id: [box_files.get(image_id), entity_files.get(image_id)]
+            for image_id in sorted(set(box_files) | set(entity_files))
+        }
+        if manifest is not None and manifest["signatures"] == signatures:
+            self._open(manifest)
+            return 0
+        with self._build_lock():
+            # Another process may have built the index while this one waited for the lock
+            manifest = self._read_manifest()
+            if manifest is not None and manifest["signatures"] == signatures:
+                self._open(manifest)
+                return 0
+            return self._build(signatures, manifest)
+
+    @contextlib.contextmanager
+    def _build_lock(self):
+        """Exclusive lock on the index directory for the duration of a build."""
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(os.path.join(self.index_dir, "build.lock"), "w", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield  # Released when the file is closed
+
+    def _parse_entities(self, image_id):
+        path = os.path.join(self.entities_dir, image_id + ".txt")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except ValueError as e:
+            print(f"Error parsing entities of {image_id}: {e}")
+            return None
+
+    def _build(self, signatures, previous):
+        if previous is not None:
+            self._open(previous)
+        old_signatures = previous["signatures"] if previous else {}
+
+        texts, boxes, entities = [], [], {}
+        parsed = 0
+        for image_id, signature in signatures.items():
+            if old_signatures.get(image_id) == signature:
+                entry = self._entry(self._rows[image_id])
+                texts.append(entry["ocr_text"].encode("utf-8"))
+                boxes.append(entry["boxes"])
+                entities[image_id] = previous["entities"][image_id]
+                continue
+            parsed += 1
+            lines, coordinates = [], []
+            if signature[0] is not None:
+                lines, coordinates = parse_box_file(os.path.join(self.box_dir, image_id + ".txt"))
+            texts.append("\n".join(lines).encode("utf-8"))
+            boxes.append(np.asarray(coordinates, dtype=np.int32).reshape(-1, 8))
+            entities[image_id] = self._parse_entities(image_id) if signature[1] else None
+
+        build = uuid.uuid4().hex[:12]
+        os.makedirs(self.index_dir, exist_ok=True)
+        arrays = {
+            "text": np.frombuffer(b"".join(texts), dtype=np.uint8),
+            "text_offsets": np.cumsum([0] + [len(text) for text in texts], dtype=np.int64),
+            "boxes": np.concatenate(boxes) if boxes else np.zeros((0, 8), dtype=np.int32),
+            "box_offsets": np.cumsum([0] + [len(b) for b in boxes], dtype=np.int64),
+        }
+        for name, array in arrays.items():
+            np.save(self._array_path(name, build), array)
+        manifest = {
+            "version": INDEX_VERSION,
+            "build": build,
+            "built_at": time.time(),
+            "dataset_dir": os.path.abspath(self.dataset_dir),
+            "images": list(signatures),
+            "signatures": signatures,
+            "entities": entities,
+        }
+        temporary = f"{self.manifest_path}.{build}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temporary, self.manifest_path)
+
+        # Remove builds older than the one just replaced (and leftovers of failed builds).
+        # The replaced build stays for readers that read its manifest before the swap;
+        # readers that still map an older build keep their open files
+        keep = {build, previous["build"] if previous else None}
+        for path in glob.glob(os.path.join(self.index_dir, "*-*.npy")):
+            if os.path.basename(path)[: -len(".npy")].rsplit("-", 1)[1] not in keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self._open(manifest)
+        return parsed
+
+    def _entry(self, row):
+        start, end = self._text_offsets[row], self._text_offsets[row + 1]
+        box_start, box_end = self._box_offsets[row], self._box_offsets[row + 1]
+        return {
+            "ocr_text": self._text[start:end].tobytes().decode("utf-8"),
+            "boxes": np.array(self._boxes[box_start:box_end]),
+        }
+
+    def get(self, filename):
+        """
+        Returns the ground truth of an image.
+
+        Args:
+            filename (str): Image ID, file name or path (e.g. "data/.../img/X0001.jpg").
+
+        Returns:
+            dict: {"ocr_text", "entities", "boxes" (int32 array of shape (n_lines, 8))},
+            or None if the image has no ground truth files.
+        """
+        row = self._rows.get(self._image_id(filename))
+        if row is None:
+            return None
+        entry = self._entry(row)
+        entities = self.manifest["entities"][self.manifest["images"][row]]
+        entry["entities"] = dict(entities) if entities is not None else None
+        return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the ground truth index.")
+    parser.add_argument("--dataset-dir", default="data/SROIE2019/train")
+    parser.add_argument("--index-dir", default=None)
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Parse every file again instead of refreshing."
+    )
+    args = parser.parse_args()
+
+    index_dir = args.index_dir or default_index_dir(args.dataset_dir)
+    if args.rebuild and os.path.exists(os.path.join(index_dir, "manifest.json")):
+        os.remove(os.path.join(index_dir, "manifest.json"))
+
+    start = time.perf_counter()
+    index = GroundTruthIndex(args.dataset_dir, index_dir)
+    print(
+        f"{len(index)} images indexed in {index.index_dir}: {index.parsed} parsed, "
+        f"{len(index) - index.parsed} reused ({time.perf_counter() - start:.2f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
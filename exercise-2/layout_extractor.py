@@ -0,0 +1,388 @@
+"""
+Rule-based SROIE entity extraction from OCR boxes.
+
+Uses the geometry of EasyOCR's (bbox, text, conf) output: boxes are grouped into lines,
+the company and address are read from the header, and the date and total from keyword
+anchors ("DATE", "TOTAL", "ROUNDED") and value patterns. Every field comes with a
+confidence in [0, 1] so callers can send only the uncertain fields to an LLM.
+
+The same cues pick the regions worth recognizing (extract_roi_boxes) and the lines worth
+keeping in an entity extraction prompt (prune_text, prune_boxes).
+"""
+
+import re
+
+# Anchors for the total, strongest first. SROIE totals are the amount actually paid
+# (after rounding), so rounded/grand/nett totals beat a plain "TOTAL".
+_TOTAL_ANCHORS = [
+    (re.compile(r"\b(ROUNDED|ROUNDING)\s*(TOTAL|AMT|AMOUNT)\b"), 0.95),
+    (re.compile(r"\b(GRAND|NETT?)\s*TOTAL\b"), 0.95),
+    (re.compile(r"\bTOTAL\s*(AMOUNT|AMT|PAYABLE|DUE)\b"), 0.9),
+    (re.compile(r"\bAMOUNT\s*DUE\b"), 0.85),
+    (re.compile(r"\bTOTAL\b"), 0.8),
+]
+# Lines that mention TOTAL but do not carry the receipt total
+_TOTAL_EXCLUDE = re.compile(
+    r"SUB\s*-?\s*TOTAL|TOTAL\s*(QTY|QUANTITY|ITEMS?|DISCOUNT|SAVINGS?|GST|TAX|EXCL)"
+    r"|\bGST\b\s*\d|CHANGE|CASH|TENDER"
+)
+_AMOUNT = re.compile(r"(?<![\d.])(?:\d{1,3}(?:,\d{3})*|\d+)\.\d{2}(?!\d)")
+
+_MONTHS = "JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|SEPT|OCT|NOV|DEC"
+_DATE_PATTERNS = [
+    re.compile(r"\b\d{1,2}[/.-]\d{1,2}[/.-](?:\d{4}|\d{2})\b"),
+    re.compile(r"\b\d{4}[/.-]\d{1,2}[/.-]\d{1,2}\b"),
+    re.compile(rf"\b\d{{1,2}}\s*(?:{_MONTHS})[A-Z]*\s*,?\s*\d{{2,4}}\b"),
+    re.compile(rf"\b(?:{_MONTHS})[A-Z]*\s+\d{{1,2}},?\s+\d{{4}}\b"),
+]
+_DATE_ANCHOR = re.compile(r"\bDATE\b|\bDT\b|\bTARIKH\b")
+
+_COMPANY_SUFFIX = re.compile(
+    r"\b(SDN\.?\s*BHD|BHD|S/B|ENTERPRISES?|TRADING|RESTAURANT|RESTORAN|LTD|LIMITED|PLT|CO\b|"
+    r"HARDWARE|MARKET|STORE|STATIONERY|BOOKSTORE|MART|CAFE|KEDAI)"
+)
+# Header lines that are neither company nor address
+_HEADER_NOISE = re.compile(
+    r"^(TAX\s*INVOICE|INVOICE|RECEIPT|OFFICIAL\s*RECEIPT|CASH\s*(SALES|BILL|RECEIPT)|"
+    r"SIMPLIFIED\s*TAX\s*INVOICE|WELCOME.*|THANK\s*YOU.*)$"
+)
+_REGISTRATION = re.compile(
+    r"^\(?\s*(CO\.?\s*(REG|NO)\.?\s*(NO)?\.?[:\s]*)?\d{4,}\s*-?\s*[A-Z]?\s*\)?$"
+)
+# First line after the address: contact/tax details or the start of the receipt body
+_ADDRESS_END = re.compile(
+    r"\b(TEL|PHONE|FAX|GST|REG|ROC|SST|EMAIL|E-MAIL|WEBSITE|WWW|INVOICE|RECEIPT|DATE|CASHIER)\b|@"
+)
+_ADDRESS_CUE = re.compile(
+    r"\b(NO\.?|LOT|JALAN|JLN|TAMAN|TMN|LORONG|PERSIARAN|BANDAR|KAWASAN|INDUSTRI|BATU|"
+    r"SELANGOR|JOHOR|KUALA LUMPUR|PULAU PINANG|PERAK|KEDAH|MELAKA|PAHANG|SABAH|SARAWAK)\b"
+)
+_POSTCODE = re.compile(r"\b\d{5}\b")
+
+ENTITY_FIELDS = ("company", "date", "address", "total")
+
+
+def group_lines(boxes, tolerance=0.5):
+    """
+    Groups OCR boxes into text lines, top to bottom and left to right within a line.
+
+    Args:
+        boxes (List[tuple]): (bbox, text, conf) tuples from OCREngine.extract_text_with_boxes,
+            bbox being four [x, y] corner points.
+        tolerance (float): Minimum vertical overlap (fraction of the smaller box height)
+            for two boxes to share a line.
+
+    Returns:
+        List[dict]: Lines with "text", "top", "bottom", "left", "right" and "conf" (min of the
+        box confidences).
+    """
+    items = []
+    for bbox, text, conf in boxes:
+        xs = [point[0] for point in bbox]
+        ys = [point[1] for point in bbox]
+        items.append(
+            {
+                "text": str(text).strip(),
+                "top": min(ys),
+                "bottom": max(ys),
+                "left": min(xs),
+                "right": max(xs),
+                "conf": float(conf),
+            }
+        )
+    items.sort(key=lambda item: (item["top"] + item["bottom"]) / 2)
+
+    lines = []
+    for item in items:
+        if not item["text"]:
+            continue
+        for line in reversed(lines[-3:]):
+            overlap = min(line["bottom"], item["bottom"]) - max(line["top"], item["top"])
+            height = min(line["bottom"] - line["top"], item["bottom"] - item["top"]) or 1
+            if overlap / height >= tolerance:
+                line["boxes"].append(item)
+                line["top"] = min(line["top"], item["top"])
+                line["bottom"] = max(line["bottom"], item["bottom"])
+                break
+        else:
+            lines.append({"top": item["top"], "bottom": item["bottom"], "boxes": [item]})
+
+    result = []
+    for line in lines:
+        line["boxes"].sort(key=lambda item: item["left"])
+        result.append(
+            {
+                "text": " ".join(item["text"] for item in line["boxes"]),
+                "top": line["top"],
+                "bottom": line["bottom"],
+                "left": line["boxes"][0]["left"],
+                "right": line["boxes"][-1]["right"],
+                "conf": min(item["conf"] for item in line["boxes"]),
+            }
+        )
+    return result
+
+
+def _find_total(lines):
+    best = (None, 0.0)
+    for i, line in enumerate(lines):
+        upper = line["text"].upper()
+        if _TOTAL_EXCLUDE.search(upper):
+            continue
+        for anchor, weight in _TOTAL_ANCHORS:
+            match = anchor.search(upper)
+            if not match:
+                continue
+            # Amount to the right of the anchor, else on the next line
+            amounts = _AMOUNT.findall(upper[match.end():])
+            conf = line["conf"]
+            if not amounts and i + 1 < len(lines):
+                amounts = _AMOUNT.findall(lines[i + 1]["text"])
+                conf = min(conf, lines[i + 1]["conf"])
+                weight *= 0.9
+            if amounts:
+                score = weight * (0.5 + 0.5 * conf)
+                # Later anchors of the same strength win (rounded total follows the total)
+                if score >= best[1]:
+                    best = (amounts[-1].replace(",", ""), score)
+            break
+
+    if best[0] is None:
+        # No anchor: largest amount in the lower half of the receipt
+        lower = lines[len(lines) // 2 :]
+        amounts = [
+            float(amount.replace(",", ""))
+            for line in lower
+            for amount in _AMOUNT.findall(line["text"])
+        ]
+        if amounts:
+            best = (f"{max(amounts):.2f}", 0.3)
+    return best
+
+
+def _find_date(lines):
+    anchored, unanchored = [], []
+    for line in lines:
+        upper = line["text"].upper()
+        for pattern in _DATE_PATTERNS:
+            match = pattern.search(upper)
+            if match:
+                value = line["text"][match.start() : match.end()]
+                (anchored if _DATE_ANCHOR.search(upper) else unanchored).append(
+                    (value, line["conf"])
+                )
+                break
+    if anchored:
+        value, conf = anchored[0]
+        return value, 0.95 * (0.5 + 0.5 * conf)
+    if unanchored:
+        value, conf = unanchored[0]
+        distinct = {v for v, _ in unanchored}
+        return value, (0.85 if len(distinct) == 1 else 0.5) * (0.5 + 0.5 * conf)
+    return None, 0.0
+
+
+def _find_header(lines):
+    """Company and address from the header lines above the first contact/tax/date line."""
+    header = []
+    for line in lines[:12]:
+        upper = line["text"].upper().strip()
+        if _ADDRESS_END.search(upper) and header:
+            break
+        if _HEADER_NOISE.match(upper) or _REGISTRATION.match(upper):
+            continue
+        header.append(line)
+    if not header:
+        return (None, 0.0), (None, 0.0)
+
+    # Company: first header line with a company suffix, else the first header line
+    company_index, company_conf = 0, 0.4
+    for i, line in enumerate(header[:4]):
+        if _COMPANY_SUFFIX.search(line["text"].upper()):
+            company_index, company_conf = i, 0.85
+            break
+    company_line = header[company_index]
+    company = (company_line["text"], company_conf * (0.5 + 0.5 * company_line["conf"]))
+
+    address_lines = [
+        line
+        for line in header[company_index + 1 :]
+        if not _REGISTRATION.match(line["text"].upper())
+    ]
+    if not address_lines:
+        return company, (None, 0.0)
+    text = " ".join(line["text"] for line in address_lines)
+    upper = text.upper()
+    address_conf = 0.3
+    if _POSTCODE.search(upper) and _ADDRESS_CUE.search(upper):
+        address_conf = 0.8
+    elif _POSTCODE.search(upper) or _ADDRESS_CUE.search(upper):
+        address_conf = 0.55
+    address_conf *= 0.5 + 0.5 * min(line["conf"] for line in address_lines)
+    return company, (text, address_conf)
+
+
+def extract_entities_from_layout(boxes):
+    """
+    Extracts the SROIE entities from OCR boxes with layout rules.
+
+    Args:
+        boxes (List[tuple]): (bbox, text, conf) tuples from OCREngine.extract_text_with_boxes.
+
+    Returns:
+        Tuple[dict, dict]: Entities {company, date, address, total} (None where not found)
+        and their confidences in [0, 1].
+    """
+    lines = group_lines(boxes)
+    if not lines:
+        return {field: None for field in ENTITY_FIELDS}, {field: 0.0 for field in ENTITY_FIELDS}
+
+    company, address = _find_header(lines)
+    found = {
+        "company": company,
+        "date": _find_date(lines),
+        "address": address,
+        "total": _find_total(lines),
+    }
+    entities = {field: found[field][0] for field in ENTITY_FIELDS}
+    confidences = {field: round(found[field][1], 3) for field in ENTITY_FIELDS}
+    return entities, confidences
+
+
+# Row labels that lead to a field value on the same row (dates) or the same or next row (totals)
+_ROI_DATE_ANCHOR = re.compile(r"DATE|TARIKH")
+_ROI_TOTAL_ANCHOR = re.compile(r"TOTAL|ROUND|AMOUNT|AMT|DUE|NETT")
+
+
+def _region_rows(regions, tolerance=0.5):
+    """Groups [x_min, x_max, y_min, y_max] regions into rows, top to bottom, left to right."""
+    rows = []
+    for region in sorted(regions, key=lambda r: (r[2] + r[3]) / 2):
+        for row in reversed(rows[-3:]):
+            top, bottom = min(r[2] for r in row), max(r[3] for r in row)
+            overlap = min(bottom, region[3]) - max(top, region[2])
+            height = min(bottom - top, region[3] - region[2]) or 1
+            if overlap / height >= tolerance:
+                row.append(region)
+                break
+        else:
+            rows.append([region])
+    return [sorted(row, key=lambda r: r[0]) for row in rows]
+
+
+def extract_roi_boxes(engine, image, header_regions=8, max_regions=40):
+    """
+    OCR restricted to the regions likely to hold the SROIE entities.
+
+    Detection runs once on the whole image. Recognition then runs in two passes over a
+    ranked subset of the detected regions:
+    1. the first `header_regions` regions from the top (company and address) and the
+       left-most region of every other row (row labels such as TOTAL or DATE, or a date
+       standing on its own);
+    2. the rest of the rows whose label matches a total or date anchor, plus the row
+       below a total label (for amounts printed under their label).
+
+    Args:
+        engine (OCREngine): Engine providing detect_regions and recognize_regions.
+        image (str | np.ndarray): Path to the image file, or a decoded image array.
+        header_regions (int): Number of regions from the top that are always recognized.
+        max_regions (int): Upper bound on recognized regions per image.
+
+    Returns:
+        List of tuples (bbox, text, conf) for the recognized regions, top to bottom.
+    """
+    grey, regions = engine.detect_regions(image)
+    rows = _region_rows(regions)
+    if not rows:
+        return []
+
+    selected, header_rows = [], 0
+    for row in rows:
+        if len(selected) >= header_regions:
+            break
+        selected.extend(row)
+        header_rows += 1
+    selected.extend(row[0] for row in rows[header_rows:])
+    selected = selected[:max_regions]
+    results = engine.recognize_regions(grey, selected)
+
+    # Map recognized labels back to their rows by region position. EasyOCR clamps regions
+    # to the image (max(0, x_min), max(0, y_min)) before recognizing them and sorts the
+    # results, so the detected region is keyed the same way
+    label_text = {
+        (int(min(p[0] for p in bbox)), int(min(p[1] for p in bbox))): text
+        for bbox, text, _ in results
+    }
+    extra = []
+    for i, row in enumerate(rows[header_rows:], start=header_rows):
+        label = label_text.get((max(0, row[0][0]), max(0, row[0][2])), "").upper()
+        if _ROI_TOTAL_ANCHOR.search(label):
+            extra.extend(row[1:])
+            if i + 1 < len(rows):
+                extra.extend(rows[i + 1][1:])
+        elif _ROI_DATE_ANCHOR.search(label):
+            extra.extend(row[1:])
+    extra = list({tuple(region): region for region in extra}.values())
+    budget = max_regions - len(selected)
+    if extra and budget > 0:
+        results = results + engine.recognize_regions(grey, extra[:budget])
+
+    return sorted(results, key=lambda item: (item[0][0][1], item[0][0][0]))
+
+
+def _is_entity_cue(text):
+    """Whether a line mentions a total/date label, a date, or an address/company cue."""
+    upper = text.upper()
+    return bool(
+        _ROI_TOTAL_ANCHOR.search(upper)
+        or _ROI_DATE_ANCHOR.search(upper)
+        or _DATE_ANCHOR.search(upper)
+        or any(pattern.search(upper) for pattern in _DATE_PATTERNS)
+        or _ADDRESS_CUE.search(upper)
+        or _POSTCODE.search(upper)
+        or _COMPANY_SUFFIX.search(upper)
+    )
+
+
+def prune_lines(lines, header_lines=6, context=1):
+    """
+    Keeps the lines an entity extraction prompt needs, in their original order.
+
+    Args:
+        lines (List[str]): Receipt text lines, top to bottom.
+        header_lines (int): Number of lines from the top that are always kept
+            (company and address).
+        context (int): Neighbouring lines kept above and below every cue line, so amounts
+            printed under their TOTAL label and wrapped address lines stay in.
+
+    Returns:
+        List[str]: The kept lines. Short receipts are returned unchanged.
+    """
+    lines = [line for line in lines if line.strip()]
+    keep = set(range(min(header_lines, len(lines))))
+    for i, line in enumerate(lines):
+        if _is_entity_cue(line):
+            keep.update(range(max(0, i - context), min(len(lines), i + context + 1)))
+    return [line for i, line in enumerate(lines) if i in keep]
+
+
+def prune_text(text, header_lines=6, context=1):
+    """prune_lines for newline-separated OCR text (e.g. the VLM transcription)."""
+    return "\n".join(prune_lines((text or "").splitlines(), header_lines, context))
+
+
+def prune_boxes(boxes, header_lines=6, context=1):
+    """
+    prune_lines for OCR boxes: the boxes are grouped into text lines by geometry first,
+    so a TOTAL label and its amount end up on the same line.
+
+    Args:
+        boxes (List[tuple]): (bbox, text, conf) tuples from OCREngine.extract_text_with_boxes.
+        header_lines (int): Number of lines from the top that are always kept.
+        context (int): Neighbouring lines kept above and below every cue line.
+
+    Returns:
+        str: The kept lines, newline-separated.
+    """
+    lines = [line["text"] for line in group_lines(boxes)]
+    return "\n".join(prune_lines(lines, header_lines, context))
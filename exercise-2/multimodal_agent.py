@@ -1,57 +1,146 @@
+import asyncio
 import base64
+import json
 import os
+import threading
 from pathlib import Path
 
 from dotenv import find_dotenv, load_dotenv
 from langchain_core.messages import HumanMessage
 from langchain_ollama import ChatOllama
+from ollama_client import get_async_transport, ollama_slot, record_usage
+from receipt_image import ReceiptImage
+from rectification_agent import ENTITY_FIELDS, ENTITY_SCHEMA
 
 load_dotenv(find_dotenv())
 
+OCR_PROMPT = "Extract all visible text from this image. Return only the extracted text without any additional formatting or explanation."
+
+ENTITY_PROMPT = (
+    "This image is a receipt. Read the following fields from it: the company name (company), "
+    "the date (date) in MM/DD/YYYY format, the company address (address) and the total amount "
+    '(total) without currency symbols. Return a JSON object with keys: "company", "date", '
+    '"address", "total".'
+)
+
+# Process-wide registry of agents, keyed by (model, base_url)
+_agents = {}
+_agents_lock = threading.Lock()
+
+
+def get_multimodal_agent(model=None, base_url=None):
+    """
+    Returns the shared MultimodalAgent for a model and Ollama server, creating it on first request.
+
+    Args:
+        model (str): VLM name. Defaults to OLLAMA_VLM from .env or "llava:7b".
+        base_url (str): Ollama base URL. Defaults to OLLAMA_BASE_URL from .env.
+
+    Returns:
+        MultimodalAgent: The shared agent.
+    """
+    model = model or os.getenv("OLLAMA_VLM", "llava:7b")
+    base_url = base_url or os.getenv("OLLAMA_BASE_URL")
+    with _agents_lock:
+        if (model, base_url) not in _agents:
+            _agents[(model, base_url)] = MultimodalAgent(model=model, base_url=base_url)
+        return _agents[(model, base_url)]
+
 
 class MultimodalAgent:
-    def __init__(self):
+    def __init__(self, model=None, base_url=None):
         """
         Initializes the MultimodalAgent with a VLM (like LLaVA) via Ollama.
+
+        Args:
+            model (str): VLM name. Defaults to OLLAMA_VLM from .env or "llava:7b".
+            base_url (str): Ollama base URL. Defaults to OLLAMA_BASE_URL from .env.
         """
         self.vlm = ChatOllama(
-            model=os.getenv("OLLAMA_VLM", "llava:7b"),
-            base_url=os.getenv("OLLAMA_BASE_URL"),
+            model=model or os.getenv("OLLAMA_VLM", "llava:7b"),
+            base_url=base_url or os.getenv("OLLAMA_BASE_URL"),
             temperature=0,
+            async_client_kwargs={"transport": get_async_transport()},
+        )
+
+    @staticmethod
+    def _image_payload(image, preprocessor=None):
+        """Base64 image sent to the VLM, cached on the ReceiptImage per preprocessing config."""
+        if preprocessor is None:
+            return image.b64
+        return image.cached(
+            ("vlm_b64", preprocessor.config),
+            lambda: base64.standard_b64encode(preprocessor.for_vlm(image)).decode("utf-8"),
         )
 
-    def perform_ocr(self, image_path: str) -> str:
+    @staticmethod
+    def _ocr_message(image_path, preprocessor=None, prompt=OCR_PROMPT):
+        """Builds the VLM request for an image; returns None if the file does not exist."""
+        image = ReceiptImage.of(image_path)
+        if image.path is not None and not Path(image.path).exists():
+            print(f"Error: Image file not found at {image.path}")
+            return None
+
+        image_data = MultimodalAgent._image_payload(image, preprocessor)
+
+        message_content = [
+            {
+                "type": "image_url",
+                "image_url": {"url": f"data:image/jpeg;base64,{image_data}"},
+            },
+            {
+                "type": "text",
+                "text": prompt,
+            },
+        ]
+        return HumanMessage(content=message_content)
+
+    def perform_ocr(self, image_path: str, preprocessor=None) -> str:
         """
         Uses a Multimodal LLM (like LLaVA) via Ollama to extract text from an image.
 
         Args:
-            image_path (str): Path to the input image.
+            image_path (str | ReceiptImage): Path to the input image, or an in-memory image
+                (see receipt_image.ReceiptImage for the accepted types).
+            preprocessor (ImagePreprocessor): Optional preprocessing; the VLM then receives
+                the downscaled, re-encoded JPEG instead of the raw file.
         Returns:
             str: Extracted text from the image.
         """
 
         try:
-            if not Path(image_path).exists():
-                print(f"Error: Image file not found at {image_path}")
+            message = self._ocr_message(image_path, preprocessor)
+            if message is None:
                 return ""
+            response = self.vlm.invoke([message])
+            record_usage(response)
+            return response.content.strip()
+
+        except FileNotFoundError:
+            print(f"Error: Image file not found at {image_path}")
+            return ""
+        except Exception as e:
+            print(f"Error calling VLM: {e}")
+            return ""
 
-            with open(image_path, "rb") as image_file:
-                image_data = base64.standard_b64encode(image_file.read()).decode(
-                    "utf-8"
-                )
-
-            message_content = [
-                {
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{image_data}"},
-                },
-                {
-                    "type": "text",
-                    "text": "Extract all visible text from this image. Return only the extracted text without any additional formatting or explanation.",
-                },
-            ]
-
-            response = self.vlm.invoke([HumanMessage(content=message_content)])
+    async def aperform_ocr(self, image_path: str, preprocessor=None) -> str:
+        """
+        Async variant of perform_ocr. The call waits for a free Ollama slot (see ollama_client).
+
+        Args:
+            image_path (str | ReceiptImage): Path to the input image, or an in-memory image.
+            preprocessor (ImagePreprocessor): Optional preprocessing.
+        Returns:
+            str: Extracted text from the image.
+        """
+        try:
+            # File read, preprocessing and base64 encoding stay off the event loop
+            message = await asyncio.to_thread(self._ocr_message, image_path, preprocessor)
+            if message is None:
+                return ""
+            async with ollama_slot():
+                response = await self.vlm.ainvoke([message])
+            record_usage(response)
             return response.content.strip()
 
         except FileNotFoundError:
@@ -60,3 +149,45 @@ class MultimodalAgent:
         except Exception as e:
             print(f"Error calling VLM: {e}")
             return ""
+
+    @staticmethod
+    def _parse_entities(content):
+        data = json.loads(content)
+        return {field: data.get(field, "") for field in ENTITY_FIELDS}
+
+    def extract_entities(self, image_path: str, preprocessor=None):
+        """
+        Reads the four SROIE entities directly from the image, without a transcription step.
+
+        The output is constrained to ENTITY_SCHEMA through Ollama's `format`.
+
+        Args:
+            image_path (str | ReceiptImage): Path to the input image, or an in-memory image.
+            preprocessor (ImagePreprocessor): Optional preprocessing.
+        Returns:
+            dict: {company, date, address, total}, or None if the call fails.
+        """
+        try:
+            message = self._ocr_message(image_path, preprocessor, prompt=ENTITY_PROMPT)
+            if message is None:
+                return None
+            response = self.vlm.invoke([message], format=ENTITY_SCHEMA)
+            record_usage(response)
+            return self._parse_entities(response.content)
+        except Exception as e:
+            print(f"Error extracting entities with VLM: {e}")
+
+    async def aextract_entities(self, image_path: str, preprocessor=None):
+        """Async variant of extract_entities. The call waits for a free Ollama slot."""
+        try:
+            message = await asyncio.to_thread(
+                self._ocr_message, image_path, preprocessor, ENTITY_PROMPT
+            )
+            if message is None:
+                return None
+            async with ollama_slot():
+                response = await self.vlm.ainvoke([message], format=ENTITY_SCHEMA)
+            record_usage(response)
+            return self._parse_entities(response.content)
+        except Exception as e:
+            print(f"Error extracting entities with VLM: {e}")
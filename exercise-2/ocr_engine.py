@@ -1,4 +1,76 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import easyocr
+import numpy as np
+import torch
+from easyocr.recognition import get_text
+from easyocr.utils import get_image_list, reformat_input
+from receipt_image import ReceiptImage
+
+# Recognizer input height used by easyocr.Reader (easyocr.easyocr.imgH)
+RECOGNIZER_HEIGHT = 64
+
+# Process-wide registry of OCR engines, keyed by (languages, device, num_threads, quantize)
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def resolve_device(device=None):
+    """
+    Resolves a device setting to "cpu", "cuda[:n]" or "mps".
+
+    Args:
+        device (str): "auto", "cpu", "cuda", "cuda:N" or "mps". Defaults to OCR_DEVICE from .env or "auto".
+
+    Returns:
+        str: The concrete device. "auto" picks CUDA, then MPS, then CPU.
+    """
+    device = (device or os.getenv("OCR_DEVICE", "auto")).lower()
+    if device != "auto":
+        return device
+    if torch.cuda.is_available():
+        return "cuda"
+    if torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def get_ocr_engine(languages=("en",), device=None, num_threads=None, quantize=None):
+    """
+    Returns the shared OCREngine for a language list and device, creating it on first request.
+
+    Pipelines should use this instead of constructing OCREngine directly, so that all of them
+    share one set of EasyOCR detector/recognizer weights per process.
+
+    Args:
+        languages (Sequence[str]): List of language codes for OCR.
+        device (str): See resolve_device. Defaults to OCR_DEVICE from .env or "auto".
+        num_threads (int): Torch intra-op threads for this process. Defaults to OCR_NUM_THREADS
+            from .env, or torch's default if unset.
+        quantize (bool): Use the dynamic int8 quantized recognizer on CPU. Defaults to
+            OCR_QUANTIZE from .env or True.
+
+    Returns:
+        OCREngine: The shared engine. Its reader is loaded lazily on first use.
+    """
+    device = resolve_device(device)
+    if num_threads is None and os.getenv("OCR_NUM_THREADS"):
+        num_threads = int(os.getenv("OCR_NUM_THREADS"))
+    if quantize is None:
+        quantize = os.getenv("OCR_QUANTIZE", "1").lower() not in ("0", "false", "no")
+
+    key = (tuple(languages), device, num_threads, quantize)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = OCREngine(
+                list(languages),
+                device=device,
+                num_threads=num_threads,
+                quantize=quantize,
+            )
+        return _engines[key]
 
 
 class OCREngine:
@@ -6,27 +78,68 @@ class OCREngine:
     OCR Engine using EasyOCR to extract text from images.
     """
 
-    def __init__(self, languages=["en"]):
+    def __init__(self, languages=["en"], device="cpu", num_threads=None, quantize=True):
         """
-        Initializes the EasyOCR reader.
+        Configures the EasyOCR reader. The model weights are loaded on first use.
 
         Args:
             languages (List[str]): List of language codes for OCR.
+            device (str): "cpu", "cuda", "cuda:N" or "mps".
+            num_threads (int): Torch intra-op threads, set when the reader loads. Torch threading
+                is process-wide, so with several worker processes use cores // workers.
+            quantize (bool): Apply dynamic int8 quantization to the recognizer on CPU.
         """
-        self.reader = easyocr.Reader(languages, gpu=True)
+        self.languages = languages
+        self.device = device
+        self.num_threads = num_threads
+        self.quantize = quantize
+        self._reader = None
+        self._reader_lock = threading.Lock()
+
+    @property
+    def reader(self):
+        """The EasyOCR reader, loaded on first access."""
+        if self._reader is None:
+            with self._reader_lock:
+                if self._reader is None:
+                    if self.num_threads:
+                        torch.set_num_threads(self.num_threads)
+                    self._reader = easyocr.Reader(
+                        self.languages,
+                        gpu=False if self.device == "cpu" else self.device,
+                        quantize=self.quantize,
+                    )
+        return self._reader
+
+    @staticmethod
+    def _reformat(image):
+        """EasyOCR's reformat_input (RGB and grayscale image); in-memory inputs decode once."""
+        if isinstance(image, (str, np.ndarray)):
+            return reformat_input(image)
+        return ReceiptImage.of(image).easyocr_input
+
+    def _readtext(self, image, detail=1):
+        """Reader.readtext (detection, then recognition) on any supported image input."""
+        img, img_cv_grey = self._reformat(image)
+        horizontal_list, free_list = self.reader.detect(img, reformat=False)
+        return self.reader.recognize(
+            img_cv_grey, horizontal_list[0], free_list[0], detail=detail, reformat=False
+        )
 
     def extract_text(self, image_path: str) -> str:
         """
-        Extracts raw text from an image path.
+        Extracts raw text from an image.
 
         Args:
-            image_path (str): Path to the image file.
+            image_path (str | np.ndarray | bytes | PIL.Image.Image | ReceiptImage): Path to the
+                image file, an already decoded (e.g. preprocessed) image array, or an
+                in-memory image.
 
         Returns:
             str: Extracted raw text.
         """
         try:
-            result = self.reader.readtext(image_path, detail=0)
+            result = self._readtext(image_path, detail=0)
             return "\n".join(result)
         except Exception as e:
             print(f"Error during OCR: {e}")
@@ -37,14 +150,150 @@ class OCREngine:
         Extracts text with bounding boxes.
 
         Args:
-            image_path (str): Path to the image file.
+            image_path (str | np.ndarray | bytes | PIL.Image.Image | ReceiptImage): Path to the
+                image file, a decoded image array, or an in-memory image.
 
         Returns:
             List of tuples (bbox, text, conf)
         """
         try:
-            result = self.reader.readtext(image_path)
+            result = self._readtext(image_path)
             return result
         except Exception as e:
             print(f"Error during OCR: {e}")
             return []
+
+    def detect_regions(self, image_path):
+        """
+        Runs text detection only, for callers that recognize a subset of the regions.
+
+        Args:
+            image_path (str | np.ndarray | bytes | PIL.Image.Image | ReceiptImage): Path to the
+                image file, a decoded image array, or an in-memory image.
+
+        Returns:
+            Tuple of the grayscale image and the detected regions as [x_min, x_max, y_min, y_max]
+            (rotated regions are replaced by their axis-aligned bounds). (None, []) on failure.
+        """
+        try:
+            img, img_cv_grey = self._reformat(image_path)
+            horizontal_list, free_list = self.reader.detect(img)
+        except Exception as e:
+            print(f"Error during OCR detection: {e}")
+            return None, []
+        regions = [[int(v) for v in box] for box in horizontal_list[0]]
+        for points in free_list[0]:
+            xs = [point[0] for point in points]
+            ys = [point[1] for point in points]
+            regions.append([int(min(xs)), int(max(xs)), int(min(ys)), int(max(ys))])
+        return img_cv_grey, regions
+
+    def recognize_regions(self, img_cv_grey, regions):
+        """
+        Recognizes text in the given regions of an image returned by detect_regions.
+
+        Args:
+            img_cv_grey (np.ndarray): Grayscale image from detect_regions.
+            regions (List[list]): Regions as [x_min, x_max, y_min, y_max].
+
+        Returns:
+            List of tuples (bbox, text, conf), as extract_text_with_boxes.
+        """
+        if img_cv_grey is None or not regions:
+            return []
+        try:
+            return self.reader.recognize(
+                img_cv_grey, horizontal_list=regions, free_list=[], detail=1
+            )
+        except Exception as e:
+            print(f"Error during OCR recognition: {e}")
+            return []
+
+    def extract_text_batch(self, image_paths, batch_size=16, workers=4, detail=False):
+        """
+        Extracts text from many images, batching recognition across images.
+
+        Images are decoded in parallel, text regions are detected per image, then all
+        recognizer crops from all images are grouped by width (to minimise padding) and
+        recognized in batches of `batch_size`.
+
+        Args:
+            image_paths (List[str | ReceiptImage]): Paths to the image files, or in-memory images.
+            batch_size (int): Number of crops per recognizer forward pass.
+            workers (int): Threads used to decode images.
+            detail (bool): If True, return (bbox, text, conf) tuples instead of joined text.
+
+        Returns:
+            List with one entry per input image, in input order: the extracted text
+            (or list of (bbox, text, conf) if detail=True). Failed images yield "" / [].
+        """
+        reader = self.reader
+
+        def decode(path):
+            try:
+                return self._reformat(path)
+            except Exception as e:
+                print(f"Error decoding {path}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            decoded = list(executor.map(decode, image_paths))
+
+        # Detection per image; collect recognizer crops from every image
+        crops = []  # (image index, position in image, box, crop)
+        for image_idx, images in enumerate(decoded):
+            if images is None:
+                continue
+            img, img_cv_grey = images
+            try:
+                horizontal_list, free_list = reader.detect(img)
+                image_list, _ = get_image_list(
+                    horizontal_list[0],
+                    free_list[0],
+                    img_cv_grey,
+                    model_height=RECOGNIZER_HEIGHT,
+                )
+            except Exception as e:
+                print(f"Error during OCR detection: {e}")
+                decoded[image_idx] = None
+                continue
+            for position, (box, crop) in enumerate(image_list):
+                crops.append((image_idx, position, box, crop))
+
+        # Recognition in width-sorted batches across all images
+        ignore_char = "".join(set(reader.character) - set(reader.lang_char))
+        crops.sort(key=lambda item: item[3].shape[1])
+        recognized = [[] for _ in image_paths]
+        for start in range(0, len(crops), batch_size):
+            batch = crops[start : start + batch_size]
+            max_width = max(crop.shape[1] for _, _, _, crop in batch)
+            try:
+                results = get_text(
+                    reader.character,
+                    RECOGNIZER_HEIGHT,
+                    int(max_width),
+                    reader.recognizer,
+                    reader.converter,
+                    [(box, crop) for _, _, box, crop in batch],
+                    ignore_char,
+                    "greedy",
+                    5,
+                    batch_size,
+                    workers=0,
+                    device=reader.device,
+                )
+            except Exception as e:
+                print(f"Error during OCR recognition: {e}")
+                continue
+            for (image_idx, position, _, _), result in zip(batch, results):
+                recognized[image_idx].append((position, result))
+
+        # Restore reading order within each image
+        outputs = []
+        for items in recognized:
+            items = [result for _, result in sorted(items, key=lambda item: item[0])]
+            if detail:
+                outputs.append(items)
+            else:
+                outputs.append("\n".join(text for _, text, _ in items))
+        return outputs
@@ -0,0 +1,114 @@
+"""
+Shared HTTP plumbing for the Ollama-backed agents.
+
+All ChatOllama clients built by the agents use one pooled async transport, and async calls
+are bounded by a semaphore sized to the number of requests the Ollama server runs in
+parallel. Callers can keep many receipts in flight without a thread per call; the excess
+waits on the semaphore instead of queueing inside Ollama.
+
+The pooled connections belong to the event loop that opened them, so async pipeline code
+should run on one long-lived loop: the server's, or the background loop behind run_sync.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import weakref
+from contextlib import contextmanager
+
+import httpx
+from dotenv import find_dotenv, load_dotenv
+
+load_dotenv(find_dotenv())
+
+# Requests Ollama processes concurrently (its OLLAMA_NUM_PARALLEL setting)
+MAX_CONCURRENCY = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+
+_async_transport = None
+_transport_lock = threading.Lock()
+_semaphores = weakref.WeakKeyDictionary()
+_loop = None
+_loop_lock = threading.Lock()
+_usage = contextvars.ContextVar("ollama_usage", default=None)
+_usage_lock = threading.Lock()
+
+
+def get_async_transport():
+    """
+    Returns the process-wide pooled async HTTP transport for Ollama requests.
+
+    Passed as `async_client_kwargs={"transport": ...}` to every ChatOllama, so the agents
+    share one keep-alive connection pool.
+    """
+    global _async_transport
+    with _transport_lock:
+        if _async_transport is None:
+            _async_transport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(
+                    max_connections=MAX_CONCURRENCY * 2,
+                    max_keepalive_connections=MAX_CONCURRENCY * 2,
+                )
+            )
+        return _async_transport
+
+
+def ollama_slot():
+    """
+    Returns the semaphore bounding in-flight async Ollama calls on the running event loop.
+
+    Usage:
+        async with ollama_slot():
+            response = await llm.ainvoke(messages)
+    """
+    loop = asyncio.get_running_loop()
+    with _transport_lock:
+        if loop not in _semaphores:
+            _semaphores[loop] = asyncio.BoundedSemaphore(MAX_CONCURRENCY)
+        return _semaphores[loop]
+
+
+def run_sync(coroutine):
+    """
+    Runs a coroutine on the shared background event loop and returns its result.
+
+    Lets synchronous code (scripts, thread pools) use the async agent methods while every
+    call goes through the same loop and connection pool.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="ollama-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coroutine, _loop).result()
+
+
+@contextmanager
+def usage_scope():
+    """
+    Collects LLM call counts and token usage of the Ollama calls made inside the block.
+
+    Usage is tracked through a context variable, so it follows the code into asyncio tasks
+    and asyncio.to_thread workers started inside the block.
+
+    Yields:
+        dict: {"llm_calls", "prompt_tokens", "completion_tokens"}, filled in as calls complete.
+    """
+    usage = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def record_usage(response):
+    """Adds a chat model response's token usage to the active usage_scope, if any."""
+    usage = _usage.get()
+    if usage is None:
+        return
+    metadata = getattr(response, "usage_metadata", None) or {}
+    with _usage_lock:
+        usage["llm_calls"] += 1
+        usage["prompt_tokens"] += metadata.get("input_tokens", 0)
+        usage["completion_tokens"] += metadata.get("output_tokens", 0)
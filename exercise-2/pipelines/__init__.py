@@ -4,13 +4,24 @@ from .raw_ocr_entity_analysis_pipeline import RawOCREntityAnalysisPipeline
 from .improved_multimodal_ocr_entity_analysis_pipeline import (
     ImprovedMultimodalOCREntityAnalysisPipeline,
 )
+from .direct_vlm_entity_pipeline import DirectVLMEntityPipeline
+from .layout_entity_pipeline import LayoutEntityPipeline
 from .base_pipeline import BasePipeline, PipelineOutput
+from .preprocessing import ImagePreprocessor
+from .stages import Stage, StageCache, arun_stages, run_stages
 
 __all__ = [
     "RawOCRPipeline",
     "ImprovedMultimodalOCRPipeline",
     "RawOCREntityAnalysisPipeline",
     "ImprovedMultimodalOCREntityAnalysisPipeline",
+    "DirectVLMEntityPipeline",
+    "LayoutEntityPipeline",
     "BasePipeline",
     "PipelineOutput",
+    "ImagePreprocessor",
+    "Stage",
+    "StageCache",
+    "run_stages",
+    "arun_stages",
 ]
@@ -3,31 +3,113 @@ Base pipeline class defining the interface for all OCR pipelines.
 """
 
 from abc import ABC, abstractmethod
-from typing import TypedDict, Dict, Any
+from typing import Any, Dict, List, NotRequired, Optional, TypedDict
+
+from ollama_client import usage_scope
+from receipt_image import ReceiptImage
+
+from .stages import Stage, arun_stages, run_stages
 
 
 class PipelineOutput(TypedDict):
-    """TypedDict representing the output of an OCR pipeline."""
+    """TypedDict representing the output of an OCR pipeline.
+
+    `stats` holds the LLM calls and prompt/completion tokens spent on the image (stages
+    served from a stage cache cost nothing), and whether fallback stages ran ("fallback").
+    """
 
-    raw_text: str
+    raw_text: Optional[str]  # None for entity-only outputs without a transcription
     structured_data: Dict[str, Any]
     pipeline_name: str
+    stats: NotRequired[Dict[str, Any]]
 
 
 class BasePipeline(ABC):
     """Abstract base class for OCR pipelines.
 
     This class defines the interface that all OCR pipeline implementations must follow.
+    A pipeline is a DAG of named stages (see pipelines.stages); `process` runs them and
+    assembles the output.
+
+    Attributes:
+        executor (str): How the evaluation runner parallelises this pipeline: "process" for
+            CPU-bound (EasyOCR) pipelines, "thread" for pipelines that mostly wait on Ollama.
+        stage_cache (StageCache): Optional cache of stage results, shared between pipelines
+            so that a stage they have in common runs once per image.
     """
 
+    executor = "thread"
+    stage_cache = None
+
+    @abstractmethod
+    def stages(self) -> List[Stage]:
+        """Returns the stages of this pipeline, upstream stages first."""
+        raise NotImplementedError
+
     @abstractmethod
+    def build_output(self, results: Dict[str, Any]) -> PipelineOutput:
+        """Assembles the pipeline output from the stage results.
+
+        Args:
+            results (Dict[str, Any]): Output of every stage by name.
+
+        Returns:
+            PipelineOutput: A dictionary containing raw text, structured data, and pipeline name.
+        """
+        raise NotImplementedError
+
+    def fallback_stages(self, results: Dict[str, Any]) -> List[Stage]:
+        """Returns extra stages to run after inspecting the results (none by default).
+
+        Args:
+            results (Dict[str, Any]): Output of every stage by name.
+
+        Returns:
+            List[Stage]: Stages to run next. They may take inputs from `stages()`, whose
+            results are reused; their own results are merged into `results`.
+        """
+        return []
+
     def process(self, image_path: str) -> PipelineOutput:
         """Process an image and extract OCR data.
 
         Args:
-            image_path (str): The path to the image file to process.
+            image_path (str | ReceiptImage): The path to the image file to process, or an
+                in-memory image (bytes, NumPy array, PIL image or receipt_image.ReceiptImage).
+                It is read and decoded once for all stages.
 
         Returns:
             PipelineOutput: A dictionary containing raw text, structured data, and pipeline name.
         """
-        raise NotImplementedError
+        image_path = ReceiptImage.of(image_path)
+        with usage_scope() as usage:
+            results = run_stages(self.stages(), image_path, self.stage_cache)
+            fallback = self.fallback_stages(results)
+            if fallback:
+                results = run_stages(
+                    self.stages() + fallback, image_path, self.stage_cache, previous=results
+                )
+        output = self.build_output(results)
+        output["stats"] = {**usage, "fallback": bool(fallback)}
+        return output
+
+    async def aprocess(self, image_path: str) -> PipelineOutput:
+        """Async variant of process: Ollama stages are awaited, CPU stages run in a thread.
+
+        Args:
+            image_path (str | ReceiptImage): The path to the image file, or an in-memory image.
+
+        Returns:
+            PipelineOutput: A dictionary containing raw text, structured data, and pipeline name.
+        """
+        image_path = ReceiptImage.of(image_path)
+        with usage_scope() as usage:
+            results = await arun_stages(self.stages(), image_path, self.stage_cache)
+            fallback = self.fallback_stages(results)
+            if fallback:
+                results = await arun_stages(
+                    self.stages() + fallback, image_path, self.stage_cache, previous=results
+                )
+        output = self.build_output(results)
+        output["stats"] = {**usage, "fallback": bool(fallback)}
+        return output
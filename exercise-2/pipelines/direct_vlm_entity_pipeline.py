@@ -0,0 +1,60 @@
+from multimodal_agent import get_multimodal_agent
+from rectification_agent import get_rectification_agent, validate_entities
+
+from .base_pipeline import BasePipeline, PipelineOutput
+from .stages import extract_entities_stage, vlm_entities_stage, vlm_ocr_stage
+
+
+class DirectVLMEntityPipeline(BasePipeline):
+    """
+    Scenario 5: Entities directly from the VLM
+    Asks the VLM for the four SROIE entities as schema-constrained JSON in one call.
+    If they fail validation, falls back to the transcription route (VLM OCR, then LLM
+    entity extraction on the transcribed text).
+    """
+
+    def __init__(self, preprocessor=None, stage_cache=None):
+        """Initialize the DirectVLMEntityPipeline with the VLM and the fallback entity agent.
+
+        Args:
+            preprocessor (ImagePreprocessor): Optional preprocessing applied before the VLM.
+            stage_cache (StageCache): Optional stage result cache shared with other pipelines.
+        """
+        self.vlm = get_multimodal_agent()
+        self.rectification_agent = get_rectification_agent()
+        self.preprocessor = preprocessor
+        self.stage_cache = stage_cache
+
+    def stages(self):
+        return [vlm_entities_stage(self.vlm, self.preprocessor)]
+
+    def fallback_stages(self, results):
+        if validate_entities(results["vlm_entities"]):
+            return []
+        return [
+            vlm_ocr_stage(self.vlm, self.preprocessor),
+            extract_entities_stage(self.rectification_agent, source="vlm_ocr"),
+        ]
+
+    def build_output(self, results) -> PipelineOutput:
+        """Returns the direct entities, or the transcription route's if validation failed.
+
+        Args:
+            results (Dict[str, Any]): Stage results ("vlm_entities", plus "vlm_ocr" and
+                "extract_entities" after a fallback).
+
+        Returns:
+            PipelineOutput: Entities and, after a fallback, the VLM transcription as raw text
+            (the fallback is reported in stats["fallback"]).
+        """
+        if "extract_entities" in results:
+            return {
+                "raw_text": results["vlm_ocr"],
+                "structured_data": results["extract_entities"],
+                "pipeline_name": "Direct VLM Entities",
+            }
+        return {
+            "raw_text": None,  # No transcription (left out of CER/WER)
+            "structured_data": results["vlm_entities"],
+            "pipeline_name": "Direct VLM Entities",
+        }
@@ -0,0 +1,198 @@
+"""
+Persistent SQLite store for stage results (EasyOCR, VLM and LLM outputs).
+
+Results are keyed by the stage content address (image content hash + stage name + model +
+prompt/config hash, see pipelines.stages), so re-running the evaluation scripts on unchanged
+images, models and prompts skips every OCR and Ollama call. The store is bounded in size and
+evicts the least recently used results first. Several processes can share one file.
+
+Inspect or clear it from the exercise-2 directory:
+    python -m pipelines.disk_cache stats
+    python -m pipelines.disk_cache list --stage vlm_ocr
+    python -m pipelines.disk_cache clear --stage extract_entities
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from .stages import MISSING, StageCache, _failed
+
+DEFAULT_PATH = os.getenv("STAGE_CACHE_PATH", ".cache/stages.sqlite3")
+DEFAULT_MAX_SIZE_MB = float(os.getenv("STAGE_CACHE_MAX_MB", "1024"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stage_results (
+    key TEXT PRIMARY KEY,
+    stage TEXT,
+    model TEXT,
+    image TEXT,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stage_results_accessed_at ON stage_results (accessed_at);
+"""
+
+
+class DiskStageCache(StageCache):
+    """StageCache persisted in a SQLite file with LRU eviction.
+
+    Args:
+        path (str): Database file. Defaults to STAGE_CACHE_PATH from .env or
+            ".cache/stages.sqlite3" (relative to the working directory).
+        max_size_mb (float): Size limit of the stored results. Defaults to
+            STAGE_CACHE_MAX_MB from .env or 1024.
+    """
+
+    def __init__(self, path=None, max_size_mb=None):
+        super().__init__()
+        self.path = path or DEFAULT_PATH
+        self.max_bytes = int((max_size_mb or DEFAULT_MAX_SIZE_MB) * 2**20)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def _lookup(self, key):
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT value FROM stage_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return MISSING
+            self._db.execute(
+                "UPDATE stage_results SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return json.loads(row[0])
+
+    def put(self, key, value, stage=None, image=None):
+        # Failed stages return "" or None (correct_stage returns None rather than its input);
+        # keep those out so they are retried. run_stages also bypasses the cache for stages
+        # computed from a failed result
+        if _failed(value):
+            return
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO stage_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    stage.name if stage else None,
+                    stage.model if stage else None,
+                    image,
+                    data,
+                    len(data),
+                    now,
+                    now,
+                ),
+            )
+            self._evict()
+
+    def _evict(self):
+        """Deletes least recently used results until the store fits in max_bytes."""
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM stage_results").fetchone()
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._db.execute(
+            "SELECT key, size FROM stage_results ORDER BY accessed_at"
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM stage_results WHERE key = ?", victims)
+        self.stats["evictions"] = self.stats.get("evictions", 0) + len(victims)
+
+    def entries(self, stage=None, limit=20):
+        """Returns the most recently used results as dicts (without values)."""
+        query = "SELECT key, stage, model, image, size, created_at, accessed_at FROM stage_results"
+        params = ()
+        if stage:
+            query += " WHERE stage = ?"
+            params = (stage,)
+        query += " ORDER BY accessed_at DESC LIMIT ?"
+        columns = ("key", "stage", "model", "image", "size", "created_at", "accessed_at")
+        with self._lock:
+            rows = self._db.execute(query, params + (limit,)).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def clear(self, stage=None):
+        """Deletes all results (or those of one stage). Returns the number deleted."""
+        with self._lock:
+            with self._db:
+                if stage:
+                    cursor = self._db.execute(
+                        "DELETE FROM stage_results WHERE stage = ?", (stage,)
+                    )
+                else:
+                    cursor = self._db.execute("DELETE FROM stage_results")
+            # VACUUM cannot run inside a transaction, but shares the connection with put
+            self._db.execute("VACUUM")
+        return cursor.rowcount
+
+    def metrics(self):
+        """Returns hit/miss counters plus stored results and bytes per stage and model."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT stage, model, COUNT(*), SUM(size) FROM stage_results GROUP BY stage, model"
+            ).fetchall()
+            stats = dict(self.stats)
+        return {
+            **stats,
+            "size": sum(row[2] for row in rows),
+            "bytes": sum(row[3] for row in rows),
+            "max_bytes": self.max_bytes,
+            "by_stage": [
+                {"stage": stage, "model": model, "results": count, "bytes": size}
+                for stage, model, count, size in rows
+            ],
+        }
+
+    def close(self):
+        self._db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the stage result cache.")
+    parser.add_argument("--path", default=DEFAULT_PATH, help="Cache database file.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Show stored results and size per stage.")
+    list_parser = subparsers.add_parser("list", help="List recently used results.")
+    list_parser.add_argument("--stage", default=None)
+    list_parser.add_argument("--limit", type=int, default=20)
+    clear_parser = subparsers.add_parser("clear", help="Delete stored results.")
+    clear_parser.add_argument("--stage", default=None, help="Only clear this stage.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No stage cache at {args.path}")
+        return
+
+    cache = DiskStageCache(args.path)
+    if args.command == "stats":
+        metrics = cache.metrics()
+        metrics.pop("hits")
+        metrics.pop("misses")
+        print(json.dumps(metrics, indent=2))
+    elif args.command == "list":
+        for entry in cache.entries(stage=args.stage, limit=args.limit):
+            accessed = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["accessed_at"]))
+            print(
+                f"{entry['key'][:12]}  {entry['stage']:<18} {entry['model'] or '':<16} "
+                f"image={(entry['image'] or '')[:12]}  {entry['size']:>7} B  {accessed}"
+            )
+    elif args.command == "clear":
+        print(f"Deleted {cache.clear(stage=args.stage)} results from {args.path}")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
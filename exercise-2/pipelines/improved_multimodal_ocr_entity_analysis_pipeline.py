@@ -1,31 +1,77 @@
-from multimodal_agent import MultimodalAgent
-from rectification_agent import RectificationAgent
+from multimodal_agent import get_multimodal_agent
+from rectification_agent import get_rectification_agent
 
 from .base_pipeline import BasePipeline, PipelineOutput
+from .stages import (correct_and_extract_stage, correct_stage,
+                     extract_entities_stage, fallback_stage, prune_stage,
+                     vlm_ocr_stage)
 
 
 class ImprovedMultimodalOCREntityAnalysisPipeline(BasePipeline):
     """
     Scenario 4: Improved OCR using VLM + entity analysis LLM
     Uses VLM for text, then LLM for entity extraction.
-    """
 
-    def __init__(self):
-        self.vlm = MultimodalAgent()
-        self.rectification_agent = RectificationAgent()
+    With combined=True the correction and extraction steps become one structured-output
+    call that corrects only the key fields; the raw text is then the VLM transcription
+    unless full_correction is also set.
 
-    def process(self, image_path: str) -> PipelineOutput:
-        # Step 1: Improved OCR via VLM
-        text = self.vlm.perform_ocr(image_path)
+    With prune=True only the header and the lines around total/date/address cues are sent
+    to entity extraction (or to the combined call, unless full_correction is set).
+    """
 
-        # Step 2: Text correction via Rectification Agent
-        corrected_text = self.rectification_agent.correct_ocr_text(text)
+    def __init__(
+        self,
+        preprocessor=None,
+        stage_cache=None,
+        combined=False,
+        full_correction=False,
+        prune=False,
+    ):
+        self.vlm = get_multimodal_agent()
+        self.rectification_agent = get_rectification_agent()
+        self.preprocessor = preprocessor
+        self.stage_cache = stage_cache
+        self.combined = combined
+        self.full_correction = full_correction
+        self.prune = prune
 
-        # Step 3: Entity extraction on the corrected text
-        entities = self.rectification_agent.extract_entities(corrected_text)
+    def stages(self):
+        if self.combined:
+            # A full correction needs the whole transcription
+            prune = self.prune and not self.full_correction
+            return [
+                vlm_ocr_stage(self.vlm, self.preprocessor),
+                *([prune_stage(source="vlm_ocr")] if prune else []),
+                correct_and_extract_stage(
+                    self.rectification_agent,
+                    source="prune" if prune else "vlm_ocr",
+                    full_correction=self.full_correction,
+                ),
+            ]
+        return [
+            # Step 1: Improved OCR via VLM
+            vlm_ocr_stage(self.vlm, self.preprocessor),
+            # Step 2: Text correction via Rectification Agent (the transcription if it fails)
+            correct_stage(self.rectification_agent, source="vlm_ocr"),
+            fallback_stage("corrected_text", source="correct", fallback="vlm_ocr"),
+            # Step 3: Entity extraction on the corrected (optionally pruned) text
+            *([prune_stage(source="corrected_text")] if self.prune else []),
+            extract_entities_stage(
+                self.rectification_agent, source="prune" if self.prune else "corrected_text"
+            ),
+        ]
 
+    def build_output(self, results) -> PipelineOutput:
+        if self.combined:
+            combined = results["correct_and_extract"] or {}
+            return {
+                "raw_text": combined.get("corrected_text") or results["vlm_ocr"],
+                "structured_data": combined.get("entities"),
+                "pipeline_name": "Improved OCR (Multimodal) + Entity Analysis (combined)",
+            }
         return {
-            "raw_text": corrected_text,
-            "structured_data": entities,
+            "raw_text": results["corrected_text"],
+            "structured_data": results["extract_entities"],
             "pipeline_name": "Improved OCR (Multimodal) + Entity Analysis",
         }
@@ -1,5 +1,6 @@
-from multimodal_agent import MultimodalAgent
+from multimodal_agent import get_multimodal_agent
 from .base_pipeline import BasePipeline, PipelineOutput
+from .stages import vlm_ocr_stage
 
 
 class ImprovedMultimodalOCRPipeline(BasePipeline):
@@ -9,13 +10,17 @@ class ImprovedMultimodalOCRPipeline(BasePipeline):
     No entity extraction (returns raw text).
     """
 
-    def __init__(self):
-        self.vlm = MultimodalAgent()
+    def __init__(self, preprocessor=None, stage_cache=None):
+        self.vlm = get_multimodal_agent()
+        self.preprocessor = preprocessor
+        self.stage_cache = stage_cache
 
-    def process(self, image_path: str) -> PipelineOutput:
-        text = self.vlm.perform_ocr(image_path)
+    def stages(self):
+        return [vlm_ocr_stage(self.vlm, self.preprocessor)]
+
+    def build_output(self, results) -> PipelineOutput:
         return {
-            "raw_text": text,
+            "raw_text": results["vlm_ocr"],
             "structured_data": {},  # No entity analysis
             "pipeline_name": "Improved OCR (Multimodal)",
         }
@@ -0,0 +1,102 @@
+from ocr_engine import get_ocr_engine
+from rectification_agent import get_rectification_agent
+
+from .base_pipeline import BasePipeline, PipelineOutput
+from .stages import (extract_entities_stage, layout_entities_stage,
+                     ocr_boxes_stage, ocr_stage, prune_stage, roi_boxes_stage)
+
+
+class LayoutEntityPipeline(BasePipeline):
+    """
+    Scenario 6: Raw OCR + layout rules, LLM only when needed
+    Uses EasyOCR boxes and layout rules (header position, TOTAL/DATE anchors, amount and date
+    patterns) for entity extraction. The LLM is called only if a field's confidence is below
+    the threshold, and its answer is used for those fields only.
+
+    With roi=True only the regions likely to hold entities (header, TOTAL/DATE rows) are
+    recognized after detection, and the raw text covers those regions only. With prune=True
+    the fallback LLM sees only the header and the lines around total/date/address cues.
+    """
+
+    executor = "process"
+
+    def __init__(
+        self,
+        preprocessor=None,
+        stage_cache=None,
+        confidence_threshold=0.7,
+        roi=False,
+        max_regions=40,
+        prune=False,
+    ):
+        """Initialize the LayoutEntityPipeline with OCR engine and fallback entity agent.
+
+        Args:
+            preprocessor (ImagePreprocessor): Optional preprocessing applied before OCR.
+            stage_cache (StageCache): Optional stage result cache shared with other pipelines.
+            confidence_threshold (float): Fields with a lower rule confidence go to the LLM.
+            roi (bool): Recognize only the likely entity regions instead of every detected box.
+            max_regions (int): Upper bound on recognized regions per receipt when roi=True.
+            prune (bool): Send only the entity-relevant lines to the fallback LLM.
+        """
+        self.ocr = get_ocr_engine()
+        self.rectification_agent = get_rectification_agent()
+        self.preprocessor = preprocessor
+        self.stage_cache = stage_cache
+        self.confidence_threshold = confidence_threshold
+        self.roi = roi
+        self.max_regions = max_regions
+        self.prune = prune
+
+    def stages(self):
+        if self.roi:
+            boxes = roi_boxes_stage(self.ocr, self.preprocessor, max_regions=self.max_regions)
+        else:
+            boxes = ocr_boxes_stage(self.ocr, self.preprocessor)
+        return [
+            boxes,
+            ocr_stage(source=boxes.name),
+            layout_entities_stage(source=boxes.name),
+        ]
+
+    def _uncertain_fields(self, layout):
+        return [
+            field
+            for field, confidence in layout["confidences"].items()
+            if confidence < self.confidence_threshold
+        ]
+
+    def fallback_stages(self, results):
+        if not self._uncertain_fields(results["layout_entities"]):
+            return []
+        if self.prune:
+            boxes = "roi_boxes" if self.roi else "ocr_boxes"
+            return [
+                prune_stage(source=boxes),
+                extract_entities_stage(self.rectification_agent, source="prune"),
+            ]
+        return [extract_entities_stage(self.rectification_agent, source="ocr")]
+
+    def build_output(self, results) -> PipelineOutput:
+        """Combines rule-based entities with LLM answers for the uncertain fields.
+
+        Args:
+            results (Dict[str, Any]): Stage results ("ocr_boxes" or "roi_boxes", "ocr",
+                "layout_entities", plus "extract_entities" if the LLM was needed).
+
+        Returns:
+            PipelineOutput: A dictionary with raw text, extracted entities, and pipeline name.
+        """
+        layout = results["layout_entities"]
+        entities = dict(layout["entities"])
+        llm_entities = results.get("extract_entities") or {}
+        for field in self._uncertain_fields(layout):
+            if llm_entities.get(field):
+                entities[field] = llm_entities[field]
+
+        name = "Raw OCR (ROI) + Layout Rules" if self.roi else "Raw OCR + Layout Rules"
+        return {
+            "raw_text": results["ocr"],
+            "structured_data": entities,
+            "pipeline_name": name,
+        }
@@ -0,0 +1,194 @@
+"""
+Image preprocessing stage shared by the OCR pipelines.
+
+SROIE receipts are high-resolution scans; OCR and VLM cost grows with pixel count while
+accuracy depends mostly on text height. The preprocessor crops to the receipt content,
+deskews, converts to grayscale and downscales so the median text height matches a target,
+then caches the result by image content hash.
+"""
+
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from receipt_image import ReceiptImage
+
+
+class ImagePreprocessor:
+    """Pluggable preprocessing for OCR (NumPy image) and VLM (JPEG bytes) inputs.
+
+    Args:
+        grayscale (bool): Convert to single-channel grayscale.
+        deskew (bool): Rotate small skews (up to `max_skew` degrees) back to horizontal.
+        crop (bool): Crop to the bounding box of the receipt content.
+        target_text_height (int): Median text height (px) to scale to. Images are only downscaled.
+        max_side (int): Upper bound on the longest side after resizing.
+        jpeg_quality (int): JPEG quality used for the VLM payload.
+        max_skew (float): Largest skew angle (degrees) that is corrected.
+        cache_size (int): Number of processed images kept in the in-memory cache.
+    """
+
+    def __init__(
+        self,
+        grayscale=True,
+        deskew=True,
+        crop=True,
+        target_text_height=24,
+        max_side=1600,
+        jpeg_quality=85,
+        max_skew=10.0,
+        cache_size=256,
+    ):
+        self.grayscale = grayscale
+        self.deskew = deskew
+        self.crop = crop
+        self.target_text_height = target_text_height
+        self.max_side = max_side
+        self.jpeg_quality = jpeg_quality
+        self.max_skew = max_skew
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def config(self):
+        """Settings that affect the output (used to key cached stage results)."""
+        return (
+            self.grayscale,
+            self.deskew,
+            self.crop,
+            self.target_text_height,
+            self.max_side,
+            self.jpeg_quality,
+            self.max_skew,
+        )
+
+    def _cached(self, key, compute):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        value = compute()
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def for_ocr(self, image_path: str) -> np.ndarray:
+        """Returns the preprocessed image as a NumPy array, ready for OCREngine.
+
+        Args:
+            image_path (str | ReceiptImage): Path to the image file, or an in-memory image
+                (see receipt_image.ReceiptImage for the accepted types).
+
+        Returns:
+            np.ndarray: Preprocessed image (grayscale if enabled).
+        """
+        image = ReceiptImage.of(image_path)
+        return self._cached((image.digest, "ocr"), lambda: self.process(image.bgr))
+
+    def for_vlm(self, image_path: str) -> bytes:
+        """Returns the preprocessed image re-encoded as JPEG bytes for the VLM.
+
+        Args:
+            image_path (str | ReceiptImage): Path to the image file, or an in-memory image.
+
+        Returns:
+            bytes: JPEG-encoded preprocessed image.
+        """
+        receipt = ReceiptImage.of(image_path)
+        digest = receipt.digest
+
+        def encode():
+            image = self._cached((digest, "ocr"), lambda: self.process(receipt.bgr))
+            ok, buffer = cv2.imencode(
+                ".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+            )
+            if not ok:
+                raise ValueError("JPEG encoding failed")
+            return buffer.tobytes()
+
+        return self._cached((digest, "vlm"), encode)
+
+    def process(self, data) -> np.ndarray:
+        """Runs the preprocessing steps on an image.
+
+        Args:
+            data (bytes | np.ndarray): Encoded image file contents, or a decoded BGR image.
+
+        Returns:
+            np.ndarray: Preprocessed image.
+        """
+        image = data
+        if isinstance(data, bytes):
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Could not decode image")
+
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Dark text on light paper -> text pixels are foreground
+        _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        ink = cv2.morphologyEx(ink, cv2.MORPH_OPEN, np.ones((2, 2), np.uint8))
+
+        if self.grayscale:
+            image = gray
+
+        if self.crop:
+            image, ink = self._crop_to_content(image, ink)
+
+        if self.deskew:
+            image, ink = self._deskew(image, ink)
+
+        scale = self._scale_factor(image, ink)
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        return image
+
+    @staticmethod
+    def _crop_to_content(image, ink, margin=10):
+        points = cv2.findNonZero(ink)
+        if points is None:
+            return image, ink
+        x, y, w, h = cv2.boundingRect(points)
+        x0, y0 = max(x - margin, 0), max(y - margin, 0)
+        x1 = min(x + w + margin, image.shape[1])
+        y1 = min(y + h + margin, image.shape[0])
+        return image[y0:y1, x0:x1], ink[y0:y1, x0:x1]
+
+    def _deskew(self, image, ink):
+        points = cv2.findNonZero(ink)
+        if points is None or len(points) < 100:
+            return image, ink
+        angle = cv2.minAreaRect(points)[-1]
+        # OpenCV >= 4.5 returns angles in (0, 90]; map to (-45, 45]
+        if angle > 45:
+            angle -= 90
+        if abs(angle) < 0.5 or abs(angle) > self.max_skew:
+            return image, ink
+
+        h, w = image.shape[:2]
+        matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        border = 255 if image.ndim == 2 else (255, 255, 255)
+        image = cv2.warpAffine(
+            image, matrix, (w, h), flags=cv2.INTER_LINEAR, borderValue=border
+        )
+        ink = cv2.warpAffine(ink, matrix, (w, h), flags=cv2.INTER_NEAREST, borderValue=0)
+        return image, ink
+
+    def _scale_factor(self, image, ink):
+        """Downscale factor bringing the median text height to the target (and the image within max_side)."""
+        scale = 1.0
+        _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        # Character-sized components only: ignore specks, rules and logos
+        heights = heights[(heights >= 6) & (heights <= 200) & (widths <= heights * 3)]
+        if len(heights) >= 20:
+            scale = min(scale, self.target_text_height / float(np.median(heights)))
+        longest = max(image.shape[:2])
+        if longest * scale > self.max_side:
+            scale = self.max_side / longest
+        return scale
@@ -1,34 +1,58 @@
-from ocr_engine import OCREngine
-from rectification_agent import RectificationAgent
+from ocr_engine import get_ocr_engine
+from rectification_agent import get_rectification_agent
 
 from .base_pipeline import BasePipeline, PipelineOutput
+from .stages import (extract_entities_stage, ocr_boxes_stage, ocr_stage,
+                     prune_stage)
 
 
 class RawOCREntityAnalysisPipeline(BasePipeline):
     """
     Scenario 3: Raw OCR + entity analysis LLM
     Uses EasyOCR for text, then LLM for entity extraction.
+
+    With prune=True the OCR boxes are grouped into lines and only the header and the lines
+    around total/date/address cues are sent to the LLM; the raw text is still the full OCR.
     """
 
-    def __init__(self):
-        """Initialize the RawOCREntityAnalysisPipeline with OCR engine and entity agent."""
-        self.ocr = OCREngine()
-        self.rectification_agent = RectificationAgent()
+    executor = "process"
 
-    def process(self, image_path: str) -> PipelineOutput:
-        """Process an image using raw OCR and LLM-based entity analysis.
+    def __init__(self, preprocessor=None, stage_cache=None, prune=False):
+        """Initialize the RawOCREntityAnalysisPipeline with OCR engine and entity agent.
 
         Args:
-            image_path (str): The path to the image file to process.
+            preprocessor (ImagePreprocessor): Optional preprocessing applied before OCR.
+            stage_cache (StageCache): Optional stage result cache shared with other pipelines.
+            prune (bool): Send only the entity-relevant lines to the LLM.
+        """
+        self.ocr = get_ocr_engine()
+        self.rectification_agent = get_rectification_agent()
+        self.preprocessor = preprocessor
+        self.stage_cache = stage_cache
+        self.prune = prune
+
+    def stages(self):
+        return [
+            ocr_boxes_stage(self.ocr, self.preprocessor),
+            ocr_stage(source="ocr_boxes"),
+            *([prune_stage(source="ocr_boxes")] if self.prune else []),
+            extract_entities_stage(
+                self.rectification_agent, source="prune" if self.prune else "ocr"
+            ),
+        ]
+
+    def build_output(self, results) -> PipelineOutput:
+        """Combines the OCR text with the extracted entities.
+
+        Args:
+            results (Dict[str, Any]): Stage results ("ocr_boxes", "ocr", "prune" when
+                pruning, and "extract_entities").
 
         Returns:
             PipelineOutput: A dictionary with raw text, extracted entities, and pipeline name.
         """
-        text = self.ocr.extract_text(image_path)
-        entities = self.rectification_agent.extract_entities(text)
-
         return {
-            "raw_text": text,
-            "structured_data": entities,
+            "raw_text": results["ocr"],
+            "structured_data": results["extract_entities"],
             "pipeline_name": "Raw OCR + Entity Analysis",
         }
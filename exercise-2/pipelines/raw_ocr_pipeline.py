@@ -1,5 +1,6 @@
-from ocr_engine import OCREngine
+from ocr_engine import get_ocr_engine
 from .base_pipeline import BasePipeline, PipelineOutput
+from .stages import ocr_boxes_stage, ocr_stage
 
 
 class RawOCRPipeline(BasePipeline):
@@ -9,22 +10,33 @@ class RawOCRPipeline(BasePipeline):
     No entity extraction (returns raw text).
     """
 
-    def __init__(self):
-        """Initialize the RawOCRPipeline with an OCR engine."""
-        self.ocr = OCREngine()
+    executor = "process"
 
-    def process(self, image_path: str) -> PipelineOutput:
-        """Process an image using raw OCR to extract text.
+    def __init__(self, preprocessor=None, stage_cache=None):
+        """Initialize the RawOCRPipeline with an OCR engine.
 
         Args:
-            image_path (str): The path to the image file to process.
+            preprocessor (ImagePreprocessor): Optional preprocessing applied before OCR.
+            stage_cache (StageCache): Optional stage result cache shared with other pipelines.
+        """
+        self.ocr = get_ocr_engine()
+        self.preprocessor = preprocessor
+        self.stage_cache = stage_cache
+
+    def stages(self):
+        return [ocr_boxes_stage(self.ocr, self.preprocessor), ocr_stage()]
+
+    def build_output(self, results) -> PipelineOutput:
+        """Wraps the OCR text.
+
+        Args:
+            results (Dict[str, Any]): Stage results ("ocr_boxes", "ocr").
 
         Returns:
             PipelineOutput: A dictionary with raw text, empty structured data, and pipeline name.
         """
-        text = self.ocr.extract_text(image_path)
         return {
-            "raw_text": text,
+            "raw_text": results["ocr"],
             "structured_data": {},  # No entity analysis
             "pipeline_name": "Raw OCR",
         }
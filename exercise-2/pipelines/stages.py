@@ -0,0 +1,454 @@
+"""
+Named pipeline stages and a content-addressed cache of their results.
+
+Each pipeline is a small DAG of stages (ocr, ocr_boxes, roi_boxes, layout_entities,
+vlm_ocr, vlm_entities, correct, corrected_text, prune, extract_entities,
+correct_and_extract). A stage's cache key is derived from its name, its configuration
+(model, prompt, preprocessing) and the keys of its inputs, down to the image content
+hash. Two pipelines that share a stage with the same configuration on the same image
+therefore share its result, so evaluating all scenarios runs each distinct stage once
+per image.
+
+Stages without inputs receive the image as a receipt_image.ReceiptImage, so the file is
+read, hashed and decoded once per run however many stages use it.
+"""
+
+import asyncio
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from layout_extractor import (extract_entities_from_layout, extract_roi_boxes,
+                              prune_boxes, prune_text)
+from multimodal_agent import ENTITY_PROMPT as VLM_ENTITY_PROMPT
+from multimodal_agent import OCR_PROMPT
+from receipt_image import ReceiptImage
+from rectification_agent import COMBINED_PROMPT, CORRECTION_PROMPT, ENTITY_PROMPT
+
+
+def image_digest(image_path) -> str:
+    """Returns the SHA-1 of the image contents (path or in-memory image)."""
+    return ReceiptImage.of(image_path).digest
+
+
+# Marks a cache miss (None is a valid stage result)
+MISSING = object()
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A named pipeline step.
+
+    Args:
+        name (str): Stage name, e.g. "ocr".
+        fn (Callable): Called with the outputs of `inputs` in order, or with the
+            ReceiptImage if the stage has no inputs.
+        inputs (Tuple[str]): Names of the upstream stages.
+        config (tuple): Everything besides the inputs that determines the output
+            (model name, prompt, preprocessing settings).
+        model (str): Model (or engine) name, recorded with cached results for inspection.
+        afn (Callable): Optional coroutine function used by arun_stages; stages without one
+            run `fn` in a worker thread.
+    """
+
+    name: str
+    fn: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    config: tuple = field(default=())
+    model: str = ""
+    afn: Optional[Callable[..., Awaitable[Any]]] = None
+
+    def key(self, input_keys) -> str:
+        """Content address of this stage's result for the given input keys."""
+        payload = repr((self.name, self.config, tuple(input_keys)))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """Thread-safe in-memory store of stage results keyed by content address.
+
+    Concurrent requests for the same key wait for the first computation instead of
+    repeating it. Subclasses change the storage by overriding `_lookup` and `put`.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _lookup(self, key):
+        with self._lock:
+            return self._results.get(key, MISSING)
+
+    def get(self, key):
+        """Returns the stored result, or None."""
+        value = self._lookup(key)
+        return None if value is MISSING else value
+
+    def put(self, key, value, stage=None, image=None):
+        """Stores a stage result. Failed results (None or "") are not stored, so they are retried.
+
+        Args:
+            key (str): Content address from Stage.key.
+            value: The stage output.
+            stage (Stage): The stage that produced it (used by persistent caches).
+            image (str): Content hash of the source image (used by persistent caches).
+        """
+        if _failed(value):
+            return
+        with self._lock:
+            self._results[key] = value
+
+    def _claim(self, key):
+        """Marks `key` as being computed; returns (event, None) or (None, event to wait on)."""
+        with self._lock:
+            event = self._pending.get(key)
+            if event is not None:
+                return None, event
+            event = self._pending[key] = threading.Event()
+            return event, None
+
+    def _release(self, key, event):
+        with self._lock:
+            del self._pending[key]
+        event.set()
+
+    def _count(self, hit):
+        with self._lock:
+            self.stats["hits" if hit else "misses"] += 1
+
+    def get_or_compute(self, key, compute, stage=None, image=None):
+        """Returns the result for `key`, calling `compute()` only if it is not stored yet."""
+        while True:
+            event, busy = self._claim(key)
+            if event is not None:
+                break
+            busy.wait()
+
+        try:
+            value = self._lookup(key)
+            self._count(value is not MISSING)
+            if value is MISSING:
+                value = compute()
+                self.put(key, value, stage=stage, image=image)
+            return value
+        finally:
+            self._release(key, event)
+
+    async def aget_or_compute(self, key, compute, stage=None, image=None):
+        """Async get_or_compute: `compute()` returns an awaitable.
+
+        Storage access, and waiting for another caller computing the same key, run in a thread.
+        """
+        while True:
+            event, busy = self._claim(key)
+            if event is not None:
+                break
+            await asyncio.to_thread(busy.wait)
+
+        try:
+            value = await asyncio.to_thread(self._lookup, key)
+            self._count(value is not MISSING)
+            if value is MISSING:
+                value = await compute()
+                await asyncio.to_thread(self.put, key, value, stage, image)
+            return value
+        finally:
+            self._release(key, event)
+
+    def metrics(self):
+        """Returns hit/miss counters and the number of stored results."""
+        with self._lock:
+            return {**self.stats, "size": len(self._results)}
+
+
+def _failed(value):
+    """Whether a stage result marks a failure: agents return None or "" when a call fails."""
+    return value is None or value == ""
+
+
+def run_stages(stages, image_path, cache=None, previous=None):
+    """Runs a stage DAG on one image.
+
+    Args:
+        stages (List[Stage]): The pipeline's stages. Inputs must name stages in the list.
+        image_path (str | ReceiptImage): Path to the image file, or an in-memory image
+            (bytes, NumPy array or PIL image are wrapped in a ReceiptImage).
+        cache (StageCache): Optional cache shared with other pipelines.
+        previous (Dict[str, Any]): Results of stages that already ran on this image; they
+            are reused instead of run again.
+
+    Returns:
+        Dict[str, Any]: Output of every stage by name.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    image = ReceiptImage.of(image_path)
+    previous = previous or {}
+    results, keys = {}, {}
+    # Stages that failed (None or "") or ran on a failed stage's output; their results are not
+    # cached, since the keys of later runs do not depend on the failure
+    failed = set()
+    digest = None
+
+    def resolve(name):
+        nonlocal digest
+        if name in results:
+            return
+        stage = by_name[name]
+        for dependency in stage.inputs:
+            resolve(dependency)
+
+        if cache is not None:
+            if stage.inputs:
+                input_keys = [keys[dependency] for dependency in stage.inputs]
+            else:
+                digest = digest or image.digest
+                input_keys = [digest]
+            keys[name] = stage.key(input_keys)
+
+        degraded = any(dependency in failed for dependency in stage.inputs)
+        if name in previous:
+            results[name] = previous[name]
+            if degraded or _failed(results[name]):
+                failed.add(name)
+            return
+        if stage.inputs:
+            args = [results[dependency] for dependency in stage.inputs]
+        else:
+            args = [image]
+
+        if cache is None or degraded:
+            results[name] = stage.fn(*args)
+        else:
+            results[name] = cache.get_or_compute(
+                keys[name], lambda: stage.fn(*args), stage=stage, image=digest
+            )
+        if degraded or _failed(results[name]):
+            failed.add(name)
+
+    for stage in stages:
+        resolve(stage.name)
+    return results
+
+
+async def arun_stages(stages, image_path, cache=None, previous=None):
+    """Async run_stages: stages with `afn` are awaited, the others run in a worker thread.
+
+    Args:
+        stages (List[Stage]): The pipeline's stages. Inputs must name stages in the list.
+        image_path (str | ReceiptImage): Path to the image file, or an in-memory image.
+        cache (StageCache): Optional cache shared with other pipelines.
+        previous (Dict[str, Any]): Results of stages that already ran on this image.
+
+    Returns:
+        Dict[str, Any]: Output of every stage by name.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    image = ReceiptImage.of(image_path)
+    previous = previous or {}
+    results, keys = {}, {}
+    # Stages that failed (None or "") or ran on a failed stage's output; their results are not
+    # cached, since the keys of later runs do not depend on the failure
+    failed = set()
+    digest = None
+
+    async def resolve(name):
+        nonlocal digest
+        if name in results:
+            return
+        stage = by_name[name]
+        for dependency in stage.inputs:
+            await resolve(dependency)
+
+        if cache is not None:
+            if stage.inputs:
+                input_keys = [keys[dependency] for dependency in stage.inputs]
+            else:
+                digest = digest or await asyncio.to_thread(lambda: image.digest)
+                input_keys = [digest]
+            keys[name] = stage.key(input_keys)
+
+        degraded = any(dependency in failed for dependency in stage.inputs)
+        if name in previous:
+            results[name] = previous[name]
+            if degraded or _failed(results[name]):
+                failed.add(name)
+            return
+        if stage.inputs:
+            args = [results[dependency] for dependency in stage.inputs]
+        else:
+            args = [image]
+
+        def call():
+            if stage.afn is not None:
+                return stage.afn(*args)
+            return asyncio.to_thread(stage.fn, *args)
+
+        if cache is None or degraded:
+            results[name] = await call()
+        else:
+            results[name] = await cache.aget_or_compute(keys[name], call, stage=stage, image=digest)
+        if degraded or _failed(results[name]):
+            failed.add(name)
+
+    for stage in stages:
+        await resolve(stage.name)
+    return results
+
+
+def _preprocessor_config(preprocessor):
+    return preprocessor.config if preprocessor is not None else None
+
+
+def _jsonable_boxes(boxes):
+    return [[[[int(x), int(y)] for x, y in bbox], text, float(conf)] for bbox, text, conf in boxes]
+
+
+def ocr_boxes_stage(engine, preprocessor=None) -> Stage:
+    """EasyOCR boxes as JSON-friendly [bbox, text, conf] lists."""
+
+    def run(receipt):
+        image = preprocessor.for_ocr(receipt) if preprocessor else receipt
+        return _jsonable_boxes(engine.extract_text_with_boxes(image))
+
+    return Stage(
+        "ocr_boxes",
+        run,
+        config=(
+            "easyocr",
+            tuple(engine.languages),
+            engine.quantize,
+            _preprocessor_config(preprocessor),
+        ),
+        model="easyocr",
+    )
+
+
+def roi_boxes_stage(engine, preprocessor=None, header_regions=8, max_regions=40) -> Stage:
+    """EasyOCR boxes for the likely entity regions only (see layout_extractor.extract_roi_boxes)."""
+
+    def run(receipt):
+        image = preprocessor.for_ocr(receipt) if preprocessor else receipt
+        return _jsonable_boxes(extract_roi_boxes(engine, image, header_regions, max_regions))
+
+    return Stage(
+        "roi_boxes",
+        run,
+        config=(
+            "easyocr",
+            tuple(engine.languages),
+            engine.quantize,
+            _preprocessor_config(preprocessor),
+            header_regions,
+            max_regions,
+        ),
+        model="easyocr",
+    )
+
+
+def ocr_stage(source="ocr_boxes") -> Stage:
+    """EasyOCR text (one box per line, reading order) from an OCR boxes stage.
+
+    Text-only pipelines derive it from ocr_boxes rather than running EasyOCR themselves, so
+    with a shared cache EasyOCR runs once per image for them and the box-based pipelines.
+    """
+    return Stage(
+        "ocr",
+        lambda boxes: "\n".join(text for _, text, _ in boxes),
+        inputs=(source,),
+    )
+
+
+def layout_entities_stage(source="ocr_boxes") -> Stage:
+    """Rule-based entities and confidences from OCR box geometry (see layout_extractor)."""
+
+    def run(boxes):
+        entities, confidences = extract_entities_from_layout(boxes)
+        return {"entities": entities, "confidences": confidences}
+
+    return Stage("layout_entities", run, inputs=(source,), config=("rules", 1))
+
+
+def vlm_ocr_stage(agent, preprocessor=None) -> Stage:
+    """VLM transcription of the (optionally preprocessed) image."""
+    return Stage(
+        "vlm_ocr",
+        lambda receipt: agent.perform_ocr(receipt, preprocessor=preprocessor),
+        config=(agent.vlm.model, OCR_PROMPT, _preprocessor_config(preprocessor)),
+        model=agent.vlm.model,
+        afn=lambda receipt: agent.aperform_ocr(receipt, preprocessor=preprocessor),
+    )
+
+
+def vlm_entities_stage(agent, preprocessor=None) -> Stage:
+    """Schema-constrained entity extraction straight from the (optionally preprocessed) image."""
+    return Stage(
+        "vlm_entities",
+        lambda receipt: agent.extract_entities(receipt, preprocessor=preprocessor),
+        config=(agent.vlm.model, VLM_ENTITY_PROMPT, _preprocessor_config(preprocessor)),
+        model=agent.vlm.model,
+        afn=lambda receipt: agent.aextract_entities(receipt, preprocessor=preprocessor),
+    )
+
+
+def correct_stage(agent, source="vlm_ocr") -> Stage:
+    """LLM correction of the text produced by `source`; None if the call fails.
+
+    The failure is not cached (see run_stages); combine it with fallback_stage to continue
+    with the uncorrected text.
+    """
+    return Stage(
+        "correct",
+        partial(agent.correct_ocr_text, fallback=False),
+        inputs=(source,),
+        config=(agent.llm.model, CORRECTION_PROMPT),
+        model=agent.llm.model,
+        afn=partial(agent.acorrect_ocr_text, fallback=False),
+    )
+
+
+def fallback_stage(name, source, fallback) -> Stage:
+    """The result of `source`, or of `fallback` where `source` failed (returned None or "")."""
+
+    def run(value, fallback_value):
+        return fallback_value if _failed(value) else value
+
+    return Stage(name, run, inputs=(source, fallback), config=("fallback", 1))
+
+
+def prune_stage(source, header_lines=6, context=1) -> Stage:
+    """Entity-relevant lines of `source` (text, or OCR boxes grouped into lines by geometry)."""
+
+    def run(value):
+        if isinstance(value, str):
+            return prune_text(value, header_lines, context)
+        return prune_boxes(value, header_lines, context)
+
+    return Stage("prune", run, inputs=(source,), config=("prune", 1, header_lines, context))
+
+
+def extract_entities_stage(agent, source) -> Stage:
+    """LLM entity extraction from the text produced by `source`."""
+    return Stage(
+        "extract_entities",
+        agent.extract_entities,
+        inputs=(source,),
+        config=(agent.llm.model, ENTITY_PROMPT),
+        model=agent.llm.model,
+        afn=agent.aextract_entities,
+    )
+
+
+def correct_and_extract_stage(agent, source, full_correction=False) -> Stage:
+    """Single structured-output LLM call correcting and extracting the key fields."""
+    return Stage(
+        "correct_and_extract",
+        lambda text: agent.correct_and_extract(text, full_correction=full_correction),
+        inputs=(source,),
+        config=(agent.llm.model, COMBINED_PROMPT, full_correction),
+        model=agent.llm.model,
+        afn=lambda text: agent.acorrect_and_extract(text, full_correction=full_correction),
+    )
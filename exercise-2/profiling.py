@@ -0,0 +1,31 @@
+"""
+Lightweight process resource reporting for the evaluation scripts.
+"""
+
+import time
+from contextlib import contextmanager
+
+import psutil
+
+
+def rss_mb() -> float:
+    """Returns the resident set size of the current process in MB."""
+    return psutil.Process().memory_info().rss / 2**20
+
+
+@contextmanager
+def report_usage(label: str):
+    """Prints wall time and RSS change of the wrapped block.
+
+    Args:
+        label (str): Description printed with the measurement.
+    """
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    rss_after = rss_mb()
+    print(
+        f"{label}: {elapsed:.2f}s, RSS {rss_before:.0f} MB -> {rss_after:.0f} MB "
+        f"({rss_after - rss_before:+.0f} MB)"
+    )
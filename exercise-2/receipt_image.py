@@ -0,0 +1,131 @@
+"""
+In-memory receipt images for the pipelines.
+
+A ReceiptImage wraps a file path, encoded image bytes (e.g. an upload), a decoded NumPy array
+(BGR or grayscale, OpenCV convention) or a PIL image. Everything derived from it (encoded
+bytes, content hash, decoded arrays, base64 VLM payload) is computed on first use and kept
+on the object, so the OCR and VLM stages of a pipeline share one read and one decode.
+"""
+
+import base64
+import hashlib
+import io
+import os
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class ReceiptImage:
+    """A receipt image with lazily computed, cached representations.
+
+    Args:
+        source (str | os.PathLike | bytes | np.ndarray | PIL.Image.Image): Path to the image
+            file, encoded file contents, a decoded BGR/grayscale array or a PIL image.
+        name (str): Label used in logs and results. Defaults to the path.
+    """
+
+    def __init__(self, source, name=None):
+        if isinstance(source, os.PathLike):
+            source = os.fspath(source)
+        if isinstance(source, (bytearray, memoryview)):
+            source = bytes(source)
+        if not isinstance(source, (str, bytes, np.ndarray, Image.Image)):
+            raise TypeError(f"Unsupported image type: {type(source).__name__}")
+        self.source = source
+        self.path = source if isinstance(source, str) else None
+        self.name = name or self.path or f"<{type(source).__name__}>"
+        self._cache = {}
+        # Reentrant: derived values are computed from other derived values under the lock
+        self._lock = threading.RLock()
+
+    @classmethod
+    def of(cls, image):
+        """Returns `image` if it already is a ReceiptImage, else wraps it."""
+        return image if isinstance(image, cls) else cls(image)
+
+    def __repr__(self):
+        return f"ReceiptImage({self.name!r})"
+
+    def cached(self, key, compute):
+        """Returns the value stored under `key`, calling `compute()` once to create it."""
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = compute()
+            return self._cache[key]
+
+    @property
+    def data(self) -> bytes:
+        """Encoded image bytes: the file contents, or a lossless PNG of decoded inputs."""
+
+        def encode():
+            if self.path is not None:
+                with open(self.path, "rb") as f:
+                    return f.read()
+            if isinstance(self.source, bytes):
+                return self.source
+            buffer = io.BytesIO()
+            self.pil().save(buffer, format="PNG")
+            return buffer.getvalue()
+
+        return self.cached("data", encode)
+
+    @property
+    def digest(self) -> str:
+        """SHA-1 of the image content (of the file bytes for paths and encoded inputs)."""
+
+        def compute():
+            if isinstance(self.source, np.ndarray):
+                array = np.ascontiguousarray(self.source)
+                header = repr((array.shape, array.dtype.str)).encode("utf-8")
+                return hashlib.sha1(header + array.tobytes()).hexdigest()
+            return hashlib.sha1(self.data).hexdigest()
+
+        return self.cached("digest", compute)
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """Decoded 3-channel BGR array (OpenCV convention)."""
+
+        def decode():
+            source = self.source
+            if isinstance(source, np.ndarray):
+                if source.ndim == 2 or source.shape[2] == 1:
+                    return cv2.cvtColor(source, cv2.COLOR_GRAY2BGR)
+                if source.shape[2] == 4:
+                    return cv2.cvtColor(source, cv2.COLOR_BGRA2BGR)
+                return source
+            if isinstance(source, Image.Image):
+                return cv2.cvtColor(np.asarray(source.convert("RGB")), cv2.COLOR_RGB2BGR)
+            image = cv2.imdecode(np.frombuffer(self.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError(f"Could not decode image {self.name}")
+            return image
+
+        return self.cached("bgr", decode)
+
+    @property
+    def easyocr_input(self):
+        """(RGB array, grayscale array): what easyocr.utils.reformat_input makes of a file."""
+
+        def convert():
+            if isinstance(self.source, np.ndarray) and self.source.ndim == 2:
+                grey = self.source
+            else:
+                grey = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)
+            return cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB), grey
+
+        return self.cached("easyocr_input", convert)
+
+    def pil(self) -> Image.Image:
+        """The image as a PIL image (RGB)."""
+        if isinstance(self.source, Image.Image):
+            return self.source
+        return Image.fromarray(cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+
+    @property
+    def b64(self) -> str:
+        """Base64 of the encoded bytes, as sent to the VLM."""
+        return self.cached("b64", lambda: base64.standard_b64encode(self.data).decode("utf-8"))
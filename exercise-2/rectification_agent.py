@@ -1,68 +1,252 @@
 import json
 import os
+import re
+import threading
 from textwrap import dedent
 
 from dotenv import find_dotenv, load_dotenv
 from langchain_core.messages import HumanMessage
 from langchain_ollama import ChatOllama
+from ollama_client import get_async_transport, ollama_slot, record_usage
 
 load_dotenv(find_dotenv())
 
+ENTITY_PROMPT = dedent(
+    """
+    Extract the following information from the receipt text below:
+    1. Company Name (company)
+    2. Date (date) in MM/DD/YYYY format
+    3. Address (address)
+    4. Total Amount (total) (Do not include currency symbols)
+
+    Return the result as a Valid JSON object with keys: "company", "date", "address", "total".
+    Do not include any other text or markdown formatting.
+
+    Receipt Text:
+    {ocr_text}
+    """
+)
+
+CORRECTION_PROMPT = """You are an expert at correcting OCR errors. Please correct the following OCR-extracted text, fixing spelling mistakes, improving formatting, and ensuring coherence. Return only the corrected text without any explanation.
+
+OCR Text:
+{ocr_text}"""
+
+ENTITY_FIELDS = ("company", "date", "address", "total")
+
+# JSON schema for Ollama's `format` constraint in correct_and_extract
+ENTITY_SCHEMA = {
+    "type": "object",
+    "properties": {field: {"type": "string"} for field in ENTITY_FIELDS},
+    "required": list(ENTITY_FIELDS),
+}
+
+
+def validate_entities(entities):
+    """
+    Checks that an entity dict has all four SROIE fields filled in plausibly.
+
+    Args:
+        entities (dict): Extracted entities.
+
+    Returns:
+        bool: True if company and address are non-empty, the date contains digits and the
+        total parses as an amount.
+    """
+    if not isinstance(entities, dict):
+        return False
+    values = {field: str(entities.get(field) or "").strip() for field in ENTITY_FIELDS}
+    if not values["company"] or not values["address"]:
+        return False
+    if not re.search(r"\d", values["date"]):
+        return False
+    return re.fullmatch(r"[^\d]*\d[\d,]*(\.\d+)?\s*", values["total"]) is not None
+
+
+COMBINED_PROMPT = dedent(
+    """
+    The receipt text below was produced by OCR and may contain recognition errors
+    (e.g. O/0, I/1, S/5 swaps, broken words). Correct the errors in the following fields
+    and extract them:
+    1. Company Name (company)
+    2. Date (date) in MM/DD/YYYY format
+    3. Address (address)
+    4. Total Amount (total) (Do not include currency symbols)
+
+    Return a JSON object with keys: "company", "date", "address", "total".
+    {full_text_instruction}
+    Receipt Text:
+    {ocr_text}
+    """
+)
+
+FULL_TEXT_INSTRUCTION = (
+    "Also return the full receipt text with all OCR errors corrected (corrected_text).\n"
+)
+
+# Process-wide registry of agents, keyed by (model, base_url)
+_agents = {}
+_agents_lock = threading.Lock()
+
+
+def get_rectification_agent(model=None, base_url=None):
+    """
+    Returns the shared RectificationAgent for a model and Ollama server, creating it on first request.
+
+    Args:
+        model (str): LLM name. Defaults to OLLAMA_LLM from .env or "qwen2.5:7b".
+        base_url (str): Ollama base URL. Defaults to OLLAMA_BASE_URL from .env.
+
+    Returns:
+        RectificationAgent: The shared agent.
+    """
+    model = model or os.getenv("OLLAMA_LLM", "qwen2.5:7b")
+    base_url = base_url or os.getenv("OLLAMA_BASE_URL")
+    with _agents_lock:
+        if (model, base_url) not in _agents:
+            _agents[(model, base_url)] = RectificationAgent(model=model, base_url=base_url)
+        return _agents[(model, base_url)]
+
 
 class RectificationAgent:
-    def __init__(self):
+    def __init__(self, model=None, base_url=None):
+        """
+        Initializes the RectificationAgent with a text LLM via Ollama.
+
+        Args:
+            model (str): LLM name. Defaults to OLLAMA_LLM from .env or "qwen2.5:7b".
+            base_url (str): Ollama base URL. Defaults to OLLAMA_BASE_URL from .env.
+        """
         self.llm = ChatOllama(
-            model=os.getenv("OLLAMA_LLM", "qwen2.5:7b"),
-            base_url=os.getenv("OLLAMA_BASE_URL"),
+            model=model or os.getenv("OLLAMA_LLM", "qwen2.5:7b"),
+            base_url=base_url or os.getenv("OLLAMA_BASE_URL"),
             temperature=0,
+            async_client_kwargs={"transport": get_async_transport()},
+        )
+
+    @staticmethod
+    def _combined_request(ocr_text, full_correction):
+        schema = ENTITY_SCHEMA
+        if full_correction:
+            schema = {
+                **ENTITY_SCHEMA,
+                "properties": {**ENTITY_SCHEMA["properties"], "corrected_text": {"type": "string"}},
+                "required": ENTITY_SCHEMA["required"] + ["corrected_text"],
+            }
+        prompt = COMBINED_PROMPT.format(
+            full_text_instruction=FULL_TEXT_INSTRUCTION if full_correction else "",
+            ocr_text=ocr_text,
         )
+        return [HumanMessage(content=prompt)], schema
+
+    @staticmethod
+    def _combined_result(content):
+        data = json.loads(content)
+        return {
+            "entities": {field: data.get(field, "") for field in ENTITY_FIELDS},
+            "corrected_text": data.get("corrected_text"),
+        }
+
+    @staticmethod
+    def _parse_entities(content):
+        # Simple cleanup to ensure we get JSON
+        content = content.replace("```json", "").replace("```", "").strip()
+        return json.loads(content)
 
     def extract_entities(self, ocr_text):
         """
         Extracts structured data from OCR text using an LLM.
         """
-        prompt = f"""
-        Extract the following information from the receipt text below:
-        1. Company Name (company)
-        2. Date (date) in MM/DD/YYYY format
-        3. Address (address)
-        4. Total Amount (total) (Do not include currency symbols)
-
-        Return the result as a Valid JSON object with keys: "company", "date", "address", "total".
-        Do not include any other text or markdown formatting.
-
-        Receipt Text:
-        {ocr_text}
-        """
+        prompt = ENTITY_PROMPT.format(ocr_text=ocr_text)
         try:
             response = self.llm.invoke([HumanMessage(content=prompt)])
-            content = response.content
-
-            # Simple cleanup to ensure we get JSON
-            content = content.replace("```json", "").replace("```", "").strip()
+            record_usage(response)
+            return self._parse_entities(response.content)
+        except Exception as e:
+            print(f"Error extracting entities: {e}")
 
-            return json.loads(content)
+    async def aextract_entities(self, ocr_text):
+        """
+        Async variant of extract_entities. The call waits for a free Ollama slot.
+        """
+        prompt = ENTITY_PROMPT.format(ocr_text=ocr_text)
+        try:
+            async with ollama_slot():
+                response = await self.llm.ainvoke([HumanMessage(content=prompt)])
+            record_usage(response)
+            return self._parse_entities(response.content)
         except Exception as e:
             print(f"Error extracting entities: {e}")
 
-    def correct_ocr_text(self, ocr_text: str) -> str:
+    def correct_ocr_text(self, ocr_text: str, fallback: bool = True) -> str:
         """Correct and improve OCR-extracted text using an LLM.
 
         Args:
             ocr_text (str): Raw OCR-extracted text that may contain errors.
+            fallback (bool): Return `ocr_text` unchanged if the call fails (None if False).
 
         Returns:
             str: Corrected text with improved formatting and readability.
         """
-        prompt = dedent(
-            f"""You are an expert at correcting OCR errors. Please correct the following OCR-extracted text, fixing spelling mistakes, improving formatting, and ensuring coherence. Return only the corrected text without any explanation.
-
-OCR Text:
-{ocr_text}"""
-        )
+        prompt = CORRECTION_PROMPT.format(ocr_text=ocr_text)
         try:
             response = self.llm.invoke(prompt)
+            record_usage(response)
             return response.content.strip()
         except Exception as e:
             print(f"Error correcting OCR text: {e}")
-            return ocr_text
+            return ocr_text if fallback else None
+
+    async def acorrect_ocr_text(self, ocr_text: str, fallback: bool = True) -> str:
+        """Async variant of correct_ocr_text. The call waits for a free Ollama slot.
+
+        Args:
+            ocr_text (str): Raw OCR-extracted text that may contain errors.
+            fallback (bool): Return `ocr_text` unchanged if the call fails (None if False).
+
+        Returns:
+            str: Corrected text with improved formatting and readability.
+        """
+        prompt = CORRECTION_PROMPT.format(ocr_text=ocr_text)
+        try:
+            async with ollama_slot():
+                response = await self.llm.ainvoke(prompt)
+            record_usage(response)
+            return response.content.strip()
+        except Exception as e:
+            print(f"Error correcting OCR text: {e}")
+            return ocr_text if fallback else None
+
+    def correct_and_extract(self, ocr_text: str, full_correction: bool = False):
+        """Corrects OCR errors in the key fields and extracts them in one structured-output call.
+
+        Replaces correct_ocr_text + extract_entities when only the entities are needed: the
+        model generates the four fields instead of regenerating the whole receipt, and the
+        output is constrained to ENTITY_SCHEMA through Ollama's `format`.
+
+        Args:
+            ocr_text (str): Raw OCR-extracted text that may contain errors.
+            full_correction (bool): Also return the fully corrected receipt text (slower).
+
+        Returns:
+            dict: {"entities": {company, date, address, total}, "corrected_text": str or None},
+            or None if the call fails.
+        """
+        messages, schema = self._combined_request(ocr_text, full_correction)
+        try:
+            response = self.llm.invoke(messages, format=schema)
+            record_usage(response)
+            return self._combined_result(response.content)
+        except Exception as e:
+            print(f"Error in combined correction and extraction: {e}")
+
+    async def acorrect_and_extract(self, ocr_text: str, full_correction: bool = False):
+        """Async variant of correct_and_extract. The call waits for a free Ollama slot."""
+        messages, schema = self._combined_request(ocr_text, full_correction)
+        try:
+            async with ollama_slot():
+                response = await self.llm.ainvoke(messages, format=schema)
+            record_usage(response)
+            return self._combined_result(response.content)
+        except Exception as e:
+            print(f"Error in combined correction and extraction: {e}")
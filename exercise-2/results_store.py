@@ -0,0 +1,193 @@
+"""
+Append-only JSONL store of per-image evaluation results, so long runs can be resumed.
+
+Every processed image is appended as one line as soon as it finishes:
+    {"kind": "result", "pipeline", "image", "config", "status", "latency", "output", "error",
+     "time"}
+keyed by (pipeline label, image ID, config hash). The config hash covers what determines a
+pipeline's output besides the image (pipeline options, preprocessing, models, prompts), so
+results of a changed configuration are never mixed with old ones. Each run of a pipeline also
+appends {"kind": "run", "pipeline", "config", "images", "seconds", "concurrency", "selection",
+"time"} for throughput, where "selection" identifies the image set the run belongs to. When
+a key occurs more than once the last line wins, and a line cut short by a crash is skipped
+when the file is read.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_PATH = "results/evaluation.jsonl"
+
+
+def config_hash(config):
+    """Short, stable hash of a JSON-serialisable configuration dict."""
+    payload = json.dumps(config, sort_keys=True, default=repr)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def image_id(image_path):
+    """Image ID used as key: the file name without directory (same on every machine)."""
+    return os.path.basename(image_path)
+
+
+def shard_results_path(path, shard_index, shard_count):
+    """results/evaluation.jsonl -> results/evaluation.shard-1-of-4.jsonl"""
+    if shard_count <= 1:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard-{shard_index}-of-{shard_count}{extension}"
+
+
+def selection_id(image_paths):
+    """Short, stable hash of a set of images (by image ID, in any order)."""
+    return config_hash(sorted(image_id(path) for path in image_paths))
+
+
+class ResultsStore:
+    """Per-image pipeline results in a JSONL file, read once and appended to as images finish.
+
+    Args:
+        path (str): JSONL file; created (with its directory) on the first append.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._results = {}
+        self._runs = []
+        self._lock = threading.Lock()
+        # Set when the file ends in a partial line, so the next record starts on a new one
+        self._partial_line = False
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                self._partial_line = not line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    print(f"Skipping unreadable line {number} of {self.path}")
+                    continue
+                self._index(record)
+
+    def _index(self, record):
+        if record.get("kind") == "run":
+            self._runs.append(record)
+        else:
+            key = (record["pipeline"], record["image"], record["config"])
+            self._results[key] = record
+
+    def __len__(self):
+        return len(self._results)
+
+    def append(self, record):
+        """Writes a record to the file (flushed immediately) and indexes it."""
+        record.setdefault("time", time.time())
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                if self._partial_line:
+                    f.write("\n")
+                    self._partial_line = False
+                f.write(line)
+            self._index(record)
+
+    def add_result(self, pipeline, config, image_path, output, latency, error=None):
+        """
+        Records the outcome of one image.
+
+        Args:
+            pipeline (str): Pipeline label (e.g. "Raw OCR + Entity (pruned)").
+            config (str): Config hash from config_hash.
+            image_path (str): Image path; stored by image ID.
+            output (PipelineOutput): Pipeline output, or None if it failed.
+            latency (float): Processing time in seconds.
+            error (str): Error message if the pipeline raised.
+        """
+        self.append(
+            {
+                "kind": "result",
+                "pipeline": pipeline,
+                "image": image_id(image_path),
+                "config": config,
+                "status": "failed" if error is not None else "done",
+                "latency": latency,
+                "output": output,
+                "error": error,
+            }
+        )
+
+    def add_run(
+        self, pipeline, config, images, seconds, concurrency, settings=None, selection=None
+    ):
+        """Records one run of a pipeline over `images` new images taking `seconds`.
+
+        `selection` identifies the evaluated image set (see selection_id), so resumed runs
+        can tell their own earlier chunks from runs over other samples.
+        """
+        self.append(
+            {
+                "kind": "run",
+                "pipeline": pipeline,
+                "config": config,
+                "images": images,
+                "seconds": seconds,
+                "concurrency": concurrency,
+                "settings": settings,
+                "selection": selection,
+            }
+        )
+
+    def results(self, pipeline, config, image_paths=None):
+        """
+        Returns the latest result record per image for a pipeline configuration.
+
+        Args:
+            pipeline (str): Pipeline label.
+            config (str): Config hash.
+            image_paths (List[str]): Restrict to these images, in this order (all if None).
+
+        Returns:
+            List[dict]: Result records (missing images are left out).
+        """
+        with self._lock:
+            if image_paths is None:
+                return [
+                    record
+                    for (name, _, cfg), record in self._results.items()
+                    if name == pipeline and cfg == config
+                ]
+            keys = [(pipeline, image_id(path), config) for path in image_paths]
+            return [self._results[key] for key in keys if key in self._results]
+
+    def completed(self, pipeline, config):
+        """Image IDs that finished without error for a pipeline configuration."""
+        return {
+            record["image"]
+            for record in self.results(pipeline, config)
+            if record["status"] == "done"
+        }
+
+    def configurations(self):
+        """(pipeline, config hash) pairs with results, in the order they first appear."""
+        with self._lock:
+            return list(dict.fromkeys((name, cfg) for name, _, cfg in self._results))
+
+    def runs(self, pipeline, config, selection=None):
+        """Run records of a pipeline configuration (over one image set if given), oldest first."""
+        with self._lock:
+            return [
+                run
+                for run in self._runs
+                if run["pipeline"] == pipeline
+                and run["config"] == config
+                and (selection is None or run.get("selection") == selection)
+            ]
@@ -1,102 +1,795 @@
+import argparse
+import asyncio
 import glob
+import hashlib
 import json
+import multiprocessing
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 
-import numpy as np
 from evaluator import Evaluator
-from pipelines import (ImprovedMultimodalOCREntityAnalysisPipeline,
-                       ImprovedMultimodalOCRPipeline,
-                       RawOCREntityAnalysisPipeline, RawOCRPipeline)
+from pipelines import (DirectVLMEntityPipeline, ImagePreprocessor,
+                       ImprovedMultimodalOCREntityAnalysisPipeline,
+                       ImprovedMultimodalOCRPipeline, LayoutEntityPipeline,
+                       RawOCREntityAnalysisPipeline, RawOCRPipeline,
+                       StageCache)
+from pipelines.disk_cache import DEFAULT_PATH as DEFAULT_STAGE_CACHE_PATH
+from pipelines.disk_cache import DiskStageCache
+from multimodal_agent import ENTITY_PROMPT as VLM_ENTITY_PROMPT
+from multimodal_agent import OCR_PROMPT
+from ollama_client import run_sync
+from profiling import rss_mb
+from rectification_agent import COMBINED_PROMPT, CORRECTION_PROMPT, ENTITY_PROMPT
+from results_store import DEFAULT_PATH as DEFAULT_RESULTS_PATH
+from results_store import (ResultsStore, config_hash, image_id,
+                           selection_id, shard_results_path)
 from tqdm import tqdm
 
+# Pipelines to evaluate
+PIPELINES = {
+    "Raw OCR": RawOCRPipeline,
+    "Raw OCR + Entity": RawOCREntityAnalysisPipeline,
+    "Raw OCR + Layout Rules": LayoutEntityPipeline,
+    "Improved Multimodal OCR": ImprovedMultimodalOCRPipeline,
+    "Improved Multimodal OCR + Entity": ImprovedMultimodalOCREntityAnalysisPipeline,
+    "Direct VLM Entities": DirectVLMEntityPipeline,
+}
 
-def run_evaluation(num_samples=10):
-    dataset_dir = "data/SROIE2019/train"
-    images_dir = os.path.join(dataset_dir, "img")
+# Default concurrency per executor kind (see BasePipeline.executor).
+# EasyOCR pipelines get one process per 4 cores; Ollama-bound pipelines are limited by
+# how many requests the server runs in parallel (OLLAMA_NUM_PARALLEL).
+DEFAULT_CONCURRENCY = {
+    "process": max(1, (os.cpu_count() or 1) // 4),
+    "thread": int(os.getenv("OLLAMA_NUM_PARALLEL", "4")),
+}
+
+DATASET_DIR = "data/SROIE2019/train"
+
+_worker_pipeline = None
+
+
+def pipeline_config(name, preprocessor=None, pipeline_kwargs=None):
+    """
+    Everything besides the image that determines a pipeline's results, for keying them in
+    the results store: pipeline options, preprocessing, models and prompts.
+
+    Args:
+        name (str): Key in PIPELINES.
+        preprocessor (ImagePreprocessor): Optional preprocessing stage.
+        pipeline_kwargs (dict): Extra constructor arguments.
+
+    Returns:
+        dict: JSON-serialisable configuration (hash it with results_store.config_hash).
+    """
+    prompts = repr(
+        (OCR_PROMPT, VLM_ENTITY_PROMPT, CORRECTION_PROMPT, ENTITY_PROMPT, COMBINED_PROMPT)
+    )
+    return {
+        "pipeline": name,
+        "kwargs": pipeline_kwargs or {},
+        "preprocessing": list(preprocessor.config) if preprocessor is not None else None,
+        "llm": os.getenv("OLLAMA_LLM", "qwen2.5:7b"),
+        "vlm": os.getenv("OLLAMA_VLM", "llava:7b"),
+        "ocr_quantize": os.getenv("OCR_QUANTIZE", "1"),
+        "prompts": hashlib.sha1(prompts.encode("utf-8")).hexdigest()[:12],
+    }
+
+
+def shard_of(image_path, shard_count):
+    """Shard of an image: a stable hash of its ID, the same on every machine and run."""
+    digest = hashlib.sha1(image_id(image_path).encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % shard_count
+
+
+def select_images(images_dir, num_samples=None, shard_index=0, shard_count=1):
+    """
+    Selects the evaluation images deterministically.
+
+    Args:
+        images_dir (str): Directory of the .jpg images.
+        num_samples (int): Take the first num_samples images in sorted order (all if None).
+        shard_index (int): Shard to keep, in [0, shard_count).
+        shard_count (int): Number of shards the sample is split into by shard_of.
+
+    Returns:
+        List[str]: Sorted image paths of the shard.
+    """
+    images = sorted(glob.glob(os.path.join(images_dir, "*.jpg")))
+    if num_samples:
+        images = images[:num_samples]
+    if shard_count > 1:
+        images = [path for path in images if shard_of(path, shard_count) == shard_index]
+    return images
+
+
+def _init_worker(name, preprocess, num_threads, stage_cache_path, pipeline_kwargs):
+    """Process pool initializer: builds the pipeline once per worker."""
+    global _worker_pipeline
+    # Split the cores between workers unless the thread count is configured explicitly
+    os.environ.setdefault("OCR_NUM_THREADS", str(num_threads))
+    _worker_pipeline = PIPELINES[name](
+        preprocessor=ImagePreprocessor() if preprocess else None,
+        stage_cache=DiskStageCache(stage_cache_path) if stage_cache_path else None,
+        **pipeline_kwargs,
+    )
+
+
+def _process_image(pipeline, image_path):
+    """Runs a pipeline on one image and returns (output, latency, error)."""
+    start = time.perf_counter()
+    try:
+        output = pipeline.process(image_path)
+        error = None
+    except Exception as e:
+        output = None
+        error = str(e)
+    return output, time.perf_counter() - start, error
+
+
+def _process_in_worker(image_path):
+    return _process_image(_worker_pipeline, image_path)
+
+
+def _collect(test_images, runs, on_result):
+    """Consumes the runs as they complete, reporting each to `on_result`."""
+    collected = []
+    for image_path, run in zip(test_images, runs):
+        if on_result is not None:
+            on_result(image_path, *run)
+        collected.append(run)
+    return collected
+
+
+async def _process_images_async(pipeline, test_images, concurrency, on_result=None):
+    """Runs pipeline.aprocess over the images with at most `concurrency` images in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    progress = tqdm(total=len(test_images))
+
+    async def process_one(image_path):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                output = await pipeline.aprocess(image_path)
+                error = None
+            except Exception as e:
+                output = None
+                error = str(e)
+            latency = time.perf_counter() - start
+            if on_result is not None:
+                on_result(image_path, output, latency, error)
+            progress.update()
+            return output, latency, error
+
+    try:
+        return await asyncio.gather(*(process_one(image_path) for image_path in test_images))
+    finally:
+        progress.close()
+
+
+def run_pipeline(
+    name,
+    test_images,
+    concurrency=1,
+    preprocessor=None,
+    stage_cache=None,
+    use_async=False,
+    pipeline_kwargs=None,
+    on_result=None,
+):
+    """
+    Runs a pipeline over the images with its executor kind and concurrency.
+
+    Args:
+        name (str): Key in PIPELINES.
+        test_images (List[str]): Image paths.
+        concurrency (int): Worker processes (EasyOCR-bound) or in-flight requests (Ollama-bound).
+        preprocessor (ImagePreprocessor): Optional preprocessing stage.
+        stage_cache (StageCache): Optional stage results shared with the other pipelines.
+            An in-memory cache lives in this process, so the pipeline then runs in threads;
+            worker processes open their own connection to a DiskStageCache.
+        use_async (bool): Run Ollama-bound pipelines with aprocess on the shared event loop
+            instead of a thread per in-flight image.
+        pipeline_kwargs (dict): Extra constructor arguments (e.g. {"combined": True}).
+        on_result (Callable): Called with (image_path, output, latency, error) as each
+            image finishes, e.g. to checkpoint results.
+
+    Returns:
+        List of (output, latency, error) in the order of test_images.
+    """
+    pipeline_cls = PIPELINES[name]
+    pipeline_kwargs = pipeline_kwargs or {}
+
+    shareable = stage_cache is None or isinstance(stage_cache, DiskStageCache)
+    if pipeline_cls.executor == "process" and concurrency > 1 and shareable:
+        with ProcessPoolExecutor(
+            max_workers=concurrency,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                name,
+                preprocessor is not None,
+                max(1, (os.cpu_count() or 1) // concurrency),
+                getattr(stage_cache, "path", None),
+                pipeline_kwargs,
+            ),
+        ) as executor:
+            return _collect(
+                test_images,
+                tqdm(executor.map(_process_in_worker, test_images), total=len(test_images)),
+                on_result,
+            )
+
+    pipeline = pipeline_cls(preprocessor=preprocessor, stage_cache=stage_cache, **pipeline_kwargs)
+    if use_async and pipeline_cls.executor == "thread":
+        return run_sync(_process_images_async(pipeline, test_images, concurrency, on_result))
+    if concurrency <= 1:
+        return _collect(
+            test_images,
+            (_process_image(pipeline, image_path) for image_path in tqdm(test_images)),
+            on_result,
+        )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return _collect(
+            test_images,
+            tqdm(
+                executor.map(partial(_process_image, pipeline), test_images),
+                total=len(test_images),
+            ),
+            on_result,
+        )
+
+
+def summarize_records(evaluator, records, runs=()):
+    """
+    Summary metrics of a pipeline from its per-image result records.
+
+    Args:
+        evaluator (Evaluator): Evaluator of the dataset the images belong to.
+        records (List[dict]): Result records as stored by ResultsStore.add_result.
+        runs (List[dict]): Run records ({"images", "seconds"}) for total time and throughput.
+
+    Returns:
+        dict: Evaluator.summarize output plus total time and throughput (images that
+        finished without error per second; failed images are not counted).
+    """
+    done = [record for record in records if record["status"] == "done"]
+    per_image_metrics = evaluator.evaluate_batch(
+        [record["output"] for record in done],
+        [evaluator.load_ground_truth(record["image"]) for record in done],
+    )
+    summary = evaluator.summarize(
+        per_image_metrics,
+        [record["latency"] for record in done],
+        [record["output"].get("stats", {}) for record in done],
+    )
+    seconds = sum(run["seconds"] for run in runs)
+    summary["Total Time (seconds)"] = round(seconds, 2)
+    if seconds > 0:
+        summary["Throughput (images/sec)"] = round(len(done) / seconds, 3)
+    return summary
+
+
+def evaluate_pipeline(
+    name,
+    test_images,
+    evaluator,
+    concurrency=1,
+    preprocessor=None,
+    label=None,
+    stage_cache=None,
+    use_async=False,
+    pipeline_kwargs=None,
+    store=None,
+    resume=False,
+):
+    """
+    Runs one pipeline over the images and returns its summary metrics.
+
+    With a ResultsStore every image's result is appended as soon as it finishes, keyed by
+    (label, image, config hash), and the summary is computed from the store. With
+    resume=True images already done for the same label and configuration are skipped.
+    """
+    label = label or name
+    config = pipeline_config(name, preprocessor, pipeline_kwargs)
+    key = config_hash(config)
+
+    pending = test_images
+    if store is not None and resume:
+        completed = store.completed(label, key)
+        pending = [path for path in test_images if image_id(path) not in completed]
+        print(f"\n{label}: {len(test_images) - len(pending)} of {len(test_images)} images done")
+
+    on_result = None
+    if store is not None:
+
+        def on_result(image_path, output, latency, error):
+            store.add_result(label, key, image_path, output, latency, error)
+
+    print(f"\n--- Running Evaluation for: {label} (concurrency={concurrency}) ---")
+
+    start_time = time.perf_counter()
+    runs = []
+    if pending:
+        runs = run_pipeline(
+            name,
+            pending,
+            concurrency,
+            preprocessor,
+            stage_cache,
+            use_async,
+            pipeline_kwargs,
+            on_result,
+        )
+    total_time = time.perf_counter() - start_time
+
+    for image_path, (output, latency, error) in zip(pending, runs):
+        if error is not None:
+            print(f"Error processing {image_path}: {error}")
+
+    if store is not None:
+        selection = selection_id(test_images)
+        store.add_run(label, key, len(pending), total_time, concurrency, config, selection)
+        records = store.results(label, key, test_images)
+        # Resumed runs report the time and throughput of all chunks of the current pass over
+        # these images together: the runs since the last one that started with none done
+        run_records = store.runs(label, key, selection)
+        if resume:
+            starts = [i for i, run in enumerate(run_records) if run["images"] == len(test_images)]
+            run_records = run_records[starts[-1] if starts else 0 :]
+        else:
+            run_records = run_records[-1:]
+    else:
+        records = [
+            {
+                "image": image_id(image_path),
+                "status": "failed" if error is not None else "done",
+                "latency": latency,
+                "output": output,
+            }
+            for image_path, (output, latency, error) in zip(pending, runs)
+        ]
+        run_records = [{"images": len(pending), "seconds": total_time}]
+
+    # Aggregate results
+    avg_results = summarize_records(evaluator, records, run_records)
+    avg_results["Concurrency"] = concurrency
+    avg_results["RSS After (MB)"] = round(rss_mb(), 1)
+
+    print(f"Results for {label}:")
+    print(json.dumps(avg_results, indent=2))
+    return avg_results
+
+
+def run_evaluation(
+    num_samples=10,
+    preprocess=False,
+    compare_preprocessing=False,
+    concurrency=None,
+    share_stages=False,
+    stage_cache_path=None,
+    use_async=False,
+    compare_combined=False,
+    compare_roi=False,
+    compare_pruning=False,
+    results_path=DEFAULT_RESULTS_PATH,
+    resume=False,
+    pipelines=None,
+    shard_index=0,
+    shard_count=1,
+):
+    """
+    Evaluates all pipelines on SROIE train images.
+
+    Args:
+        num_samples (int): Number of images to evaluate (all if None or larger than the set).
+        preprocess (bool): Run the pipelines with the image preprocessing stage.
+        compare_preprocessing (bool): Also run every pipeline with preprocessing and report
+            the latency and CER/WER/entity accuracy change against the unprocessed run.
+        concurrency (dict): Optional per-pipeline concurrency overrides {name: int};
+            other pipelines use DEFAULT_CONCURRENCY for their executor kind.
+        share_stages (bool): Share stage results (EasyOCR, VLM transcription, correction,
+            entity extraction) between pipelines, so each distinct stage runs once per image.
+            Latencies and LLM usage of later pipelines then exclude the stages they reuse,
+            and the in-memory cache keeps EasyOCR pipelines in threads of this process
+            instead of the process pool. Off by default, so every pipeline is timed on its own.
+        stage_cache_path (str): Persist stage results in this SQLite file, so re-runs on
+            unchanged images, models and prompts skip the OCR and Ollama calls.
+        use_async (bool): Run Ollama-bound pipelines through the async agent methods.
+        compare_combined (bool): Also run the multimodal entity pipeline with the single-call
+            correction + extraction and report latency, tokens and accuracy against it.
+        compare_roi (bool): Also run the layout rules pipeline with region-of-interest OCR
+            (recognition of the likely entity regions only) and compare it with full OCR.
+        compare_pruning (bool): Also run the raw OCR entity pipeline with the prompt pruned
+            to the entity-relevant lines and report the prompt token and accuracy change.
+        results_path (str): Append every image's result to this JSONL results store as it
+            finishes and compute the summaries from it (None to keep results in memory).
+        resume (bool): Skip images the store already has results for with the same
+            pipeline configuration, e.g. after an interrupted run.
+        pipelines (List[str]): Names from PIPELINES to evaluate (all if None); comparisons
+            involving other pipelines are skipped.
+        shard_index (int): With shard_count > 1, evaluate only this shard of the sample and
+            write its results to a per-shard file (see shard_results_path); combine the
+            shards with merge_results.
+        shard_count (int): Number of shards, e.g. one per machine with its own Ollama.
+    """
+    images_dir = os.path.join(DATASET_DIR, "img")
 
     if not os.path.exists(images_dir):
         print(f"Error: Dataset directory not found at {images_dir}")
         return
 
-    evaluator = Evaluator(dataset_dir)
+    evaluator = Evaluator(DATASET_DIR)
 
-    all_images = glob.glob(os.path.join(images_dir, "*.jpg"))
-    if not all_images:
+    test_images = select_images(images_dir, num_samples, shard_index, shard_count)
+    if not test_images:
         print("No images found.")
         return
 
-    # Select samples
-    if num_samples and num_samples < len(all_images):
-        test_images = all_images[:num_samples]
-        print(f"Evaluating on {num_samples} random samples out of {len(all_images)}...")
+    if shard_count > 1:
+        print(f"Evaluating shard {shard_index} of {shard_count}: {len(test_images)} images...")
     else:
-        test_images = all_images
-        print(f"Evaluating on all {len(all_images)} images...")
-
-    # Define pipelines to evaluate
-    pipelines = {
-        "Raw OCR": RawOCRPipeline(),
-        "Raw OCR + Entity": RawOCREntityAnalysisPipeline(),
-        "Improved Multimodal OCR": ImprovedMultimodalOCRPipeline(),
-        "Improved Multimodal OCR + Entity": ImprovedMultimodalOCREntityAnalysisPipeline(),
-    }
+        print(f"Evaluating on the first {len(test_images)} images (sorted by name)...")
+
+    pipelines = list(pipelines or PIPELINES)
+
+    concurrency = concurrency or {}
+
+    def pipeline_concurrency(name):
+        return concurrency.get(name, DEFAULT_CONCURRENCY[PIPELINES[name].executor])
+
+    # One preprocessor for all in-process pipelines so its cache is shared
+    preprocessor = ImagePreprocessor() if preprocess or compare_preprocessing else None
+
+    # Stage keys include the preprocessing settings, so one cache serves both variants
+    if stage_cache_path:
+        stage_cache = DiskStageCache(stage_cache_path)
+    else:
+        stage_cache = StageCache() if share_stages else None
+
+    if results_path:
+        results_path = shard_results_path(results_path, shard_index, shard_count)
+    store = ResultsStore(results_path) if results_path else None
+    if store is not None:
+        print(f"Results store: {results_path} ({len(store)} results)")
 
     results = {}
 
-    for name, pipeline in pipelines.items():
-        print(f"\n--- Running Evaluation for: {name} ---")
+    def run_uncached(name, label, pipeline_kwargs=None):
+        """Runs a pipeline variant without the stage cache, so its latency and calls are its own."""
+        return evaluate_pipeline(
+            name,
+            test_images,
+            evaluator,
+            concurrency=pipeline_concurrency(name),
+            preprocessor=preprocessor if preprocess and not compare_preprocessing else None,
+            label=label,
+            use_async=use_async,
+            store=store,
+            resume=resume,
+            pipeline_kwargs=pipeline_kwargs,
+        )
 
-        pipeline_metrics = {"ocr_cer": [], "ocr_wer": [], "entity_accuracy": []}
-        start_time = time.perf_counter()
+    def uncached_label(name):
+        """Label of a run of `name` without the stage cache, running it first if needed."""
+        if stage_cache is None:
+            return name
+        label = f"{name} (uncached)"
+        if label not in results:
+            results[label] = run_uncached(name, label)
+        return label
 
-        for image_path in tqdm(test_images):
-            try:
-                # 1. Run Pipeline
-                output = pipeline.process(image_path)
+    for name in pipelines:
+        results[name] = evaluate_pipeline(
+            name,
+            test_images,
+            evaluator,
+            concurrency=pipeline_concurrency(name),
+            preprocessor=preprocessor if preprocess and not compare_preprocessing else None,
+            stage_cache=stage_cache,
+            use_async=use_async,
+            store=store,
+            resume=resume,
+        )
 
-                # 2. Load Truth
-                gt = evaluator.load_ground_truth(image_path)
+    if compare_preprocessing:
+        comparison = {}
+        for name in pipelines:
+            label = f"{name} (preprocessed)"
+            results[label] = evaluate_pipeline(
+                name,
+                test_images,
+                evaluator,
+                concurrency=pipeline_concurrency(name),
+                preprocessor=preprocessor,
+                label=label,
+                stage_cache=stage_cache,
+                use_async=use_async,
+                store=store,
+                resume=resume,
+            )
+            comparison[name] = evaluator.compare(results[name], results[label])
 
-                # 3. Evaluate
-                metrics = evaluator.evaluate(output, gt)
+        print("\n\n=== Preprocessing Comparison (before -> after) ===")
+        print(json.dumps(comparison, indent=2))
 
-                if "error" not in metrics:
-                    if "ocr_cer" in metrics:
-                        pipeline_metrics["ocr_cer"].append(metrics["ocr_cer"])
-                    if "ocr_wer" in metrics:
-                        pipeline_metrics["ocr_wer"].append(metrics["ocr_wer"])
-                    if "entity_accuracy" in metrics:
-                        pipeline_metrics["entity_accuracy"].append(
-                            metrics["entity_accuracy"]
-                        )
+    # Layout rules call the LLM only for low-confidence fields. Both run uncached, so
+    # neither reuses the EasyOCR boxes of the other
+    if "Raw OCR + Entity" in results and "Raw OCR + Layout Rules" in results:
+        baseline = uncached_label("Raw OCR + Entity")
+        layout = uncached_label("Raw OCR + Layout Rules")
+        print("\n\n=== Raw OCR + Layout Rules vs. Raw OCR + Entity ===")
+        print(json.dumps(evaluator.compare(results[baseline], results[layout]), indent=2))
 
-            except Exception as e:
-                print(f"Error processing {image_path}: {e}")
-
-        end_time = time.perf_counter()
-        total_time = end_time - start_time
-
-        # Aggregate results
-        avg_results = {}
-        if pipeline_metrics["ocr_cer"]:
-            avg_results["Average CER"] = np.mean(pipeline_metrics["ocr_cer"])
-        if pipeline_metrics["ocr_wer"]:
-            avg_results["Average WER"] = np.mean(pipeline_metrics["ocr_wer"])
-        if pipeline_metrics["entity_accuracy"]:
-            avg_results["Average Entity Accuracy"] = np.mean(
-                pipeline_metrics["entity_accuracy"]
+    # Latency of the one-call VLM route against VLM transcription + LLM extraction
+    if "Improved Multimodal OCR + Entity" in results and "Direct VLM Entities" in results:
+        print("\n\n=== Direct VLM Entities vs. Improved Multimodal OCR + Entity ===")
+        if stage_cache is not None:
+            print("(shared stages are cached; run without --share-stages for standalone latencies)")
+        print(
+            json.dumps(
+                evaluator.compare(
+                    results["Improved Multimodal OCR + Entity"], results["Direct VLM Entities"]
+                ),
+                indent=2,
             )
-        avg_results["Total Time (seconds)"] = round(total_time, 2)
+        )
 
-        results[name] = avg_results
+    if compare_combined and "Improved Multimodal OCR + Entity" in results:
+        # Both variants run uncached: a cached vlm_ocr would leave the transcription out of
+        # the combined variant's latency
+        name = uncached_label("Improved Multimodal OCR + Entity")
+        label = "Improved Multimodal OCR + Entity (combined)"
+        results[label] = run_uncached(
+            "Improved Multimodal OCR + Entity", label, pipeline_kwargs={"combined": True}
+        )
+        print("\n\n=== Combined Correction + Extraction (three calls -> two calls) ===")
+        print(json.dumps(evaluator.compare(results[name], results[label]), indent=2))
 
-        print(f"Results for {name}:")
-        print(json.dumps(avg_results, indent=2))
+    if compare_roi and "Raw OCR + Layout Rules" in results:
+        name = "Raw OCR + Layout Rules"
+        label = f"{name} (ROI)"
+        results[label] = evaluate_pipeline(
+            name,
+            test_images,
+            evaluator,
+            concurrency=pipeline_concurrency(name),
+            preprocessor=preprocessor if preprocess and not compare_preprocessing else None,
+            label=label,
+            stage_cache=stage_cache,
+            use_async=use_async,
+            store=store,
+            resume=resume,
+            pipeline_kwargs={"roi": True},
+        )
+        # CER/WER only cover the recognized regions; entity accuracy is the comparable metric
+        print("\n\n=== Region-of-interest OCR (all regions -> ROI) ===")
+        print(json.dumps(evaluator.compare(results[name], results[label]), indent=2))
+
+    if compare_pruning and "Raw OCR + Entity" in results:
+        name = "Raw OCR + Entity"
+        label = f"{name} (pruned)"
+        results[label] = evaluate_pipeline(
+            name,
+            test_images,
+            evaluator,
+            concurrency=pipeline_concurrency(name),
+            preprocessor=preprocessor if preprocess and not compare_preprocessing else None,
+            label=label,
+            stage_cache=stage_cache,
+            use_async=use_async,
+            store=store,
+            resume=resume,
+            pipeline_kwargs={"prune": True},
+        )
+        print("\n\n=== Prompt Pruning (full OCR text -> entity-relevant lines) ===")
+        print(json.dumps(evaluator.compare(results[name], results[label]), indent=2))
+
+    if stage_cache is not None:
+        print("\n\n=== Stage Cache ===")
+        print(json.dumps(stage_cache.metrics(), indent=2))
 
     print("\n\n=== Final Summary ===")
     print(json.dumps(results, indent=2))
+    return results
+
+
+def merge_results(paths, summary_path=None):
+    """
+    Combines the results stores of several shards into the final summary.
+
+    Accuracy averages, latency percentiles and LLM usage are recomputed from the per-image
+    results of all shards, so every image counts once however the shards were sized. The
+    shards run in parallel, so the total time is that of the slowest shard (the sum of its
+    runs) and throughput is all images done without error over that time.
+
+    Args:
+        paths (List[str]): Results store files, e.g. one per shard.
+        summary_path (str): Optionally also write the summary to this JSON file.
+
+    Returns:
+        dict: Summary per pipeline label (suffixed with the config hash when a label was
+        run with several configurations).
+    """
+    evaluator = Evaluator(DATASET_DIR)
+    stores = [ResultsStore(path) for path in paths]
+    keys = list(dict.fromkeys(key for store in stores for key in store.configurations()))
+    labels = [label for label, _ in keys]
+
+    results = {}
+    for label, key in keys:
+        # An image found in several files (e.g. a shard run twice) counts once, latest first
+        records = {}
+        for store in stores:
+            for record in store.results(label, key):
+                previous = records.get(record["image"])
+                if previous is None or record["time"] >= previous["time"]:
+                    records[record["image"]] = record
+        shard_runs = [store.runs(label, key) for store in stores]
+        shard_seconds = [sum(run["seconds"] for run in runs) for runs in shard_runs]
+        done = sum(1 for record in records.values() if record["status"] == "done")
+
+        summary = summarize_records(evaluator, list(records.values()))
+        wall_time = max(shard_seconds)
+        summary["Total Time (seconds)"] = round(wall_time, 2)
+        if wall_time > 0:
+            summary["Throughput (images/sec)"] = round(done / wall_time, 3)
+        summary["Images"] = done
+        summary["Failed Images"] = len(records) - summary["Images"]
+        summary["Shards"] = sum(1 for runs in shard_runs if runs)
+        results[label if labels.count(label) == 1 else f"{label} [{key}]"] = summary
+
+    print("\n\n=== Merged Summary ===")
+    print(json.dumps(results, indent=2))
+    if summary_path:
+        directory = os.path.dirname(summary_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+def parse_concurrency(value):
+    """Parses "Raw OCR=2,Improved Multimodal OCR=8" into {name: int}."""
+    concurrency = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, count = item.rpartition("=")
+        if name not in PIPELINES:
+            raise argparse.ArgumentTypeError(
+                f"Unknown pipeline '{name}'. Choose from: {', '.join(PIPELINES)}"
+            )
+        concurrency[name] = int(count)
+    return concurrency
 
 
 if __name__ == "__main__":
-    run_evaluation(num_samples=1)
+    parser = argparse.ArgumentParser(description="Evaluate the receipt OCR pipelines on SROIE.")
+    parser.add_argument("--num-samples", type=int, default=1)
+    parser.add_argument(
+        "--preprocess", action="store_true", help="Run pipelines with image preprocessing."
+    )
+    parser.add_argument(
+        "--compare-preprocessing",
+        action="store_true",
+        help="Run with and without preprocessing and report the difference.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=parse_concurrency,
+        default={},
+        help='Per-pipeline concurrency, e.g. "Raw OCR=2,Improved Multimodal OCR=8". '
+        f"Defaults: {DEFAULT_CONCURRENCY['process']} processes for EasyOCR pipelines, "
+        f"{DEFAULT_CONCURRENCY['thread']} in-flight requests for Ollama pipelines.",
+    )
+    parser.add_argument(
+        "--share-stages",
+        action="store_true",
+        help="Reuse stage results between pipelines (faster, but later pipelines' latencies and "
+        "tokens exclude the reused stages, and EasyOCR pipelines run in threads).",
+    )
+    parser.add_argument(
+        "--stage-cache",
+        nargs="?",
+        const=DEFAULT_STAGE_CACHE_PATH,
+        default=None,
+        metavar="PATH",
+        help=f"Persist stage results across runs (default file: {DEFAULT_STAGE_CACHE_PATH}).",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Run Ollama-bound pipelines on one event loop instead of a thread pool.",
+    )
+    parser.add_argument(
+        "--compare-combined",
+        action="store_true",
+        help="Also run the multimodal entity pipeline with one combined correction + "
+        "extraction call and compare it with the three-call version.",
+    )
+    parser.add_argument(
+        "--compare-roi",
+        action="store_true",
+        help="Also run the layout rules pipeline recognizing only the likely entity regions "
+        "and compare it with full-page recognition.",
+    )
+    parser.add_argument(
+        "--compare-pruning",
+        action="store_true",
+        help="Also run the raw OCR entity pipeline with the prompt pruned to the header and "
+        "total/date/address lines and compare prompt tokens and accuracy.",
+    )
+    parser.add_argument(
+        "--results",
+        default=DEFAULT_RESULTS_PATH,
+        metavar="PATH",
+        help="JSONL file every image's result is appended to as it finishes "
+        f"(default: {DEFAULT_RESULTS_PATH}; pass '' to keep results in memory only).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip images that already have results in --results for the same pipeline "
+        "configuration (models, prompts, options) and summarize from the store.",
+    )
+    parser.add_argument(
+        "--pipelines",
+        default=None,
+        help=f"Comma-separated pipelines to evaluate (default: all of {', '.join(PIPELINES)}).",
+    )
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        default=1,
+        help="Split the sample into this many shards by a stable hash of the image IDs.",
+    )
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        default=0,
+        help="Shard to evaluate; its results go to <results>.shard-<index>-of-<count>.jsonl.",
+    )
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        default=None,
+        metavar="PATH",
+        help="Merge these results files (e.g. one per shard) into the final summary and exit.",
+    )
+    parser.add_argument(
+        "--summary", default=None, metavar="PATH", help="Write the merged summary to this file."
+    )
+    args = parser.parse_args()
+
+    if not 0 <= args.shard_index < args.shard_count:
+        parser.error("--shard-index must be in [0, --shard-count)")
+    pipelines = None
+    if args.pipelines:
+        pipelines = [name.strip() for name in args.pipelines.split(",") if name.strip()]
+        unknown = [name for name in pipelines if name not in PIPELINES]
+        if unknown:
+            parser.error(f"Unknown pipelines: {', '.join(unknown)}")
+
+    if args.merge:
+        merge_results(args.merge, args.summary)
+    else:
+        run_evaluation(
+            num_samples=args.num_samples,
+            preprocess=args.preprocess,
+            compare_preprocessing=args.compare_preprocessing,
+            concurrency=args.concurrency,
+            share_stages=args.share_stages,
+            stage_cache_path=args.stage_cache,
+            use_async=args.use_async,
+            compare_combined=args.compare_combined,
+            compare_roi=args.compare_roi,
+            compare_pruning=args.compare_pruning,
+            results_path=args.results,
+            resume=args.resume,
+            pipelines=pipelines,
+            shard_index=args.shard_index,
+            shard_count=args.shard_count,
+        )
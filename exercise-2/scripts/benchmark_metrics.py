@@ -0,0 +1,133 @@
+"""
+Benchmark Evaluator metric computation against the previous per-sample jiwer path.
+
+Predictions are the SROIE ground truth texts with seeded character edits (OCR-like noise),
+evaluated once per simulated pipeline so ground truth texts repeat as they do in
+run_evaluation.py. Reports the time of per-sample jiwer cer()/wer() and of the batched
+Evaluator path, the date normalization speedup, and checks that every value is identical.
+
+Run from the exercise-2 directory:
+    python scripts/benchmark_metrics.py --num-images 626 --pipelines 6
+"""
+
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from evaluator import Evaluator, error_rates, normalize_date  # noqa: E402
+from jiwer import cer, wer  # noqa: E402
+
+DATASET_DIR = "data/SROIE2019/train"
+
+# Date formats as Evaluator tried them before, one after the other
+_SEQUENTIAL_DATE_FORMATS = [
+    "%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d", "%m/%d/%Y", "%m-%d-%Y", "%d-%m-%y", "%d/%m/%y",
+    "%m/%d/%y", "%m-%d-%y", "%d %b %y", "%d %B %y", "%d %b %Y", "%d %B %Y", "%b %d, %Y",
+    "%B %d, %Y", "%b %d %Y", "%B %d %Y",
+]
+
+
+def sequential_normalize_date(date_str):
+    """The previous Evaluator._normalize_date: recompiled regexes, every format in turn."""
+    if not date_str:
+        return ""
+    date_str = re.sub(r"[()\s]+", " ", date_str).strip()
+    for fmt in _SEQUENTIAL_DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return re.sub(r"[^\d/-]", "", date_str).lower()
+
+
+def add_noise(text, rng, rate):
+    """Substitutes, deletes or inserts characters with probability `rate` each."""
+    chars = []
+    for char in text:
+        roll = rng.random()
+        if roll < rate:
+            chars.append(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789 "))
+        elif roll < 2 * rate:
+            continue
+        else:
+            chars.append(char)
+            if roll > 1 - rate:
+                chars.append(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789 "))
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched CER/WER and date parsing.")
+    parser.add_argument("--dataset-dir", default=DATASET_DIR)
+    parser.add_argument("--num-images", type=int, default=None, help="Default: all images.")
+    parser.add_argument(
+        "--pipelines", type=int, default=6, help="Simulated pipelines per image."
+    )
+    parser.add_argument("--noise", type=float, default=0.05, help="Per-character edit rate.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    images = sorted(glob.glob(os.path.join(args.dataset_dir, "img", "*.jpg")))[: args.num_images]
+    if not images:
+        print(f"Error: No images found at {args.dataset_dir}/img")
+        return
+
+    evaluator = Evaluator(args.dataset_dir)
+    ground_truths = [evaluator.load_ground_truth(image) for image in images]
+    ground_truths = [gt for gt in ground_truths if gt["ocr_text"]]
+    rng = random.Random(args.seed)
+    pairs = [
+        (gt["ocr_text"], add_noise(gt["ocr_text"], rng, args.noise))
+        for _ in range(args.pipelines)
+        for gt in ground_truths
+    ]
+    print(f"{len(pairs)} (ground truth, prediction) pairs from {len(ground_truths)} images")
+
+    start = time.perf_counter()
+    expected = [
+        (cer(gt_text, prediction), wer(gt_text, prediction)) for gt_text, prediction in pairs
+    ]
+    jiwer_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = error_rates(pairs)
+    batch_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    print(f"jiwer cer() + wer() per sample: {jiwer_time:.3f}s")
+    print(f"Batched error_rates:            {batch_time:.3f}s ({jiwer_time / batch_time:.1f}x)")
+    print(f"CER/WER mismatches: {mismatches}")
+
+    dates = [
+        str(gt["entities"].get("date", "")).strip().lower()
+        for gt in ground_truths
+        if gt["entities"]
+    ] * args.pipelines
+    start = time.perf_counter()
+    expected_dates = [sequential_normalize_date(date) for date in dates]
+    sequential_time = time.perf_counter() - start
+    normalize_date.cache_clear()
+    start = time.perf_counter()
+    actual_dates = [normalize_date(date) for date in dates]
+    memoized_time = time.perf_counter() - start
+
+    date_mismatches = sum(1 for a, b in zip(expected_dates, actual_dates) if a != b)
+    print(f"Sequential date normalization: {sequential_time * 1000:.1f}ms for {len(dates)} dates")
+    print(
+        f"Memoized date normalization:   {memoized_time * 1000:.1f}ms "
+        f"({sequential_time / max(memoized_time, 1e-9):.1f}x)"
+    )
+    print(f"Date mismatches: {date_mismatches}")
+    if mismatches or date_mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
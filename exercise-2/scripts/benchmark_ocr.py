@@ -0,0 +1,114 @@
+"""
+Benchmark EasyOCR throughput (images/sec) on the SROIE train set.
+
+Compares one-image-at-a-time extract_text with extract_text_batch, and optionally
+sweeps workers x threads layouts (each worker is a separate process with its own
+engine and torch thread count) to pick the best layout for a host.
+
+Run from the exercise-2 directory:
+    python scripts/benchmark_ocr.py --num-images 50 --batch-sizes 8,16,32
+    python scripts/benchmark_ocr.py --device cpu --layouts 1x1,1x4,1x8,2x4,4x2,8x1
+    python scripts/benchmark_ocr.py --device cpu --layouts 2x4 --no-quantize
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_engine import get_ocr_engine  # noqa: E402
+
+IMG_DIR = "data/SROIE2019/train/img"
+
+_worker_engine = None
+
+
+def benchmark_sequential(engine, images):
+    start = time.perf_counter()
+    for image_path in images:
+        engine.extract_text(image_path)
+    return len(images) / (time.perf_counter() - start)
+
+
+def benchmark_batch(engine, images, batch_size, workers):
+    start = time.perf_counter()
+    engine.extract_text_batch(images, batch_size=batch_size, workers=workers)
+    return len(images) / (time.perf_counter() - start)
+
+
+def _init_worker(device, num_threads, quantize, warmup_image, ready):
+    global _worker_engine
+    _worker_engine = get_ocr_engine(
+        device=device, num_threads=num_threads, quantize=quantize
+    )
+    _worker_engine.extract_text(warmup_image)
+    ready.wait()
+
+
+def _worker_ocr(image_path):
+    return _worker_engine.extract_text(image_path)
+
+
+def benchmark_layout(images, workers, threads, device, quantize):
+    """Runs extract_text over the images with `workers` processes of `threads` torch threads each."""
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(workers + 1)
+    with context.Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(device, threads, quantize, images[0], ready),
+    ) as pool:
+        # Wait until every worker has loaded and warmed up its engine before timing
+        ready.wait()
+        start = time.perf_counter()
+        pool.map(_worker_ocr, images, chunksize=1)
+        return len(images) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EasyOCR throughput benchmark")
+    parser.add_argument("--num-images", type=int, default=50)
+    parser.add_argument("--batch-sizes", default="8,16,32")
+    parser.add_argument("--workers", type=int, default=4, help="Image decode threads.")
+    parser.add_argument("--device", default=None, help="auto, cpu, cuda or mps (default: OCR_DEVICE or auto).")
+    parser.add_argument("--threads", type=int, default=None, help="Torch threads for the in-process runs.")
+    parser.add_argument("--no-quantize", action="store_true", help="Disable the int8 recognizer on CPU.")
+    parser.add_argument(
+        "--layouts",
+        default="",
+        help="Comma-separated WORKERSxTHREADS layouts to sweep, e.g. 1x8,2x4,4x2.",
+    )
+    args = parser.parse_args()
+    quantize = not args.no_quantize
+
+    images = sorted(glob.glob(os.path.join(IMG_DIR, "*.jpg")))[: args.num_images]
+    if not images:
+        print(f"Error: No images found at {IMG_DIR}")
+        return
+
+    print(f"Benchmarking on {len(images)} images (cores: {os.cpu_count()})")
+
+    if args.layouts:
+        for layout in args.layouts.split(","):
+            workers, threads = (int(x) for x in layout.lower().split("x"))
+            throughput = benchmark_layout(images, workers, threads, args.device, quantize)
+            print(f"{workers} workers x {threads} threads: {throughput:.2f} images/sec")
+        return
+
+    engine = get_ocr_engine(device=args.device, num_threads=args.threads, quantize=quantize)
+    # Warm-up: load weights and initialise kernels
+    engine.extract_text(images[0])
+    print(f"Device: {engine.device}, threads: {args.threads or 'default'}, quantize: {quantize}")
+
+    print(f"Sequential extract_text: {benchmark_sequential(engine, images):.2f} images/sec")
+    for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+        throughput = benchmark_batch(engine, images, batch_size, args.workers)
+        print(f"extract_text_batch (batch_size={batch_size}): {throughput:.2f} images/sec")
+
+
+if __name__ == "__main__":
+    main()
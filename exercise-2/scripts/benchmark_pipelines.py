@@ -0,0 +1,327 @@
+"""
+Latency and throughput benchmark for the receipt pipelines.
+
+Runs each pipeline over the same seeded sample of SROIE train images, after warm-up images
+that load the models and fill lazy imports. Every pipeline runs in its own spawned process,
+one image at a time, so its peak RSS and CPU time are its own. Reports per image:
+    decode          reading the file and decoding it (or base64-encoding it for the VLM)
+    ocr.detect      EasyOCR text detection
+    ocr.recognize   EasyOCR recognition
+    <stage>         every pipeline stage (ocr_boxes, vlm_ocr, correct, extract_entities, ...)
+    latency         the whole image (decode + pipeline)
+as latency distributions (mean, p50, p90, p95, p99, max in ms), plus images/sec, peak RSS,
+CPU utilisation (cores busy on average) and LLM calls/tokens. Stage caches are off, so
+every stage runs for every image.
+
+With --fake-ollama the Ollama stages are served by fake_ollama.py with a fixed latency, so
+OCR and framework costs can be tracked without a model server. Results are written as JSON
+to a timestamped file under results/ (or --output); pass --baseline with an earlier file to
+fail on regressions. The baseline is only overwritten with --update-baseline.
+
+Run from the exercise-2 directory:
+    python scripts/benchmark_pipelines.py --num-images 20 --warmup 2 --fake-ollama
+    python scripts/benchmark_pipelines.py --baseline results/benchmark_pipelines.json
+"""
+
+import argparse
+import dataclasses
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receipt_image import ReceiptImage  # noqa: E402
+
+IMG_DIR = "data/SROIE2019/train/img"
+OUTPUT_DIR = "results"
+PERCENTILES = (50, 90, 95, 99)
+
+
+def select_images(num_images, warmup, seed):
+    """Seeded sample of the sorted image list: (warm-up images, benchmark images)."""
+    images = sorted(glob.glob(os.path.join(IMG_DIR, "*.jpg")))
+    sample = random.Random(seed).sample(images, min(len(images), num_images + warmup))
+    return sample[:warmup], sample[warmup:]
+
+
+def distribution(seconds):
+    """Latency distribution in milliseconds."""
+    values = np.asarray(seconds, dtype=float) * 1000
+    summary = {"count": int(values.size), "mean_ms": float(values.mean())}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}_ms"] = float(np.percentile(values, percentile))
+    summary["max_ms"] = float(values.max())
+    return summary
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+class StageTimer:
+    """Accumulates the time spent in each stage of the image being processed."""
+
+    def __init__(self):
+        self.current = defaultdict(float)
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.current[name] += time.perf_counter() - start
+
+        return timed
+
+    def instrument(self, pipeline):
+        """Times the pipeline's stages (fallback stages included) and its OCR reader."""
+        stages, fallback_stages = pipeline.stages, pipeline.fallback_stages
+
+        def timed_stages(stages):
+            return [
+                dataclasses.replace(stage, fn=self.wrap(stage.name, stage.fn)) for stage in stages
+            ]
+
+        pipeline.stages = lambda: timed_stages(stages())
+        pipeline.fallback_stages = lambda results: timed_stages(fallback_stages(results))
+
+        ocr = getattr(pipeline, "ocr", None)
+        if ocr is not None:
+            reader = ocr.reader
+            reader.detect = self.wrap("ocr.detect", reader.detect)
+            reader.recognize = self.wrap("ocr.recognize", reader.recognize)
+
+    def take(self):
+        timings, self.current = dict(self.current), defaultdict(float)
+        return timings
+
+
+def decode(pipeline, image_path):
+    """Reads and decodes an image the way the pipeline's first stages consume it."""
+    image = ReceiptImage(image_path)
+    # Cached on the image, so the stages reuse it instead of decoding again
+    getattr(image, "easyocr_input" if pipeline.executor == "process" else "b64")
+    return image
+
+
+def benchmark_pipeline(name, warmup_images, images):
+    """
+    Benchmarks one pipeline in the current process.
+
+    Returns:
+        dict with throughput, latency distributions per stage, peak RSS, CPU and LLM usage.
+    """
+    from run_evaluation import PIPELINES
+
+    pipeline = PIPELINES[name]()
+    for image_path in warmup_images:
+        pipeline.process(decode(pipeline, image_path))
+
+    timer = StageTimer()
+    timer.instrument(pipeline)
+    timer.take()
+
+    process = psutil.Process()
+    cpu_before = process.cpu_times()
+    stage_seconds, totals, stats, errors = defaultdict(list), [], [], 0
+    start = time.perf_counter()
+    for image_path in images:
+        image_start = time.perf_counter()
+        try:
+            image = timer.wrap("decode", decode)(pipeline, image_path)
+            output = pipeline.process(image)
+        except Exception as e:
+            print(f"Error processing {image_path} with {name}: {e}")
+            errors += 1
+            timer.take()
+            continue
+        totals.append(time.perf_counter() - image_start)
+        stats.append(output.get("stats", {}))
+        for stage, seconds in timer.take().items():
+            stage_seconds[stage].append(seconds)
+    wall_s = time.perf_counter() - start
+    cpu_after = process.cpu_times()
+    cpu_s = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+
+    result = {
+        "pipeline": name,
+        "images": len(images),
+        "errors": errors,
+        "wall_s": wall_s,
+        "images_per_s": len(totals) / wall_s if wall_s else 0.0,
+        "latency": distribution(totals) if totals else None,
+        "stages": {stage: distribution(seconds) for stage, seconds in stage_seconds.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        "cpu_s": cpu_s,
+        # Average number of busy cores; divide by cpu_count for the share of the host
+        "cpu_utilisation": cpu_s / wall_s if wall_s else 0.0,
+    }
+    for key in ("llm_calls", "prompt_tokens", "completion_tokens"):
+        result[f"mean_{key}"] = float(np.mean([s.get(key, 0) for s in stats])) if stats else 0.0
+    return result
+
+
+def run_isolated(name, warmup_images, images):
+    """Runs benchmark_pipeline in a fresh spawned process."""
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        return executor.submit(benchmark_pipeline, name, warmup_images, images).result()
+
+
+def check_regressions(results, baseline, tolerance):
+    """Returns messages for metrics that regressed more than `tolerance` against the baseline."""
+    baseline_by_name = {r["pipeline"]: r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = baseline_by_name.get(result["pipeline"])
+        if base is None or not result["latency"] or not base["latency"]:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if result["latency"][key] > base["latency"][key] * (1 + tolerance):
+                regressions.append(
+                    f"{result['pipeline']} latency {key}: {result['latency'][key]:.1f} "
+                    f"vs baseline {base['latency'][key]:.1f}"
+                )
+        if result["images_per_s"] < base["images_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{result['pipeline']} images_per_s: {result['images_per_s']:.3f} "
+                f"vs baseline {base['images_per_s']:.3f}"
+            )
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{result['pipeline']} peak_rss_mb: {result['peak_rss_mb']:.0f} "
+                f"vs baseline {base['peak_rss_mb']:.0f}"
+            )
+    return regressions
+
+
+def main():
+    from run_evaluation import PIPELINES
+
+    parser = argparse.ArgumentParser(description="Benchmark latency and throughput per pipeline.")
+    parser.add_argument(
+        "--pipelines",
+        default=",".join(PIPELINES),
+        help="Comma-separated pipeline names (default: all).",
+    )
+    parser.add_argument("--num-images", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed images run first.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--fake-ollama", action="store_true", help="Serve the Ollama stages with fake_ollama."
+    )
+    parser.add_argument(
+        "--ollama-latency", type=float, default=0.2, help="Seconds per fake Ollama response."
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Result JSON (default: results/benchmark_pipelines-<timestamp>.json).",
+    )
+    parser.add_argument("--baseline", help="Previous benchmark JSON to compare against.")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed relative slowdown vs baseline."
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Write the results to the --baseline file (after comparing against it).",
+    )
+    args = parser.parse_args()
+
+    if args.update_baseline:
+        if not args.baseline:
+            parser.error("--update-baseline requires --baseline")
+        args.output = args.baseline
+    elif args.output is None:
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        args.output = os.path.join(OUTPUT_DIR, f"benchmark_pipelines-{timestamp}.json")
+    elif args.baseline and os.path.abspath(args.output) == os.path.abspath(args.baseline):
+        parser.error("--output is the --baseline file; pass --update-baseline to replace it")
+
+    names = [name.strip() for name in args.pipelines.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PIPELINES]
+    if unknown:
+        parser.error(f"Unknown pipelines: {', '.join(unknown)}")
+
+    warmup_images, images = select_images(args.num_images, args.warmup, args.seed)
+    if not images:
+        print(f"Error: No images found at {IMG_DIR}")
+        return
+
+    server = None
+    if args.fake_ollama:
+        from fake_ollama import start_fake_ollama
+
+        server = start_fake_ollama(latency=args.ollama_latency)
+        # Inherited by the spawned benchmark processes
+        os.environ["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = []
+    try:
+        for name in names:
+            result = run_isolated(name, warmup_images, images)
+            results.append(result)
+            latency = result["latency"] or {}
+            print(
+                f"{name:<34} {result['images_per_s']:>7.3f} img/s  "
+                f"p50={latency.get('p50_ms', 0):.0f}ms p95={latency.get('p95_ms', 0):.0f}ms  "
+                f"rss={result['peak_rss_mb']:.0f}MB cpu={result['cpu_utilisation']:.2f} cores  "
+                f"errors={result['errors']}"
+            )
+            for stage, stage_latency in result["stages"].items():
+                print(
+                    f"    {stage:<20} p50={stage_latency['p50_ms']:.1f}ms "
+                    f"p95={stage_latency['p95_ms']:.1f}ms"
+                )
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = check_regressions(results, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION: {message}")
+
+    settings = {
+        "seed": args.seed,
+        "warmup": args.warmup,
+        "images": [os.path.basename(path) for path in images],
+        "fake_ollama": args.fake_ollama,
+        "ollama_latency": args.ollama_latency if args.fake_ollama else None,
+        "llm": os.getenv("OLLAMA_LLM", "qwen2.5:7b"),
+        "vlm": os.getenv("OLLAMA_VLM", "llava:7b"),
+        "ocr_device": os.getenv("OCR_DEVICE", "auto"),
+        "cpu_count": os.cpu_count(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"settings": settings, "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
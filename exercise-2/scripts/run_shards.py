@@ -0,0 +1,97 @@
+"""
+Run a sharded evaluation locally: one run_evaluation.py process per shard, each with its own
+fake Ollama server (as each machine would have its own Ollama), then merge the shard results.
+
+Every shard process gets OLLAMA_BASE_URL of its server and writes
+<results>.shard-<i>-of-<n>.jsonl; the merged summary is printed and written to --summary.
+With the fake servers, accuracy is meaningless but partitioning, resuming, merging and
+throughput can be checked offline.
+
+Run from the exercise-2 directory:
+    python scripts/run_shards.py --shards 3 --num-samples 30
+    python scripts/run_shards.py --shards 3 --num-samples 30 --real-ollama  # OLLAMA_BASE_URL
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+EXERCISE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, EXERCISE_DIR)
+
+from fake_ollama import start_fake_ollama  # noqa: E402
+from results_store import shard_results_path  # noqa: E402
+
+OLLAMA_PIPELINES = "Improved Multimodal OCR,Improved Multimodal OCR + Entity,Direct VLM Entities"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run evaluation shards locally and merge them.")
+    parser.add_argument("--shards", type=int, default=2)
+    parser.add_argument("--num-samples", type=int, default=20)
+    parser.add_argument(
+        "--pipelines", default=OLLAMA_PIPELINES, help="Pipelines every shard evaluates."
+    )
+    parser.add_argument("--results", default="results/shards/evaluation.jsonl")
+    parser.add_argument("--summary", default="results/shards/summary.json")
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Seconds per fake Ollama response."
+    )
+    parser.add_argument(
+        "--real-ollama",
+        action="store_true",
+        help="Use OLLAMA_BASE_URL from the environment instead of fake servers.",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="Pass --resume to the shard processes."
+    )
+    args = parser.parse_args()
+
+    script = os.path.join(EXERCISE_DIR, "run_evaluation.py")
+    servers, processes = [], []
+    start = time.perf_counter()
+    for index in range(args.shards):
+        env = dict(os.environ)
+        if not args.real_ollama:
+            server = start_fake_ollama(latency=args.latency)
+            servers.append(server)
+            env["OLLAMA_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}"
+        command = [
+            sys.executable,
+            script,
+            "--num-samples", str(args.num_samples),
+            "--pipelines", args.pipelines,
+            "--shard-index", str(index),
+            "--shard-count", str(args.shards),
+            "--results", args.results,
+        ]
+        if args.resume:
+            command.append("--resume")
+        log_path = shard_results_path(args.results, index, args.shards) + ".log"
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        log = open(log_path, "w", encoding="utf-8")
+        processes.append((index, subprocess.Popen(command, env=env, stdout=log, stderr=log), log))
+        print(f"Shard {index}: {' '.join(command[1:])} (log: {log_path})")
+
+    failed = []
+    for index, process, log in processes:
+        if process.wait() != 0:
+            failed.append(index)
+        log.close()
+    print(f"Shards finished in {time.perf_counter() - start:.1f}s")
+    for server in servers:
+        print(f"Fake Ollama on port {server.server_address[1]}: {server.calls} chat requests")
+        server.shutdown()
+    if failed:
+        print(f"Error: shards {failed} failed, see their logs")
+        sys.exit(1)
+
+    shard_files = [shard_results_path(args.results, i, args.shards) for i in range(args.shards)]
+    merge = [sys.executable, script, "--merge", *shard_files, "--summary", args.summary]
+    sys.exit(subprocess.call(merge))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Receipt processing service: HTTP uploads and a watched directory feed bounded work queues,
+one per pipeline, drained by async workers running `BasePipeline.aprocess`.
+
+Endpoints:
+    POST /jobs             multipart "file" and form field "pipeline"; 202 {"job_id"}, or
+                           429 with Retry-After when the pipeline's queue is full
+    GET  /jobs/{job_id}    job status ("queued", "running", "done", "failed") and result
+    GET  /pipelines        served pipelines
+    GET  /health           queue depth, capacity and workers per pipeline
+
+Every finished job is appended to a JSONL file as {"job_id", "pipeline", "image", "status",
+"latency", **PipelineOutput} (or "error"). The watched directory is submitted to every
+served pipeline; it waits for queue space instead of being refused.
+
+Run from the exercise-2 directory (against a real Ollama, or fake_ollama.py):
+    python service.py --pipelines "Raw OCR + Entity,Direct VLM Entities" --watch inbox
+    curl -F file=@receipt.jpg -F pipeline="Raw OCR + Entity" localhost:8000/jobs
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import uvicorn
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from pipelines.disk_cache import DiskStageCache
+from receipt_image import ReceiptImage
+from run_evaluation import DEFAULT_CONCURRENCY, PIPELINES
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+DEFAULT_PIPELINE = "Raw OCR + Entity"
+
+
+class ReceiptService:
+    """Bounded per-pipeline job queues drained by async workers.
+
+    Args:
+        pipelines (List[str]): Names from run_evaluation.PIPELINES to serve.
+        queue_size (int): Jobs that may wait per pipeline before submissions are refused.
+        workers (int): Workers per pipeline. Defaults to DEFAULT_CONCURRENCY for the
+            pipeline's executor kind.
+        output_path (str): JSONL file finished jobs are appended to (None to disable).
+        max_jobs (int): Jobs kept for polling; the oldest finished ones are forgotten first.
+        stage_cache (StageCache): Optional stage result cache shared by the pipelines.
+    """
+
+    def __init__(
+        self,
+        pipelines=(DEFAULT_PIPELINE,),
+        queue_size=32,
+        workers=None,
+        output_path="results/receipts.jsonl",
+        max_jobs=10000,
+        stage_cache=None,
+    ):
+        self.pipelines = {name: PIPELINES[name](stage_cache=stage_cache) for name in pipelines}
+        self.queue_size = queue_size
+        self.workers = workers
+        self.output_path = output_path
+        self.max_jobs = max_jobs
+        self.queues = {}
+        self.worker_counts = {}
+        self.jobs = OrderedDict()
+        self._images = {}
+        self._tasks = []
+        self._write_lock = None
+
+    async def start(self):
+        """Creates the queues and starts the workers on the running event loop."""
+        self._write_lock = asyncio.Lock()
+        directory = os.path.dirname(self.output_path or "")
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for name, pipeline in self.pipelines.items():
+            queue = self.queues[name] = asyncio.Queue(self.queue_size)
+            count = self.workers or DEFAULT_CONCURRENCY[pipeline.executor]
+            self.worker_counts[name] = count
+            for _ in range(count):
+                self._tasks.append(asyncio.create_task(self._worker(name, queue)))
+
+    async def stop(self):
+        """Cancels the workers; queued jobs are dropped."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    def _new_job(self, pipeline, image):
+        image = ReceiptImage.of(image)
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "queued",
+            "pipeline": pipeline,
+            "image": image.name,
+            "submitted_at": time.time(),
+        }
+        self.jobs[job["job_id"]] = job
+        self._images[job["job_id"]] = image
+        # Forget the oldest finished jobs; queued and running ones are always kept
+        excess = len(self.jobs) - self.max_jobs
+        if excess > 0:
+            finished = [
+                job_id for job_id, old in self.jobs.items() if old["status"] in ("done", "failed")
+            ]
+            for job_id in finished[:excess]:
+                del self.jobs[job_id]
+        return job
+
+    def submit_nowait(self, pipeline, image):
+        """
+        Queues an image for a pipeline without waiting.
+
+        Args:
+            pipeline (str): Served pipeline name.
+            image (str | ReceiptImage): Path to the image file, or an in-memory image.
+
+        Returns:
+            dict: The job record.
+
+        Raises:
+            asyncio.QueueFull: The pipeline's queue is full.
+        """
+        job = self._new_job(pipeline, image)
+        try:
+            self.queues[pipeline].put_nowait(job["job_id"])
+        except asyncio.QueueFull:
+            del self.jobs[job["job_id"]]
+            del self._images[job["job_id"]]
+            raise
+        return job
+
+    async def submit(self, pipeline, image):
+        """Queues an image for a pipeline, waiting for room in its queue."""
+        job = self._new_job(pipeline, image)
+        await self.queues[pipeline].put(job["job_id"])
+        return job
+
+    async def _worker(self, name, queue):
+        pipeline = self.pipelines[name]
+        while True:
+            job_id = await queue.get()
+            job, image = self.jobs[job_id], self._images.pop(job_id)
+            job["status"] = "running"
+            started = time.perf_counter()
+            try:
+                job["result"] = await pipeline.aprocess(image)
+                job["status"] = "done"
+            except Exception as e:
+                print(f"Error processing {job['image']} with {name}: {e}")
+                job["error"] = str(e)
+                job["status"] = "failed"
+            finally:
+                job["latency"] = round(time.perf_counter() - started, 3)
+                queue.task_done()
+            await self._write(job)
+
+    async def _write(self, job):
+        if not self.output_path:
+            return
+        record = {
+            "job_id": job["job_id"],
+            "pipeline": job["pipeline"],
+            "image": job["image"],
+            "status": job["status"],
+            "latency": job["latency"],
+        }
+        if "result" in job:
+            record.update(job["result"])
+        else:
+            record["error"] = job.get("error")
+        line = json.dumps(record) + "\n"
+
+        def append():
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+        async with self._write_lock:
+            await asyncio.to_thread(append)
+
+    async def watch(self, directory, interval=1.0):
+        """
+        Submits every image appearing in `directory` to all served pipelines.
+
+        Files are picked up once they have not been modified for `interval` seconds, and
+        again if they change later. Submission waits while a queue is full.
+        """
+        seen = set()
+        while True:
+            for path in sorted(glob.glob(os.path.join(directory, "*"))):
+                if not path.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if (path, mtime) in seen or time.time() - mtime < interval:
+                    continue
+                seen.add((path, mtime))
+                # One ReceiptImage for all pipelines: the file is read and decoded once
+                image = ReceiptImage(path)
+                for name in self.pipelines:
+                    await self.submit(name, image)
+            await asyncio.sleep(interval)
+
+    def health(self):
+        return {
+            name: {
+                "queued": queue.qsize(),
+                "capacity": queue.maxsize,
+                "workers": self.worker_counts[name],
+            }
+            for name, queue in self.queues.items()
+        }
+
+
+def create_app(service, watch_dir=None, watch_interval=1.0):
+    """
+    Builds the FastAPI app for a ReceiptService.
+
+    Args:
+        service (ReceiptService): The service; it is started and stopped with the app.
+        watch_dir (str): Optional directory whose new images are processed automatically.
+        watch_interval (float): Seconds between directory scans.
+
+    Returns:
+        FastAPI: The application.
+    """
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await service.start()
+        watcher = None
+        if watch_dir:
+            os.makedirs(watch_dir, exist_ok=True)
+            watcher = asyncio.create_task(service.watch(watch_dir, watch_interval))
+        try:
+            yield
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            await service.stop()
+
+    app = FastAPI(title="SROIE Receipt Service", lifespan=lifespan)
+
+    def queue_full(pipeline):
+        return HTTPException(
+            status_code=429,
+            detail=f"Queue for '{pipeline}' is full, retry later",
+            headers={"Retry-After": "1"},
+        )
+
+    @app.post("/jobs", status_code=202)
+    async def submit_job(file: UploadFile = File(...), pipeline: str = Form(DEFAULT_PIPELINE)):
+        if pipeline not in service.queues:
+            raise HTTPException(status_code=404, detail=f"Unknown pipeline '{pipeline}'")
+        # Refuse before reading the upload when there is no room anyway
+        if service.queues[pipeline].full():
+            raise queue_full(pipeline)
+        # Processed in memory: decoded once, never written to disk
+        image = ReceiptImage(await file.read(), name=file.filename)
+        try:
+            job = service.submit_nowait(pipeline, image)
+        except asyncio.QueueFull:
+            raise queue_full(pipeline)
+        return {"job_id": job["job_id"], "status": job["status"]}
+
+    @app.get("/jobs/{job_id}")
+    async def get_job(job_id: str):
+        job = service.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Unknown job")
+        return job
+
+    @app.get("/pipelines")
+    async def list_pipelines():
+        return list(service.pipelines)
+
+    @app.get("/health")
+    async def health():
+        return service.health()
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve receipt processing over HTTP.")
+    parser.add_argument(
+        "--pipelines",
+        default=DEFAULT_PIPELINE,
+        help=f"Comma-separated pipeline names from: {', '.join(PIPELINES)}.",
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=32, help="Waiting jobs per pipeline before HTTP 429."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Workers per pipeline (default per executor)."
+    )
+    parser.add_argument("--output", default="results/receipts.jsonl", help="JSONL results file.")
+    parser.add_argument("--watch", default=None, help="Directory to ingest images from.")
+    parser.add_argument("--watch-interval", type=float, default=1.0)
+    parser.add_argument(
+        "--stage-cache",
+        default=None,
+        help="Reuse stage results from this SQLite file (see pipelines.disk_cache).",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.pipelines.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PIPELINES]
+    if unknown:
+        parser.error(f"Unknown pipelines: {', '.join(unknown)}")
+
+    service = ReceiptService(
+        pipelines=names,
+        queue_size=args.queue_size,
+        workers=args.workers,
+        output_path=args.output,
+        stage_cache=DiskStageCache(args.stage_cache) if args.stage_cache else None,
+    )
+    app = create_app(service, watch_dir=args.watch, watch_interval=args.watch_interval)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
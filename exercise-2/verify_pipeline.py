@@ -1,19 +1,28 @@
+import argparse
 import glob
 import os
 import random
 import time
 
 from evaluator import Evaluator
-from pipelines import (ImprovedMultimodalOCREntityAnalysisPipeline,
-                       ImprovedMultimodalOCRPipeline,
+from pipelines import (DirectVLMEntityPipeline,
+                       ImprovedMultimodalOCREntityAnalysisPipeline,
+                       ImprovedMultimodalOCRPipeline, LayoutEntityPipeline,
                        RawOCREntityAnalysisPipeline, RawOCRPipeline)
+from pipelines.disk_cache import DEFAULT_PATH as DEFAULT_STAGE_CACHE_PATH
+from pipelines.disk_cache import DiskStageCache
+from profiling import report_usage
 
 
-def verify():
+def verify(stage_cache_path=None):
     """Verify the OCR pipelines by testing them on a random image from the dataset.
 
     This function selects a random image from the SROIE2019 training set, loads the ground truth,
     and evaluates each pipeline's performance against it.
+
+    Args:
+        stage_cache_path (str): Optional SQLite file to reuse OCR/VLM/LLM stage results from
+            (and store them in) across runs.
     """
     images = glob.glob("data/SROIE2019/train/img/*.jpg")
     if not images:
@@ -35,22 +44,28 @@ def verify():
     print("Ground Truth Entities:", ground_truth["entities"])
     print("Ground Truth Raw Text Length:", len(ground_truth["ocr_text"]))
 
-    pipelines = [
-        RawOCRPipeline(),
-        ImprovedMultimodalOCRPipeline(),
-        RawOCREntityAnalysisPipeline(),
-        ImprovedMultimodalOCREntityAnalysisPipeline(),
-    ]
+    # Engines and clients are shared between pipelines and load lazily on first use
+    stage_cache = DiskStageCache(stage_cache_path) if stage_cache_path else None
+    with report_usage("Pipeline initialisation"):
+        pipelines = [
+            RawOCRPipeline(stage_cache=stage_cache),
+            ImprovedMultimodalOCRPipeline(stage_cache=stage_cache),
+            RawOCREntityAnalysisPipeline(stage_cache=stage_cache),
+            ImprovedMultimodalOCREntityAnalysisPipeline(stage_cache=stage_cache),
+            DirectVLMEntityPipeline(stage_cache=stage_cache),
+            LayoutEntityPipeline(stage_cache=stage_cache),
+        ]
 
     for p in pipelines:
         print(f"\n--- Testing Pipeline: {p.__class__.__name__} ---")
         try:
             start_time = time.perf_counter()
-            res = p.process(img_path)
+            with report_usage("Pipeline run"):
+                res = p.process(img_path)
             end_time = time.perf_counter()
             time_taken = end_time - start_time
             
-            print("Raw Text Length:", len(res.get("raw_text", "")))
+            print("Raw Text Length:", len(res.get("raw_text") or ""))
             print("Structured Data:", res.get("structured_data"))
             print(f"Time Taken: {time_taken:.2f} seconds")
 
@@ -62,6 +77,20 @@ def verify():
         except Exception as e:
             print(f"FAILED: {e}")
 
+    if stage_cache is not None:
+        metrics = stage_cache.metrics()
+        print(f"Stage cache: {metrics['hits']} hits, {metrics['misses']} misses ({stage_cache.path})")
+
 
 if __name__ == "__main__":
-    verify()
+    parser = argparse.ArgumentParser(description="Run all pipelines on a random SROIE image.")
+    parser.add_argument(
+        "--stage-cache",
+        nargs="?",
+        const=DEFAULT_STAGE_CACHE_PATH,
+        default=None,
+        metavar="PATH",
+        help=f"Persist stage results across runs (default file: {DEFAULT_STAGE_CACHE_PATH}).",
+    )
+    args = parser.parse_args()
+    verify(stage_cache_path=args.stage_cache)